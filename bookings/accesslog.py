@@ -0,0 +1,223 @@
+"""Structured access log: one JSON line per request.
+
+``AccessLogMiddleware`` builds a small dict per request (route name,
+status, latency, query count, user id) and hands it to ``AccessLogWriter``
+with a non-blocking ``put``. A background thread serialises the records
+and writes them in batches, one ``write()`` per batch, rotating the file
+by size like ``RotatingFileHandler`` (``access.jsonl.1``, ``.2`` ...).
+
+The request thread never touches the disk. When the queue is full the
+record is dropped and counted; the writer notes how many were lost in the
+log itself as ``{"dropped": n}``.
+
+Several gunicorn workers can share one file: lines are appended with
+``O_APPEND`` and a writer that finds the file rotated by another process
+reopens it.
+"""
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.functional import SimpleLazyObject, empty
+
+from .timing import RequestTimings, current_timings
+
+QUEUE_SIZE = 10_000
+
+# Records per write() at most, and how long the writer waits to fill a batch
+BATCH_SIZE = 1000
+FLUSH_SECONDS = 0.5
+
+_STOP = object()
+
+
+class AccessLogWriter:
+    def __init__(self, path, max_bytes, backups, queue_size=QUEUE_SIZE):
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.queue = queue.Queue(queue_size)
+        self.dropped = 0
+        self.reported = 0
+        self.file = None
+        self.thread = None
+        self.pid = None
+        self.lock = threading.Lock()
+
+    def submit(self, record):
+        """Queue a record for writing; never blocks"""
+        if self.pid != os.getpid():
+            self._start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        # Once per process, including after a fork (gunicorn --preload)
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            if self.pid is not None:
+                self.queue = queue.Queue(self.queue.maxsize)
+                self.file = None
+            self.thread = threading.Thread(target=self._run, name='access-log', daemon=True)
+            self.thread.start()
+            self.pid = os.getpid()
+            atexit.register(self.close)
+
+    def close(self, timeout=2):
+        """Write what is queued and stop the thread"""
+        if self.thread is None or not self.thread.is_alive():
+            return
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self.thread.join(timeout)
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + FLUSH_SECONDS
+            while len(batch) < BATCH_SIZE and batch[-1] is not _STOP:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            stop = batch[-1] is _STOP
+            if stop:
+                batch.pop()
+            self._write(batch)
+            if stop:
+                if self.file:
+                    self.file.close()
+                return
+
+    def _write(self, records):
+        dropped = self.dropped - self.reported
+        if dropped:
+            records.append({'dropped': dropped})
+            self.reported += dropped
+        if not records:
+            return
+        data = ''.join(json.dumps(record, separators=(',', ':')) + '\n' for record in records).encode()
+        try:
+            self._open()
+            # Other workers append too, so ask the file rather than tell()
+            size = os.fstat(self.file.fileno()).st_size
+            if self.max_bytes and size and size + len(data) > self.max_bytes:
+                self._rotate()
+            self.file.write(data)
+            self.file.flush()
+        except OSError:
+            self.dropped += len(records)
+            self.file = None
+
+    def _open(self):
+        if self.file is not None:
+            try:
+                if os.stat(self.path).st_ino == os.fstat(self.file.fileno()).st_ino:
+                    return
+            except FileNotFoundError:
+                pass
+            # Rotated (or removed) by another process
+            self.file.close()
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self.file = open(self.path, 'ab', buffering=0)
+
+    def _rotate(self):
+        self.file.close()
+        self.file = None
+        if self.backups:
+            for number in range(self.backups - 1, 0, -1):
+                source = f'{self.path}.{number}'
+                if os.path.exists(source):
+                    os.replace(source, f'{self.path}.{number + 1}')
+            os.replace(self.path, f'{self.path}.1')
+        else:
+            os.truncate(self.path, 0)
+        self._open()
+
+
+_writer = None
+
+
+def get_writer():
+    global _writer
+    if _writer is None:
+        path = os.path.join(settings.BASE_DIR, settings.ACCESS_LOG)
+        _writer = AccessLogWriter(path, settings.ACCESS_LOG_MAX_BYTES, settings.ACCESS_LOG_BACKUPS)
+    return _writer
+
+
+def _user_id(request):
+    user = getattr(request, 'user', None)
+    # ไม่โหลด user จาก session เพียงเพื่อเขียน log
+    if user is None or (isinstance(user, SimpleLazyObject) and user._wrapped is empty):
+        return None
+    return user.pk
+
+
+class AccessLogMiddleware:
+    """Sits near the top of ``MIDDLEWARE`` so the latency covers the whole stack"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.ACCESS_LOG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.writer = get_writer()
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        self.log(request, response, timings, started)
+        return response
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        self.log(request, response, timings, started)
+        return response
+
+    def log(self, request, response, timings, started):
+        match = request.resolver_match
+        self.writer.submit({
+            'ts': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+            'method': request.method,
+            'path': request.path,
+            'route': match.view_name if match else None,
+            'status': response.status_code,
+            'ms': round((time.perf_counter() - started) * 1000, 2),
+            'queries': len(timings.queries),
+            'db_ms': round(timings.db * 1000, 2),
+            'user': _user_id(request),
+        })
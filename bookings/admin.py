@@ -1,5 +1,6 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from .models import ParkingSpot, Booking, Ticket, UserCar
+from .approvals import approve_bookings, reject_bookings
 
 
 @admin.register(UserCar)
@@ -12,18 +13,21 @@ class UserCarAdmin(admin.ModelAdmin):
 
 @admin.register(ParkingSpot)
 class ParkingSpotAdmin(admin.ModelAdmin):
-    list_display = ['spot_number', 'zone', 'is_available']
-    list_filter = ['zone', 'is_available']
+    list_display = ['spot_number', 'zone', 'in_service', 'is_available']
+    list_filter = ['zone', 'in_service', 'is_available']
     search_fields = ['spot_number']
-    list_editable = ['is_available']
+    list_editable = ['in_service']
+    readonly_fields = ['is_available']
 
 
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
     list_display = ['booking_id', 'user', 'car_license', 'booking_date', 'status', 'parking_spot', 'created_at']
+    list_select_related = ['user', 'parking_spot']
     list_filter = ['status', 'booking_date', 'created_at']
     search_fields = ['booking_id', 'car_license', 'user__username']
     readonly_fields = ['booking_id', 'created_at', 'updated_at']
+    actions = ['approve_selected', 'reject_selected']
     
     fieldsets = (
         ('ข้อมูลการจอง', {
@@ -43,6 +47,19 @@ class BookingAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+    
+    @admin.action(description='✅ Approve selected bookings')
+    def approve_selected(self, request, queryset):
+        result = approve_bookings(queryset.values_list('pk', flat=True), request.user)
+        if result.tickets:
+            self.message_user(request, f'Approved {len(result.tickets)} booking(s) and issued tickets.', messages.SUCCESS)
+        if result.unassigned:
+            self.message_user(request, f'No free spot for {len(result.unassigned)} booking(s).', messages.ERROR)
+    
+    @admin.action(description='❌ Reject selected bookings')
+    def reject_selected(self, request, queryset):
+        rejected = reject_bookings(queryset.values_list('pk', flat=True))
+        self.message_user(request, f'Rejected {rejected} booking(s).', messages.WARNING)
 
 
 @admin.register(Ticket)
@@ -0,0 +1,175 @@
+from django.db.models import F, Q
+
+from .models import Booking, ParkingSpot
+
+MINUTES_PER_DAY = 24 * 60
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = MINUTES_PER_DAY // SLOT_MINUTES
+
+
+def to_minutes(value):
+    """Convert a ``datetime.time`` to minutes since midnight"""
+    return value.hour * 60 + value.minute
+
+
+def interval(start_time, end_time):
+    """Return the half-open ``[start, end)`` minute range of a booking.
+
+    Bookings whose end is not after their start run until midnight.
+    """
+    start = to_minutes(start_time)
+    end = to_minutes(end_time)
+    if end <= start:
+        end = MINUTES_PER_DAY
+    return start, end
+
+
+def overlapping(bookings, start_time, end_time):
+    """Narrow ``bookings`` to those overlapping the window on their day"""
+    if end_time <= start_time:
+        # The window runs to midnight
+        return bookings.filter(Q(end_time__gt=start_time) | Q(end_time__lte=F('start_time')))
+    return bookings.filter(
+        Q(start_time__lt=end_time) | Q(end_time__lte=F('start_time')),
+        Q(end_time__gt=start_time) | Q(end_time__lte=F('start_time')),
+    )
+
+
+def _range_mask(start, end):
+    return ((1 << (end - start)) - 1) << start
+
+
+def _iter_bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class SpotIndex:
+    """Per-day occupancy index of parking spots.
+
+    Every spot keeps an exact minute bitmap of its approved bookings, and
+    every 15-minute slot keeps a bitmap of the spots that have a booking
+    touching it. A lookup ORs the slot bitmaps covered by the request, so
+    finding a free spot costs a handful of integer operations no matter how
+    many bookings the day already holds. Only spots that touch the partially
+    covered boundary slots need an exact check.
+    """
+
+    def __init__(self, spot_ids):
+        self.spot_ids = list(spot_ids)
+        self._position = {spot_id: i for i, spot_id in enumerate(self.spot_ids)}
+        self._spot_masks = [0] * len(self.spot_ids)
+        self._slot_masks = [0] * SLOTS_PER_DAY
+        self._all = (1 << len(self.spot_ids)) - 1
+
+    @classmethod
+    def for_date(cls, booking_date, start_time=None, end_time=None):
+        """Build the index for ``booking_date`` from approved bookings.
+
+        When a time window is given, only bookings overlapping it are
+        loaded; the index is then exact for lookups inside that window.
+        """
+        return cls.for_dates([booking_date], start_time, end_time)[booking_date]
+
+    @classmethod
+    def for_dates(cls, dates, start_time=None, end_time=None):
+        """Build one index per date with a single bookings query.
+
+        Returns ``{date: SpotIndex}``; the window narrows every day's load
+        the same way as in ``for_date``. Spots out of service are left out.
+        """
+        spot_ids = list(ParkingSpot.objects.filter(in_service=True).values_list('id', flat=True))
+        indexes = {booking_date: cls(spot_ids) for booking_date in dates}
+        bookings = Booking.objects.filter(
+            booking_date__in=list(indexes), status='APPROVED', parking_spot__isnull=False,
+        )
+        if start_time is not None and end_time is not None:
+            bookings = overlapping(bookings, start_time, end_time)
+        for booking_date, spot_id, start, end in bookings.values_list(
+            'booking_date', 'parking_spot_id', 'start_time', 'end_time',
+        ).order_by():
+            indexes[booking_date].reserve(spot_id, start, end)
+        return indexes
+
+    def __len__(self):
+        return len(self.spot_ids)
+
+    def reserve(self, spot_id, start_time, end_time):
+        """Mark ``spot_id`` as taken between ``start_time`` and ``end_time``"""
+        start, end = interval(start_time, end_time)
+        self.reserve_minutes(spot_id, start, end)
+
+    def reserve_minutes(self, spot_id, start, end):
+        """Mark ``spot_id`` as taken for the minutes ``[start, end)``"""
+        position = self._position.get(spot_id)
+        if position is None:
+            return
+        self._spot_masks[position] |= _range_mask(start, end)
+        bit = 1 << position
+        for slot in range(start // SLOT_MINUTES, (end - 1) // SLOT_MINUTES + 1):
+            self._slot_masks[slot] |= bit
+
+    def is_free(self, spot_id, start_time, end_time):
+        position = self._position.get(spot_id)
+        if position is None:
+            return False
+        start, end = interval(start_time, end_time)
+        return not self._spot_masks[position] & _range_mask(start, end)
+
+    def _candidates(self, start, end):
+        """Return ``(free, maybe)`` bitmaps of spots for ``[start, end)``.
+
+        ``free`` spots have nothing in any covered slot, ``maybe`` spots only
+        touch the partially covered first/last slot and need an exact check.
+        """
+        first, last = start // SLOT_MINUTES, (end - 1) // SLOT_MINUTES
+        inner_first = first if start % SLOT_MINUTES == 0 else first + 1
+        inner_last = last if end % SLOT_MINUTES == 0 else last - 1
+
+        busy = 0
+        for slot in range(inner_first, inner_last + 1):
+            busy |= self._slot_masks[slot]
+        edges = self._slot_masks[first] | self._slot_masks[last]
+        maybe = edges & ~busy
+        free = self._all & ~busy & ~edges
+        return free, maybe
+
+    def find_free(self, start_time, end_time):
+        """Return the first free spot id for the window, or ``None``"""
+        for spot_id in self.iter_free(start_time, end_time):
+            return spot_id
+        return None
+
+    def iter_free(self, start_time, end_time):
+        """Yield free spot ids for the window in spot order"""
+        start, end = interval(start_time, end_time)
+        free, maybe = self._candidates(start, end)
+        wanted = _range_mask(start, end)
+        for position in _iter_bits(maybe):
+            if not self._spot_masks[position] & wanted:
+                free |= 1 << position
+        for position in _iter_bits(free):
+            yield self.spot_ids[position]
+
+    def free_count(self, start_time, end_time):
+        start, end = interval(start_time, end_time)
+        free, maybe = self._candidates(start, end)
+        wanted = _range_mask(start, end)
+        exact = sum(1 for p in _iter_bits(maybe) if not self._spot_masks[p] & wanted)
+        return bin(free).count('1') + exact
+
+
+def has_free_spot(booking_date, start_time, end_time):
+    index = SpotIndex.for_date(booking_date, start_time, end_time)
+    return index.find_free(start_time, end_time) is not None
+
+
+def dates_without_free_spot(dates, start_time, end_time):
+    """The subset of ``dates`` on which no spot is free for the window"""
+    indexes = SpotIndex.for_dates(dates, start_time, end_time)
+    return {
+        booking_date for booking_date, index in indexes.items()
+        if index.find_free(start_time, end_time) is None
+    }
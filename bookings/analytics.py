@@ -0,0 +1,242 @@
+"""Occupancy and utilisation analytics over booking history.
+
+Bookings are read once, ordered by date, as plain tuples with
+``values_list().iterator()``. Dates and times are selected as text, which
+skips Django's per-row converters, and each chunk is parsed into NumPy
+columns in one go. Every finished day becomes a spots x 15-minute-slots
+occupancy matrix (a difference array summed along the slots). Only the
+per-zone/weekday/slot totals are kept, so memory stays the same for a week
+or for years.
+"""
+import csv
+from collections import namedtuple
+from datetime import date, timedelta
+from itertools import islice
+
+import numpy as np
+from django.db.models import CharField
+from django.db.models.functions import Cast
+
+from .allocation import SLOT_MINUTES, SLOTS_PER_DAY
+from .models import Booking, ParkingSpot
+
+CHUNK_SIZE = 50_000
+
+ROW_FIELDS = ('parking_spot', 'zone', 'booking_date', 'start_time', 'end_time', 'status')
+
+STATUSES = [code for code, _ in Booking.STATUS_CHOICES]
+STATUS_INDEX = {status: index for index, status in enumerate(STATUSES)}
+
+# Statuses that actually held a spot
+OCCUPYING = ('APPROVED', 'COMPLETED')
+
+# Statuses that count as demand: everything that was asked for and not withdrawn
+DEMANDING = ('WAITING', 'APPROVED', 'COMPLETED', 'REJECTED')
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+SLOTS_PER_HOUR = 60 // SLOT_MINUTES
+
+# ``datetime64[D]`` counts days from here
+EPOCH = date(1970, 1, 1)
+
+Peak = namedtuple('Peak', 'count date time')
+
+
+def booking_rows(start, end):
+    """``(spot_id, zone, booking_date, start_time, end_time, status)`` for every
+    booking from ``start`` to ``end`` inclusive, oldest day first.
+
+    Dates come back as ``YYYY-MM-DD`` and times as ``HH:MM:SS`` strings.
+    """
+    return (
+        Booking.objects.filter(booking_date__range=(start, end))
+        .order_by('booking_date')
+        .values_list(
+            'parking_spot', 'parking_spot__zone',
+            Cast('booking_date', CharField()), Cast('start_time', CharField()), Cast('end_time', CharField()),
+            'status',
+        )
+        .iterator(chunk_size=5000)
+    )
+
+
+def stream_rows_csv(start, end):
+    """Yield the booking tuples as CSV text, one line at a time"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(ROW_FIELDS)
+    for spot_id, zone, booking_date, start_time, end_time, status in booking_rows(start, end):
+        yield writer.writerow([spot_id or '', zone or '', booking_date, start_time[:5], end_time[:5], status])
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def _minutes(times):
+    """Minutes after midnight for a sequence of ``HH:MM...`` strings"""
+    digits = np.array(times, dtype='U5').view(np.uint32).reshape(-1, 5).astype(np.int32) - ord('0')
+    return (digits[:, 0] * 10 + digits[:, 1]) * 60 + digits[:, 3] * 10 + digits[:, 4]
+
+
+def _slot_range(start_times, end_times):
+    """Slots touched by each booking; windows that end at or before they start run to midnight"""
+    start, end = _minutes(start_times), _minutes(end_times)
+    end = np.where(end <= start, 24 * 60, end)
+    return start // SLOT_MINUTES, -(-end // SLOT_MINUTES)
+
+
+class OccupancyAnalysis:
+    """Accumulates per-day occupancy into zone x weekday x slot totals"""
+
+    def __init__(self, start, end):
+        self.start, self.end = start, end
+        spots = list(ParkingSpot.objects.order_by('id').values_list('id', 'zone'))
+        self.zones = [code for code, _ in ParkingSpot.ZONE_CHOICES]
+        self.zones += sorted({zone for _, zone in spots} - set(self.zones))
+        self.spot_ids = np.array([spot_id for spot_id, _ in spots], dtype=np.int64)
+        spot_zone = np.array([self.zones.index(zone) for _, zone in spots], dtype=np.int32)
+        # zones x spots, turns a spots x slots matrix into zones x slots counts
+        self.zone_matrix = (spot_zone[None, :] == np.arange(len(self.zones))[:, None]).astype(np.int32)
+        self.spots_per_zone = self.zone_matrix.sum(axis=1)
+
+        self.occupied = np.zeros((len(self.zones), 7, SLOTS_PER_DAY), dtype=np.int64)
+        self.demand = np.zeros((7, SLOTS_PER_DAY), dtype=np.int64)
+        self.status_counts = dict.fromkeys(STATUSES, 0)
+        self.peak_occupancy = Peak(0, None, None)
+        self.peak_demand = Peak(0, None, None)
+        self.bookings = 0
+
+    def run(self):
+        rows = booking_rows(self.start, self.end)
+        pending = None
+        while True:
+            chunk = list(islice(rows, CHUNK_SIZE))
+            if not chunk:
+                break
+            columns = self._columns(chunk)
+            if pending is not None:
+                columns = {key: np.concatenate([pending[key], columns[key]]) for key in columns}
+            # Rows arrive in date order: every day before the last one is complete
+            last_day = columns['day'][-1]
+            done = columns['day'] < last_day
+            self._add_days({key: value[done] for key, value in columns.items()})
+            pending = {key: value[~done] for key, value in columns.items()}
+        if pending is not None:
+            self._add_days(pending)
+        return self
+
+    def _columns(self, chunk):
+        spot_ids, _, days, start_times, end_times, statuses = zip(*chunk)
+        start, end = _slot_range(start_times, end_times)
+        spot_ids = np.array([spot_id or 0 for spot_id in spot_ids], dtype=np.int64)
+        position = np.searchsorted(self.spot_ids, spot_ids)
+        position = np.minimum(position, len(self.spot_ids) - 1) if len(self.spot_ids) else position
+        known = (self.spot_ids[position] == spot_ids) if len(self.spot_ids) else np.zeros(len(chunk), bool)
+        return {
+            'day': np.array(days, dtype='datetime64[D]').astype(np.int64),
+            'spot': np.where(known, position, -1),
+            'start': start,
+            'end': end,
+            'status': np.array([STATUS_INDEX[status] for status in statuses], dtype=np.int8),
+        }
+
+    def _add_days(self, columns):
+        if not len(columns['day']):
+            return
+        self.bookings += len(columns['day'])
+        counts = np.bincount(columns['status'], minlength=len(STATUSES))
+        for status, count in zip(STATUSES, counts):
+            self.status_counts[status] += int(count)
+
+        occupying = np.isin(columns['status'], [STATUSES.index(s) for s in OCCUPYING]) & (columns['spot'] >= 0)
+        demanding = np.isin(columns['status'], [STATUSES.index(s) for s in DEMANDING])
+        days, first = np.unique(columns['day'], return_index=True)
+        bounds = list(first[1:]) + [len(columns['day'])]
+        for day, lo, hi in zip(days, first, bounds):
+            self._add_day(int(day), {key: value[lo:hi] for key, value in columns.items()},
+                          occupying[lo:hi], demanding[lo:hi])
+
+    def _add_day(self, epoch_day, rows, occupying, demanding):
+        day = EPOCH + timedelta(days=epoch_day)
+        weekday = day.weekday()
+        width = SLOTS_PER_DAY + 1
+
+        # spots x slots difference array: +1 where a booking starts, -1 after it ends
+        spot = rows['spot'][occupying]
+        size = len(self.spot_ids) * width
+        diff = (np.bincount(spot * width + rows['start'][occupying], minlength=size)
+                - np.bincount(spot * width + rows['end'][occupying], minlength=size))
+        taken = np.cumsum(diff.reshape(len(self.spot_ids), width), axis=1)[:, :SLOTS_PER_DAY] > 0
+        per_zone = self.zone_matrix @ taken
+        self.occupied[:, weekday, :] += per_zone
+        per_slot = per_zone.sum(axis=0)
+        if len(per_slot) and per_slot.max() > self.peak_occupancy.count:
+            self.peak_occupancy = Peak(int(per_slot.max()), day, _slot_time(int(per_slot.argmax())))
+
+        wanted = np.cumsum(
+            np.bincount(rows['start'][demanding], minlength=width)
+            - np.bincount(rows['end'][demanding], minlength=width)
+        )[:SLOTS_PER_DAY]
+        self.demand[weekday] += wanted
+        if wanted.max() > self.peak_demand.count:
+            self.peak_demand = Peak(int(wanted.max()), day, _slot_time(int(wanted.argmax())))
+
+    # Results ---------------------------------------------------------
+
+    def days_per_weekday(self):
+        days = np.zeros(7, dtype=np.int64)
+        total = (self.end - self.start).days + 1
+        days += total // 7
+        for offset in range(total % 7):
+            days[(self.start + timedelta(days=offset)).weekday()] += 1
+        return days
+
+    def heatmaps(self):
+        """``{zone: 7 x 24 array}`` of the share of spot-time in use per weekday and hour"""
+        capacity = self.days_per_weekday()[:, None] * SLOTS_PER_HOUR
+        hourly = self.occupied.reshape(len(self.zones), 7, 24, SLOTS_PER_HOUR).sum(axis=3)
+        maps = {}
+        for index, zone in enumerate(self.zones):
+            denominator = capacity * self.spots_per_zone[index]
+            maps[zone] = np.divide(hourly[index], denominator, out=np.zeros((7, 24)), where=denominator > 0)
+        return maps
+
+    def utilisation(self):
+        capacity = self.days_per_weekday().sum() * SLOTS_PER_DAY * len(self.spot_ids)
+        return float(self.occupied.sum() / capacity) if capacity else 0.0
+
+    def rates(self):
+        approved = self.status_counts['APPROVED'] + self.status_counts['COMPLETED']
+        decided = approved + self.status_counts['REJECTED']
+        return {
+            'approval_rate': approved / decided if decided else 0.0,
+            'rejection_rate': self.status_counts['REJECTED'] / decided if decided else 0.0,
+            'cancellation_rate': self.status_counts['CANCELLED'] / self.bookings if self.bookings else 0.0,
+        }
+
+
+HEAT_CLASSES = [
+    'bg-gray-50 text-gray-400',
+    'bg-indigo-100 text-indigo-900',
+    'bg-indigo-200 text-indigo-900',
+    'bg-indigo-300 text-indigo-900',
+    'bg-indigo-500 text-white',
+    'bg-indigo-700 text-white',
+]
+
+
+def heatmap_rows(matrix):
+    """``[(weekday, [(percent, css_class), ...]), ...]`` for a 7 x 24 heatmap"""
+    levels = np.minimum((matrix * len(HEAT_CLASSES)).astype(int), len(HEAT_CLASSES) - 1)
+    percent = np.rint(matrix * 100).astype(int)
+    return [
+        (WEEKDAYS[day], [(int(percent[day, hour]), HEAT_CLASSES[levels[day, hour]]) for hour in range(24)])
+        for day in range(7)
+    ]
+
+
+def _slot_time(slot):
+    minutes = slot * SLOT_MINUTES
+    return f'{minutes // 60:02d}:{minutes % 60:02d}'
@@ -0,0 +1,205 @@
+import hashlib
+from datetime import date, time
+
+from django.db.models import Count, Max, Sum
+from django.utils.cache import get_conditional_response
+from rest_framework import permissions, viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
+
+from .allocation import SpotIndex
+from .models import Booking, ParkingSpot, Ticket
+from .occupancy import get_occupancy_snapshot
+from .pagination import PAGE_SIZE, keyset_page
+from .serializers import BookingSerializer, SpotSerializer, TicketSerializer
+
+MAX_PAGE_SIZE = 100
+
+
+def make_etag(*parts):
+    return '"%s"' % hashlib.sha256(repr(parts).encode()).hexdigest()[:32]
+
+
+def conditional(request, etag, build_response):
+    """Answer 304 when ``If-None-Match`` matches, else build the response"""
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = build_response()
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination on ``(<view.cursor_field>, id)``, newest first"""
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        try:
+            size = min(int(request.query_params.get('page_size', PAGE_SIZE)), MAX_PAGE_SIZE)
+        except ValueError:
+            raise ValidationError({'page_size': 'Must be a number.'})
+        field = getattr(view, 'cursor_field', 'created_at')
+        items, self.next_cursor = keyset_page(queryset, request.query_params.get('cursor'), max(size, 1), field)
+        return items
+
+    def get_paginated_response(self, data):
+        next_url = None
+        if self.next_cursor:
+            next_url = replace_query_param(self.request.build_absolute_uri(), 'cursor', self.next_cursor)
+        return Response({'next': next_url, 'results': data})
+
+
+class SparseReadOnlyViewSet(viewsets.ReadOnlyModelViewSet):
+    """Read-only endpoints with ``?fields=``, narrow queries and ETags.
+
+    Subclasses set ``base_queryset(request)``, ``version_field`` (a
+    timestamp that changes with every write) and ``cursor_field``. Rows that
+    show a parking spot name the foreign key in ``spot_field``: spots change,
+    and bookings lose them through ``.update()``, without touching
+    ``version_field``, so the ETag also covers the spot ids and every spot row.
+    """
+    pagination_class = KeysetPagination
+    cursor_field = 'created_at'
+    version_field = 'updated_at'
+    spot_field = None
+
+    def fields(self):
+        return self.get_serializer_class().selected(self.request)
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        paths = self.get_serializer_class().only_paths(self.fields())
+        paths.add(self.cursor_field)
+        if self.spot_field:
+            paths.add(self.spot_field)
+        related = {path.rsplit('__', 1)[0] for path in paths if '__' in path}
+        return self.base_queryset().select_related(*related).only(*paths)
+
+    def etag_parts(self):
+        return (
+            self.request.user.pk, self.request.accepted_renderer.format,
+            self.request.get_full_path(),
+            get_occupancy_snapshot()['spots_version'] if self.spot_field else None,
+        )
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        # Row count and newest change time cover inserts, updates and deletes
+        aggregates = {'n': Count('pk'), 'last': Max(self.version_field)}
+        if self.spot_field:
+            aggregates.update(spots=Count(self.spot_field), spot_sum=Sum(self.spot_field))
+        seed = queryset.order_by().aggregate(**aggregates)
+        etag = make_etag(*sorted(seed.items()), *self.etag_parts())
+        return conditional(request, etag, lambda: super(SparseReadOnlyViewSet, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag = make_etag(self._path(instance, self.version_field), *self.etag_parts())
+        if self.spot_field:
+            etag = make_etag(etag, self._path(instance, f'{self.spot_field}_id'))
+        return conditional(request, etag, lambda: Response(self.get_serializer(instance).data))
+
+    @staticmethod
+    def _path(instance, path):
+        for attr in path.split('__'):
+            instance = getattr(instance, attr)
+        return instance
+
+
+class SpotViewSet(SparseReadOnlyViewSet):
+    serializer_class = SpotSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = None
+
+    def base_queryset(self):
+        return ParkingSpot.objects.all()
+
+    def get_queryset(self):
+        return self.base_queryset().only(*self.get_serializer_class().only_paths(self.fields()))
+
+    def spots_etag(self):
+        # The cached occupancy snapshot changes whenever a spot does
+        return make_etag(get_occupancy_snapshot()['spots_version'], *self.etag_parts())
+
+    def list(self, request, *args, **kwargs):
+        return conditional(request, self.spots_etag(), lambda: super(SparseReadOnlyViewSet, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return conditional(request, self.spots_etag(), lambda: super(SparseReadOnlyViewSet, self).retrieve(request, *args, **kwargs))
+
+
+class BookingViewSet(SparseReadOnlyViewSet):
+    serializer_class = BookingSerializer
+    lookup_field = 'booking_id'
+    spot_field = 'parking_spot'
+
+    def base_queryset(self):
+        return Booking.objects.filter(user=self.request.user)
+
+
+class TicketViewSet(SparseReadOnlyViewSet):
+    serializer_class = TicketSerializer
+    lookup_field = 'ticket_number'
+    cursor_field = 'issued_at'
+    version_field = 'booking__updated_at'
+    spot_field = 'booking__parking_spot'
+
+    def base_queryset(self):
+        return Ticket.objects.filter(booking__user=self.request.user)
+
+    def get_queryset(self):
+        # The ETag reads the booking's updated_at and spot
+        return super().get_queryset().select_related('booking').only(
+            *self.get_serializer_class().only_paths(self.fields()), self.cursor_field,
+            'booking__updated_at', self.spot_field,
+        )
+
+
+class AvailabilityView(APIView):
+    """Free spots now, or for ``?date=YYYY-MM-DD&start=HH:MM&end=HH:MM``"""
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        params = request.query_params
+        if not any(key in params for key in ('date', 'start', 'end')):
+            snapshot = get_occupancy_snapshot()
+            data = {
+                'total_spots': snapshot['total_spots'],
+                'available_spots': snapshot['available_spots'],
+                'occupied_spots': snapshot['occupied_spots'],
+                'zones': [
+                    {'zone': zone.code, 'label': zone.label, 'total': zone.total, 'available': zone.available}
+                    for zone in snapshot['zones']
+                ],
+            }
+        else:
+            try:
+                booking_date = date.fromisoformat(params.get('date', ''))
+                start_time = time.fromisoformat(params.get('start', ''))
+                end_time = time.fromisoformat(params.get('end', ''))
+            except ValueError:
+                raise ValidationError('date, start and end are required as YYYY-MM-DD, HH:MM and HH:MM.')
+
+            index = SpotIndex.for_date(booking_date, start_time, end_time)
+            zones = dict(ParkingSpot.objects.values_list('id', 'zone'))
+            free = {code: 0 for code, _ in ParkingSpot.ZONE_CHOICES}
+            for spot_id in index.iter_free(start_time, end_time):
+                free[zones[spot_id]] = free.get(zones[spot_id], 0) + 1
+            data = {
+                'date': booking_date,
+                'start': start_time,
+                'end': end_time,
+                'total_spots': len(index),
+                'free_spots': sum(free.values()),
+                'zones': [{'zone': code, 'free': count} for code, count in free.items()],
+            }
+
+        etag = make_etag(repr(data), request.accepted_renderer.format)
+        return conditional(request, etag, lambda: Response(data))
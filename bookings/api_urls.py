@@ -0,0 +1,14 @@
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
+
+from . import api
+
+router = DefaultRouter()
+router.register('spots', api.SpotViewSet, basename='api-spot')
+router.register('bookings', api.BookingViewSet, basename='api-booking')
+router.register('tickets', api.TicketViewSet, basename='api-ticket')
+
+urlpatterns = [
+    path('availability/', api.AvailabilityView.as_view(), name='api-availability'),
+    path('', include(router.urls)),
+]
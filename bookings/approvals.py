@@ -0,0 +1,182 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from .allocation import MINUTES_PER_DAY, SpotIndex
+from .models import Booking, BookingStat, ParkingSpot, Ticket
+from .occupancy import invalidate_occupancy
+
+# Rounds of re-allocation when spots are claimed by a concurrent approver
+CLAIM_ROUNDS = 3
+
+
+class ApprovalResult:
+    """Outcome of a batch approval"""
+
+    def __init__(self):
+        self.tickets = []
+        self.unassigned = []
+
+    @property
+    def approved(self):
+        return [ticket.booking for ticket in self.tickets]
+
+
+def _claim_spots(booking_date, bookings):
+    """Assign spots to ``bookings`` for one day, safe against other approvers.
+
+    Proposals come from a fresh ``SpotIndex``. The proposed spot rows are
+    then locked with ``SKIP LOCKED`` so concurrent workers never wait on
+    each other, and the day's approved bookings on the locked spots are
+    re-read to catch anything committed after the index was built. Losing
+    proposals go round again with the contested spots blocked out.
+
+    Returns ``(assigned, unassigned)`` where ``assigned`` is a list of
+    ``(booking, spot_id)``.
+    """
+    assigned = []
+    unassigned = []
+    blocked = set()
+    pending = bookings
+
+    for _ in range(CLAIM_ROUNDS):
+        index = SpotIndex.for_date(booking_date)
+        for spot_id in blocked:
+            index.reserve_minutes(spot_id, 0, MINUTES_PER_DAY)
+        for booking, spot_id in assigned:
+            index.reserve(spot_id, booking.start_time, booking.end_time)
+
+        proposals = []
+        for booking in pending:
+            spot_id = index.find_free(booking.start_time, booking.end_time)
+            if spot_id is None:
+                unassigned.append(booking)
+                continue
+            index.reserve(spot_id, booking.start_time, booking.end_time)
+            proposals.append((booking, spot_id))
+        if not proposals:
+            return assigned, unassigned
+
+        wanted = {spot_id for _, spot_id in proposals}
+        locked = set(
+            ParkingSpot.objects.select_for_update(skip_locked=True)
+            .filter(pk__in=wanted, in_service=True)
+            .values_list('pk', flat=True)
+        )
+        blocked |= wanted - locked
+
+        # Another approver may have committed on these spots since we looked
+        fresh = SpotIndex(locked)
+        for spot_id, start, end in Booking.objects.filter(
+            booking_date=booking_date, status='APPROVED', parking_spot_id__in=locked,
+        ).values_list('parking_spot_id', 'start_time', 'end_time'):
+            fresh.reserve(spot_id, start, end)
+        for booking, spot_id in assigned:
+            fresh.reserve(spot_id, booking.start_time, booking.end_time)
+
+        pending = []
+        for booking, spot_id in proposals:
+            if fresh.is_free(spot_id, booking.start_time, booking.end_time):
+                fresh.reserve(spot_id, booking.start_time, booking.end_time)
+                assigned.append((booking, spot_id))
+            else:
+                pending.append(booking)
+        if not pending:
+            break
+
+    unassigned.extend(pending)
+    return assigned, unassigned
+
+
+def approve_bookings(booking_ids, approver):
+    """Approve the ``WAITING`` bookings in ``booking_ids`` in one transaction.
+
+    Bookings are served oldest first. Booking rows are locked with
+    ``SKIP LOCKED``, so two admins approving overlapping selections split
+    the work instead of blocking, and the ``WAITING`` -> ``APPROVED`` update
+    only applies to rows whose status is still unchanged. Bookings for which
+    no spot is free stay ``WAITING`` and are listed in ``unassigned``.
+    """
+    result = ApprovalResult()
+    now = timezone.now()
+
+    with transaction.atomic():
+        bookings = Booking.objects.select_for_update(skip_locked=True).filter(
+            pk__in=list(booking_ids), status='WAITING',
+        ).order_by('created_at', 'id')
+
+        by_date = defaultdict(list)
+        for booking in bookings:
+            by_date[booking.booking_date].append(booking)
+
+        approved = []
+        for booking_date, day_bookings in by_date.items():
+            assigned, unassigned = _claim_spots(booking_date, day_bookings)
+            result.unassigned.extend(unassigned)
+            for booking, spot_id in assigned:
+                booking.parking_spot_id = spot_id
+                approved.append(booking)
+
+        if not approved:
+            return result
+
+        # Only the spot differs per booking; everything else is one UPDATE
+        approved_ids = [booking.pk for booking in approved]
+        updated = Booking.objects.filter(pk__in=approved_ids, status='WAITING').update(
+            status='APPROVED', approved_by=approver, approved_at=now, updated_at=now,
+        )
+        if updated != len(approved):
+            # Some rows changed under us (backend without row locks)
+            transitioned = set(Booking.objects.filter(
+                pk__in=approved_ids, status='APPROVED', approved_by=approver, approved_at=now,
+            ).values_list('pk', flat=True))
+            approved = [booking for booking in approved if booking.pk in transitioned]
+
+        removed = [booking._stat_state for booking in approved]
+        for booking in approved:
+            booking.status = 'APPROVED'
+            booking.approved_by = approver
+            booking.approved_at = now
+            booking.updated_at = now
+
+        Booking.objects.bulk_update(approved, ['parking_spot'], batch_size=500)
+        ParkingSpot.objects.filter(
+            pk__in={booking.parking_spot_id for booking in approved},
+        ).update(is_available=False)
+        for booking in approved:
+            booking._stat_state = booking.stat_state()
+        BookingStat.objects.shift(removed=removed, added=[booking._stat_state for booking in approved])
+        transaction.on_commit(invalidate_occupancy)
+        result.tickets = Ticket.objects.bulk_create(
+            [
+                Ticket(
+                    booking=booking,
+                    ticket_number=Ticket.generate_number(),
+                    qr_code=f"QR-{booking.booking_id}",
+                )
+                for booking in approved
+            ],
+            batch_size=500,
+        )
+    return result
+
+
+def reject_bookings(booking_ids):
+    """Reject the ``WAITING`` bookings in ``booking_ids``; returns the count"""
+    with transaction.atomic():
+        rows = list(
+            Booking.objects.select_for_update(of=('self',)).filter(
+                pk__in=list(booking_ids), status='WAITING',
+            ).values_list('pk', 'booking_date', 'parking_spot_id')
+        )
+        if not rows:
+            return 0
+        Booking.objects.filter(pk__in=[pk for pk, _, _ in rows]).update(
+            status='REJECTED', updated_at=timezone.now(),
+        )
+        BookingStat.objects.shift(
+            removed=[(day, spot_id, 'WAITING') for _, day, spot_id in rows],
+            added=[(day, spot_id, 'REJECTED') for _, day, spot_id in rows],
+        )
+    return len(rows)
@@ -0,0 +1,139 @@
+"""Async versions of the read-heavy views in ``views.py``.
+
+``urls.py`` routes to them when ``settings.ASYNC_VIEWS`` is on, which
+``config/asgi.py`` does: under ASGI a slow database round-trip then waits
+on the event loop instead of holding a worker.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.db import close_old_connections
+from django.db.models import Count, Q
+from django.shortcuts import aget_object_or_404, redirect, render
+
+from .models import Booking
+from .occupancy import aget_occupancy_snapshot
+from .pagination import akeyset_page, keyset_page
+from .tickets import qr_digest, qr_payload
+
+
+def _own_connection(call):
+    def run():
+        close_old_connections()
+        try:
+            return call()
+        finally:
+            # thread นี้ไม่ได้ผ่าน request_started/finished ต้องดูแล connection เอง
+            close_old_connections()
+    return run
+
+
+async def concurrently(*calls):
+    """รัน query ที่ไม่ขึ้นต่อกันพร้อมกัน แต่ละตัวบน thread และ connection ของตัวเอง
+
+    async ORM ของ Django คิวทุก query ของ request ไว้บน thread เดียว
+    ``asyncio.gather`` บน ``aget``/``acount`` เฉยๆ จึงยังรันทีละตัว
+    """
+    return await asyncio.gather(*(
+        sync_to_async(_own_connection(call), thread_sensitive=False)() for call in calls
+    ))
+
+
+async def _load_user(request):
+    # template อ่าน request.user แบบ lazy ซึ่งจะ query แบบ sync ไม่ได้ใน async view
+    request.user = await request.auser()
+    return request.user
+
+
+async def home(request):
+    """หน้าแรก - แสดงสถานะที่จอด"""
+    await _load_user(request)
+    return render(request, 'bookings/home.html', await aget_occupancy_snapshot())
+
+
+@login_required
+async def my_bookings(request):
+    """รายการจองของฉัน"""
+    user = await _load_user(request)
+    bookings = Booking.objects.filter(user=user)
+
+    # สรุปสถานะกับหน้าแรกของรายการไม่ขึ้นต่อกัน ยิงพร้อมกัน
+    stats, (page, next_cursor) = await concurrently(
+        lambda: bookings.aggregate(
+            total=Count('id'),
+            pending=Count('id', filter=Q(status='WAITING')),
+            approved=Count('id', filter=Q(status='APPROVED')),
+            rejected=Count('id', filter=Q(status='REJECTED')),
+        ),
+        lambda: keyset_page(bookings.select_related('parking_spot'), request.GET.get('cursor')),
+    )
+
+    context = {
+        'bookings': page,
+        'next_cursor': next_cursor,
+        **stats,
+    }
+    return render(request, 'bookings/my_bookings.html', context)
+
+
+@login_required
+async def my_bookings_more(request):
+    """โหลดรายการจองหน้าถัดไป (fragment สำหรับปุ่ม Load more)"""
+    user = await _load_user(request)
+    page, next_cursor = await akeyset_page(
+        Booking.objects.filter(user=user).select_related('parking_spot'),
+        request.GET.get('cursor'),
+    )
+    return render(request, 'bookings/my_bookings_page.html', {
+        'bookings': page,
+        'next_cursor': next_cursor,
+    })
+
+
+@login_required
+async def booking_detail(request, booking_id):
+    """รายละเอียดการจอง"""
+    user = await _load_user(request)
+    # ดึงตั๋วมาพร้อมการจองใน query เดียว
+    booking = await aget_object_or_404(
+        Booking.objects.select_related('parking_spot', 'approved_by', 'ticket'),
+        booking_id=booking_id, user=user,
+    )
+    booking.user = user
+
+    ticket = None
+    if booking.status == 'APPROVED':
+        ticket = getattr(booking, 'ticket', None)
+
+    return render(request, 'bookings/booking_detail.html', {
+        'booking': booking,
+        'ticket': ticket
+    })
+
+
+@login_required
+async def view_ticket(request, booking_id):
+    """ดูตั๋วจอดรถ"""
+    user = await _load_user(request)
+    booking = await aget_object_or_404(
+        Booking.objects.select_related('parking_spot', 'approved_by', 'ticket'),
+        booking_id=booking_id, user=user,
+    )
+    booking.user = user
+
+    if booking.status != 'APPROVED':
+        messages.error(request, '❌ การจองนี้ยังไม่ได้รับอนุมัติ')
+        return redirect('my_bookings')
+
+    ticket = getattr(booking, 'ticket', None)
+    if ticket is None:
+        messages.error(request, '❌ ยังไม่มีตั๋ว')
+        return redirect('my_bookings')
+
+    return render(request, 'bookings/ticket.html', {
+        'ticket': ticket,
+        'booking': booking,
+        'qr_digest': qr_digest(qr_payload(ticket)),
+    })
@@ -0,0 +1,45 @@
+"""Authentication backend that keeps the logged-in ``User`` in the cache.
+
+``AuthenticationMiddleware`` loads the user on every request; with this
+backend that is a cache hit instead of an ``auth_user`` query. The entry is
+dropped whenever the user row is saved or deleted (see ``signals.py``), so
+password, staff and active flag changes apply on the next request.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+# Safety net for changes made with queryset.update(), which sends no signals
+CACHE_TIMEOUT = 300
+
+
+def user_cache_key(user_id):
+    return f'auth-user:{user_id}'
+
+
+def invalidate_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            try:
+                user = get_user_model()._default_manager.get(pk=user_id)
+            except get_user_model().DoesNotExist:
+                return None
+            cache.set(key, user, CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = await cache.aget(key)
+        if user is None:
+            try:
+                user = await get_user_model()._default_manager.aget(pk=user_id)
+            except get_user_model().DoesNotExist:
+                return None
+            await cache.aset(key, user, CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,39 @@
+"""Per-user car lists, cached.
+
+The booking forms and *My Cars* read a user's cars on every render, while
+the list itself only changes when the user edits their garage.
+``UserCar`` saves and deletes drop the entry (see ``signals.py``); bulk
+writes such as the fleet import call ``invalidate_user_cars`` themselves.
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import UserCar
+
+# Safety net for caches that are not shared between worker processes
+CACHE_TIMEOUT = 300
+
+
+def cars_cache_key(user_id):
+    return f'user-cars:{user_id}'
+
+
+def user_cars(user):
+    """The user's cars as a list, default car first (``UserCar.Meta.ordering``)"""
+    key = cars_cache_key(user.pk)
+    cars = cache.get(key)
+    if cars is None:
+        cars = list(UserCar.objects.filter(user=user))
+        cache.set(key, cars, CACHE_TIMEOUT)
+    return cars
+
+
+def default_car(cars):
+    return next((car for car in cars if car.is_default), None)
+
+
+def invalidate_user_cars(user_id):
+    cache.delete(cars_cache_key(user_id))
+    # Drop it again at commit, in case another request re-read the old list
+    # while the transaction was still open
+    transaction.on_commit(lambda: cache.delete(cars_cache_key(user_id)))
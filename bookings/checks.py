@@ -0,0 +1,47 @@
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+from django.core.exceptions import ImproperlyConfigured
+
+from .ids import host_number
+
+FILE_CACHE = 'django.core.cache.backends.filebased.FileBasedCache'
+
+
+@register(Tags.caches)
+def check_file_cache_directories(app_configs, **kwargs):
+    """File caches unpickle whatever they find: only this user may write there.
+
+    A directory that does not exist yet is fine, Django creates it with
+    mode 700 on the first write.
+    """
+    if not hasattr(os, 'getuid'):
+        return []
+    errors = []
+    for alias, config in settings.CACHES.items():
+        if config.get('BACKEND') != FILE_CACHE:
+            continue
+        location = Path(config['LOCATION'])
+        try:
+            info = location.stat()
+        except FileNotFoundError:
+            continue
+        if info.st_uid != os.getuid() or info.st_mode & 0o077:
+            errors.append(Error(
+                f'Cache directory {location} ({alias!r}) must be owned by this user with mode 700.',
+                hint='The file cache loads pickles from it; point CACHE_LOCATION at a private directory.',
+                id='bookings.E001',
+            ))
+    return errors
+
+
+@register()
+def check_id_node(app_configs, **kwargs):
+    """Refuse to start with an ``ID_NODE`` that could repeat another host's IDs"""
+    try:
+        host_number()
+    except ImproperlyConfigured as exc:
+        return [Error(str(exc), id='bookings.E002')]
+    return []
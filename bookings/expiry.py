@@ -0,0 +1,121 @@
+import heapq
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import Booking, BookingStat, ParkingSpot
+from .occupancy import invalidate_occupancy
+
+# Bookings closed per transaction, so a backlog after downtime does not
+# hold row locks for long
+SWEEP_BATCH = 1000
+
+# Upcoming end times kept in memory by the sweeper loop
+HEAP_SIZE = 1000
+
+# How often the loop re-reads upcoming end times to see new approvals
+REFRESH_SECONDS = 60
+
+SweepResult = namedtuple('SweepResult', 'closed freed')
+
+
+def sweep(now=None):
+    """Close approved bookings that have ended and give their spots back.
+
+    Finished bookings are found through the partial ``ends_at`` index, so a
+    pass costs O(expired bookings) however long the history is. Each batch
+    is one UPDATE for the bookings and one for the spots; a spot is only
+    freed when none of its other approved bookings is still running.
+    """
+    now = now or timezone.now()
+    closed = freed = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                Booking.objects.select_for_update(skip_locked=True)
+                .filter(status='APPROVED', ends_at__lte=now)
+                .values_list('pk', 'booking_date', 'parking_spot_id')[:SWEEP_BATCH]
+            )
+            if not rows:
+                break
+            Booking.objects.filter(pk__in=[pk for pk, _, _ in rows]).update(
+                status='COMPLETED', updated_at=now,
+            )
+            BookingStat.objects.shift(
+                removed=[(day, spot_id, 'APPROVED') for _, day, spot_id in rows],
+                added=[(day, spot_id, 'COMPLETED') for _, day, spot_id in rows],
+            )
+            spot_ids = {spot_id for _, _, spot_id in rows if spot_id}
+            still_taken = Booking.objects.filter(parking_spot__in=spot_ids, status='APPROVED').values('parking_spot')
+            freed += ParkingSpot.objects.filter(pk__in=spot_ids, is_available=False).exclude(
+                pk__in=still_taken,
+            ).update(is_available=True)
+            transaction.on_commit(invalidate_occupancy)
+        closed += len(rows)
+        if len(rows) < SWEEP_BATCH:
+            break
+    return SweepResult(closed, freed)
+
+
+def upcoming_expiries(now, limit=HEAP_SIZE):
+    """The next ``limit`` distinct end times of approved bookings"""
+    return list(
+        Booking.objects.filter(status='APPROVED', ends_at__gt=now)
+        .order_by('ends_at').values_list('ends_at', flat=True).distinct()[:limit]
+    )
+
+
+class Sweeper:
+    """Sleep until the next booking ends, sweep, repeat.
+
+    A min-heap holds the next ``HEAP_SIZE`` end times, so the loop wakes
+    exactly when a booking finishes rather than polling. The heap is
+    reloaded every ``refresh`` seconds to pick up bookings approved since.
+    """
+
+    def __init__(self, refresh=REFRESH_SECONDS, clock=timezone.now, sleep=time.sleep):
+        self.refresh = timedelta(seconds=refresh)
+        self.clock = clock
+        self.sleep = sleep
+        self.heap = []
+        self.truncated = False
+        self.loaded_at = None
+
+    def load(self, now):
+        self.heap = upcoming_expiries(now)
+        heapq.heapify(self.heap)
+        # A full heap may have left later end times in the database
+        self.truncated = len(self.heap) == HEAP_SIZE
+        self.loaded_at = now
+
+    def next_wakeup(self):
+        wakeup = self.loaded_at + self.refresh
+        if self.heap and self.heap[0] < wakeup:
+            wakeup = self.heap[0]
+        return wakeup
+
+    def step(self):
+        """Sweep if anything is due; returns the ``SweepResult`` or ``None``"""
+        close_old_connections()
+        now = self.clock()
+        first = self.loaded_at is None
+        result = None
+        if first or (self.heap and self.heap[0] <= now):
+            result = sweep(now)
+            while self.heap and self.heap[0] <= now:
+                heapq.heappop(self.heap)
+        if first or now >= self.loaded_at + self.refresh or (self.truncated and not self.heap):
+            self.load(now)
+        return result
+
+    def run(self, on_sweep=None):
+        while True:
+            result = self.step()
+            if on_sweep and result and result.closed:
+                on_sweep(result)
+            delay = (self.next_wakeup() - self.clock()).total_seconds()
+            if delay > 0:
+                self.sleep(delay)
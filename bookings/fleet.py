@@ -0,0 +1,207 @@
+import csv
+import io
+import json
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Q, Value, When
+
+from .cars import invalidate_user_cars
+from .models import UserCar
+
+CHUNK_SIZE = 1000
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'x'}
+REPORT_HEADER = ['row', 'car_license', 'result', 'message']
+
+
+class FleetFormatError(ValueError):
+    pass
+
+
+def read_rows(fileobj, fmt):
+    """Return an iterator of dicts from a CSV or JSON fleet file (bytes or text).
+
+    Problems with the file as a whole raise ``FleetFormatError`` here, before
+    any row is processed.
+    """
+    if fmt == 'json':
+        try:
+            data = json.load(fileobj)
+        except ValueError as exc:
+            raise FleetFormatError(f'Invalid JSON: {exc}')
+        if isinstance(data, dict):
+            data = data.get('cars')
+        if not isinstance(data, list):
+            raise FleetFormatError('JSON must be a list of cars or {"cars": [...]}')
+        return iter(data)
+    if fmt == 'csv':
+        if not isinstance(fileobj, io.TextIOBase):
+            fileobj = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+        reader = csv.DictReader(fileobj)
+        try:
+            fieldnames = reader.fieldnames
+        except UnicodeDecodeError:
+            raise FleetFormatError('CSV must be UTF-8 encoded')
+        if not fieldnames or not {'car_license', 'car_model'} <= set(fieldnames):
+            raise FleetFormatError('CSV needs a header row with at least car_license and car_model')
+        return reader
+    raise FleetFormatError(f'Unknown format: {fmt}')
+
+
+def guess_format(filename):
+    return 'json' if filename.lower().endswith('.json') else 'csv'
+
+
+def normalize_plate(value):
+    return ' '.join(str(value or '').split())
+
+
+def _clean(row):
+    """Return ``(car, is_default)`` for a valid row, else ``(None, error)``"""
+    if not isinstance(row, dict):
+        return None, 'not an object'
+    plate = normalize_plate(row.get('car_license'))
+    model = str(row.get('car_model') or '').strip()
+    color = str(row.get('car_color') or '').strip()
+    if not plate:
+        return None, 'car_license is required'
+    if not model:
+        return None, 'car_model is required'
+    for field, value in (('car_license', plate), ('car_model', model), ('car_color', color)):
+        limit = UserCar._meta.get_field(field).max_length
+        if len(value) > limit:
+            return None, f'{field} is longer than {limit} characters'
+    is_default = row.get('is_default')
+    if not isinstance(is_default, bool):
+        is_default = str(is_default or '').strip().lower() in TRUE_VALUES
+    return UserCar(car_license=plate, car_model=model, car_color=color), is_default
+
+
+def import_fleet(user, rows, chunk_size=CHUNK_SIZE):
+    """Import cars for ``user``, yielding one report row per input row.
+
+    Plates are checked in memory against the user's existing plates and the
+    rest of the file, then inserted with ``bulk_create`` in chunks. The
+    default flag is settled with a single UPDATE at the end: the last row
+    marked ``is_default`` wins, and a user without cars gets the first
+    imported one, matching ``UserCar.save``. A file that stops decoding part
+    way gets an error row for the rest. The last report row is a summary.
+    """
+    existing = set(UserCar.objects.filter(user=user).values_list('car_license', flat=True))
+    had_cars = bool(existing)
+    seen = set()
+    pending = []
+    created = []
+    failed = 0
+    default_plate = None
+
+    def flush():
+        nonlocal failed
+        refused = _insert(pending)
+        # bulk_create skips the signals that drop the cached car list
+        invalidate_user_cars(user.pk)
+        for number, car in pending:
+            if number in refused:
+                failed += 1
+                yield [number, car.car_license, 'error', 'plate already registered']
+            else:
+                created.append(car.car_license)
+                yield [number, car.car_license, 'created', '']
+        pending.clear()
+
+    for number, row, broken in _numbered(rows):
+        if broken:
+            if pending:
+                yield from flush()
+            failed += 1
+            yield [number, '', 'error', broken]
+            break
+        car, detail = _clean(row)
+        if car is None:
+            failed += 1
+            plate = normalize_plate(row.get('car_license')) if isinstance(row, dict) else ''
+            yield [number, plate, 'error', detail]
+            continue
+        if car.car_license in existing:
+            failed += 1
+            yield [number, car.car_license, 'error', 'plate already registered']
+            continue
+        if car.car_license in seen:
+            failed += 1
+            yield [number, car.car_license, 'error', 'duplicate plate in file']
+            continue
+
+        seen.add(car.car_license)
+        car.user = user
+        pending.append((number, car))
+        if detail:
+            default_plate = car.car_license
+        if len(pending) >= chunk_size:
+            yield from flush()
+    if pending:
+        yield from flush()
+
+    if default_plate not in created:
+        default_plate = None if had_cars or not created else created[0]
+    if default_plate:
+        UserCar.objects.filter(user=user).filter(
+            Q(is_default=True) | Q(car_license=default_plate),
+        ).update(is_default=Case(When(car_license=default_plate, then=Value(True)), default=Value(False)))
+
+        invalidate_user_cars(user.pk)
+
+    yield ['', '', 'summary', f'{len(created)} created, {failed} failed']
+
+
+def _numbered(rows):
+    """``(number, row, None)`` per row.
+
+    A file that turns unreadable part way ends with ``(number, None, error)``
+    instead of raising in the middle of the streamed report.
+    """
+    rows = iter(rows)
+    number = 0
+    while True:
+        number += 1
+        try:
+            row = next(rows)
+        except StopIteration:
+            return
+        except UnicodeDecodeError:
+            yield number, None, 'file is not UTF-8 from here on; the rest was skipped'
+            return
+        except csv.Error as exc:
+            yield number, None, f'unreadable CSV ({exc}); the rest was skipped'
+            return
+        yield number, row, None
+
+
+def _insert(cars):
+    """Insert ``(number, car)`` pairs and return the numbers the unique constraint refused"""
+    try:
+        with transaction.atomic():
+            UserCar.objects.bulk_create([car for _, car in cars])
+        return set()
+    except IntegrityError:
+        pass
+    # A plate was added elsewhere since we read the existing set: one by one
+    refused = set()
+    for number, car in cars:
+        try:
+            with transaction.atomic():
+                UserCar.objects.bulk_create([car])
+        except IntegrityError:
+            refused.add(number)
+    return refused
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def stream_report(report):
+    """Yield report rows as CSV text, one line at a time"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(REPORT_HEADER)
+    for line in report:
+        yield writer.writerow(line)
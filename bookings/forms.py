@@ -1,8 +1,39 @@
+from datetime import timedelta
+
 from django import forms
+from django.forms.models import ModelChoiceIterator
 from .models import Booking, ParkingSpot, UserCar
+from .allocation import has_free_spot
+from .cars import default_car, user_cars
+from .recurring import FREQUENCY_CHOICES, MAX_OCCURRENCES, expand, find_conflicts
+
+class CachedChoiceIterator(ModelChoiceIterator):
+    """Options from the field's ``objects`` list instead of a fresh query"""
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        for obj in self.field.objects:
+            yield self.choice(obj)
+
+    def __len__(self):
+        return len(self.field.objects) + (self.field.empty_label is not None)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(self.field.objects)
+
+
+class CachedModelChoiceField(forms.ModelChoiceField):
+    """``ModelChoiceField`` that renders from an already loaded list.
+
+    Submitted values are still checked against ``queryset``.
+    """
+    iterator = CachedChoiceIterator
+    objects = ()
+
 
 class BookingForm(forms.ModelForm):
-    user_car = forms.ModelChoiceField(
+    user_car = CachedModelChoiceField(
         queryset=UserCar.objects.none(),  # Will be set in __init__
         required=False,
         widget=forms.Select(attrs={
@@ -67,15 +98,17 @@ class BookingForm(forms.ModelForm):
         super(BookingForm, self).__init__(*args, **kwargs)
         
         if user:
-            # Show only cars belonging to this user
+            # Show only cars belonging to this user (cached list, see cars.py)
+            cars = user_cars(user)
             self.fields['user_car'].queryset = UserCar.objects.filter(user=user)
+            self.fields['user_car'].objects = cars
             
             # Auto-select default car if user has one
-            default_car = UserCar.objects.filter(user=user, is_default=True).first()
-            if default_car and not self.instance.pk:
-                self.fields['user_car'].initial = default_car
-                self.fields['car_license'].initial = default_car.car_license
-                self.fields['car_model'].initial = default_car.car_model
+            default = default_car(cars)
+            if default and not self.instance.pk:
+                self.fields['user_car'].initial = default
+                self.fields['car_license'].initial = default.car_license
+                self.fields['car_model'].initial = default.car_model
     
     def clean(self):
         cleaned_data = super().clean()
@@ -94,4 +127,84 @@ class BookingForm(forms.ModelForm):
             if not car_model:
                 self.add_error('car_model', 'Please enter your car brand/model.')
         
+        booking_date = cleaned_data.get('booking_date')
+        start_time = cleaned_data.get('start_time')
+        end_time = cleaned_data.get('end_time')
+        if start_time and end_time and end_time <= start_time:
+            self.add_error('end_time', 'End time must be after the start time.')
+        elif booking_date and start_time and end_time:
+            self.check_availability(booking_date, start_time, end_time)
+        
         return cleaned_data
+    
+    def check_availability(self, booking_date, start_time, end_time):
+        """Reject requests that no parking spot could ever satisfy"""
+        if not has_free_spot(booking_date, start_time, end_time):
+            raise forms.ValidationError(
+                'No parking spot is available for the selected date and time. Please choose another time.'
+            )
+
+
+class RecurringBookingForm(BookingForm):
+    """BookingForm that repeats the booking until an end date"""
+    frequency = forms.ChoiceField(
+        choices=FREQUENCY_CHOICES,
+        initial='weekdays',
+        widget=forms.Select(attrs={
+            'class': 'w-full px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent',
+        }),
+        label='🔁 Repeat',
+    )
+    repeat_until = forms.DateField(
+        widget=forms.DateInput(attrs={
+            'class': 'w-full px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent',
+            'type': 'date'
+        }),
+        label='🏁 Repeat Until',
+    )
+    skip_conflicts = forms.BooleanField(
+        required=False,
+        widget=forms.CheckboxInput(attrs={
+            'class': 'rounded text-indigo-600 focus:ring-indigo-500'
+        }),
+        label='Skip dates that cannot be booked',
+        help_text='Otherwise the whole series is refused when any date is full or already booked.',
+    )
+    
+    def __init__(self, *args, **kwargs):
+        self.user = kwargs.get('user')
+        super().__init__(*args, **kwargs)
+        self.dates = []
+        self.conflicts = {}
+    
+    def check_availability(self, booking_date, start_time, end_time):
+        """Check every occurrence of the series at once"""
+        until = self.cleaned_data.get('repeat_until')
+        frequency = self.cleaned_data.get('frequency')
+        if not until or not frequency:
+            return
+        if until < booking_date:
+            self.add_error('repeat_until', 'The series must end on or after the booking date.')
+            return
+        if until - booking_date >= timedelta(days=MAX_OCCURRENCES):
+            self.add_error('repeat_until', 'A series can cover at most one year.')
+            return
+        
+        dates = expand(booking_date, until, frequency)
+        if not dates:
+            raise forms.ValidationError('The selected repeat rule has no dates in this range.')
+        
+        self.conflicts = find_conflicts(
+            self.user, self.cleaned_data.get('car_license'), dates, start_time, end_time,
+        )
+        if self.conflicts and not self.cleaned_data.get('skip_conflicts'):
+            listed = ', '.join(f'{day:%d/%m/%Y} ({reason})' for day, reason in sorted(self.conflicts.items())[:5])
+            more = len(self.conflicts) - 5
+            raise forms.ValidationError(
+                f'{len(self.conflicts)} of {len(dates)} dates cannot be booked: {listed}'
+                + (f' and {more} more' if more > 0 else '')
+                + '. Tick "Skip dates that cannot be booked" to book the rest.'
+            )
+        self.dates = [day for day in dates if day not in self.conflicts]
+        if not self.dates:
+            raise forms.ValidationError('None of the dates in this series can be booked.')
@@ -0,0 +1,184 @@
+"""Time-ordered identifiers for bookings and tickets.
+
+Layout (20 characters, e.g. ``PK20261018A3F9K20XYZ``)::
+
+    PK        prefix
+    20261018  UTC date
+    A3F9K2    milliseconds since UTC midnight, base 36, 6 digits
+    0         sequence within that millisecond, base 36
+    XYZ       node (process) id, base 36
+
+Base 36 digits sort the same way as their values, so IDs from one process
+are strictly increasing and IDs from different processes interleave in time
+order: inserts land at the right-hand edge of the unique index. Each process
+never repeats an ID, and two processes only differ by node, so every process
+needs a node of its own. The first two node digits are the host
+(``ID_NODE``) and the last one is a slot the process holds a lock on for its
+lifetime, so workers on one host never share a node. With a shared database
+(``DATABASE_URL``) every host must set its own ``ID_NODE``; only a local
+database may fall back to a hash of the host name.
+"""
+import hashlib
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from functools import lru_cache
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+DIGITS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+MS_PER_DAY = 24 * 60 * 60 * 1000
+SEQ_LIMIT = 36
+NODE_LIMIT = 36 ** 3
+
+# Last node digit: the process on its host
+PROCESS_SLOTS = 36
+
+# The last host block (nodes ZZ0-ZZZ) is never handed to a running app;
+# offline tools such as seed_parking write with TOOL_NODE
+HOST_LIMIT = NODE_LIMIT // PROCESS_SLOTS - 1
+TOOL_NODE = NODE_LIMIT - 1
+
+# Two digits per divmod in to_base36
+PAIRS = [high + low for high in DIGITS for low in DIGITS]
+
+
+def to_base36(value, width):
+    chars = []
+    for _ in range(width // 2):
+        value, pair = divmod(value, 36 * 36)
+        chars.append(PAIRS[pair])
+    if width % 2:
+        value, digit = divmod(value, 36)
+        chars.append(DIGITS[digit])
+    if value:
+        raise ValueError(f'{value} does not fit in {width} base 36 digits')
+    return ''.join(reversed(chars))
+
+
+@lru_cache(maxsize=8)
+def _day_stamp(day):
+    return f"{datetime.fromtimestamp(day * 86400, tz=dt_timezone.utc):%Y%m%d}"
+
+
+def compose_id(prefix, epoch_ms, seq, node):
+    """Build an ID from its parts (``epoch_ms`` is milliseconds since the Unix epoch)"""
+    day, ms = divmod(epoch_ms, MS_PER_DAY)
+    return f"{prefix}{_day_stamp(day)}{to_base36(ms, 6)}{DIGITS[seq]}{to_base36(node, 3)}"
+
+
+def host_number():
+    """``settings.ID_NODE``, or a hash of the host name for a local database.
+
+    Hashed host names can collide, so with ``DATABASE_URL`` set an explicit
+    ``ID_NODE`` is required; values outside ``0..HOST_LIMIT - 1`` are refused
+    rather than wrapped onto another host's number.
+    """
+    value = settings.ID_NODE
+    if value is None or str(value).strip() == '':
+        if getattr(settings, 'DATABASE_URL', None):
+            raise ImproperlyConfigured(
+                f'Set ID_NODE (0-{HOST_LIMIT - 1}) to a number no other host writing to this database uses'
+            )
+        host = int.from_bytes(hashlib.sha256(socket.gethostname().encode()).digest()[:4], 'big')
+        return host % HOST_LIMIT
+    try:
+        host = int(value)
+    except (TypeError, ValueError):
+        host = -1
+    if not 0 <= host < HOST_LIMIT:
+        raise ImproperlyConfigured(f'ID_NODE must be a whole number from 0 to {HOST_LIMIT - 1}, not {value!r}')
+    return host
+
+
+_slot = None  # (pid, slot, locked file)
+_slot_lock = threading.Lock()
+
+
+def process_slot():
+    """A slot no other live process on this host holds, kept until the process exits.
+
+    Each slot is a file in ``settings.ID_LOCK_DIR`` locked with ``flock``; the
+    kernel drops the lock when its process dies, so slots free themselves.
+    Without ``fcntl`` (Windows) the slot is the pid modulo ``PROCESS_SLOTS``,
+    which two local processes can share: run one process per ``ID_NODE`` there.
+    """
+    global _slot
+    with _slot_lock:
+        if _slot is not None and _slot[0] == os.getpid():
+            return _slot[1]
+        if fcntl is None:
+            # No uniqueness guarantee between processes, see the docstring
+            return os.getpid() % PROCESS_SLOTS
+        if _slot is not None:
+            # Forked child: the inherited descriptor still holds the parent's slot
+            _slot[2].close()
+            _slot = None
+        lock_dir = Path(settings.ID_LOCK_DIR)
+        lock_dir.mkdir(parents=True, exist_ok=True)
+        for slot in range(PROCESS_SLOTS):
+            locked = open(lock_dir / f'slot-{slot:02d}.lock', 'a')
+            try:
+                fcntl.flock(locked, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                locked.close()
+                continue
+            _slot = (os.getpid(), slot, locked)
+            return slot
+        raise RuntimeError(f'All {PROCESS_SLOTS} ID slots in {lock_dir} are held by running processes')
+
+
+def default_node():
+    """This process's node: its host number and its slot on the host"""
+    return host_number() * PROCESS_SLOTS + process_slot()
+
+
+class IdGenerator:
+    """Monotonic ID source; one per process, safe to share between threads"""
+
+    def __init__(self, node=None, clock=time.time):
+        self._fixed_node = node
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def _reset(self):
+        # Also runs in a forked child, which must not continue the parent's sequence
+        self._pid = os.getpid()
+        self.node = self._fixed_node if self._fixed_node is not None else default_node()
+        self._last_ms = 0
+        self._seq = 0
+
+    def next(self, prefix):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            now = int(self._clock() * 1000)
+            if now > self._last_ms:
+                self._last_ms, self._seq = now, 0
+            else:
+                # Same millisecond, or the clock stepped back: keep counting
+                self._seq += 1
+                if self._seq == SEQ_LIMIT:
+                    self._last_ms, self._seq = self._last_ms + 1, 0
+            return compose_id(prefix, self._last_ms, self._seq, self.node)
+
+
+_generator = IdGenerator()
+
+
+def new_booking_id():
+    return _generator.next('PK')
+
+
+def new_ticket_number():
+    return _generator.next('TK')
@@ -0,0 +1,73 @@
+import random
+import time
+from datetime import time as dtime
+
+from django.core.management.base import BaseCommand
+
+from bookings.allocation import SpotIndex, interval
+
+
+def _random_window(rng):
+    start = rng.randrange(6 * 60, 20 * 60)
+    length = rng.choice([30, 45, 60, 90, 120, 180, 240, 480])
+    end = min(start + length, 24 * 60 - 1)
+    return dtime(start // 60, start % 60), dtime(end // 60, end % 60)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the spot allocation index with synthetic bookings for one day'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--spots', type=int, default=5000)
+        parser.add_argument('--bookings', type=int, default=50000)
+        parser.add_argument('--baseline', type=int, default=2000,
+                            help='Requests to replay against the naive linear scan (0 to skip)')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        spot_ids = list(range(1, options['spots'] + 1))
+        requests = [_random_window(rng) for _ in range(options['bookings'])]
+
+        index = SpotIndex(spot_ids)
+        assigned = 0
+        started = time.perf_counter()
+        for start, end in requests:
+            spot_id = index.find_free(start, end)
+            if spot_id is not None:
+                index.reserve(spot_id, start, end)
+                assigned += 1
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(f"spots={len(spot_ids)} requests={len(requests)} assigned={assigned}")
+        self.stdout.write(
+            f"index: {elapsed:.3f}s total, {elapsed / len(requests) * 1e6:.1f} us/request, "
+            f"{len(requests) / elapsed:,.0f} requests/s"
+        )
+
+        started = time.perf_counter()
+        probes = 0
+        for start, end in requests[:10000]:
+            index.free_count(start, end)
+            probes += 1
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"free_count on full day: {elapsed / probes * 1e6:.1f} us/lookup")
+
+        if options['baseline']:
+            self._baseline(spot_ids, requests[:options['baseline']])
+
+    def _baseline(self, spot_ids, requests):
+        """Replay requests against per-spot interval lists with a linear scan"""
+        schedule = {spot_id: [] for spot_id in spot_ids}
+        started = time.perf_counter()
+        for start_time, end_time in requests:
+            start, end = interval(start_time, end_time)
+            for spot_id in spot_ids:
+                if all(end <= s or start >= e for s, e in schedule[spot_id]):
+                    schedule[spot_id].append((start, end))
+                    break
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"linear scan baseline (first {len(requests)} requests): "
+            f"{elapsed / len(requests) * 1e6:.1f} us/request"
+        )
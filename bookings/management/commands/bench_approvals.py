@@ -0,0 +1,144 @@
+import multiprocessing
+import random
+import time
+from collections import defaultdict
+from datetime import date, time as dtime, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from bookings.allocation import interval
+from bookings.approvals import approve_bookings
+from bookings.models import Booking, BookingStat, ParkingSpot, Ticket
+
+SPOT_PREFIX = 'BN'
+USER_NAME = 'bench-user'
+APPROVER_NAME = 'bench-approver'
+
+
+def _worker(approver_id, batch, seed, counter):
+    """Keep approving random batches of waiting bench bookings until none can be placed"""
+    connections.close_all()
+    rng = random.Random(seed)
+    approver = User.objects.get(pk=approver_id)
+    hopeless = set()
+    while True:
+        waiting = [
+            pk for pk in Booking.objects.filter(
+                user__username=USER_NAME, status='WAITING',
+            ).values_list('pk', flat=True)
+            if pk not in hopeless
+        ]
+        if not waiting:
+            break
+        picked = rng.sample(waiting, min(batch, len(waiting)))
+        result = approve_bookings(picked, approver)
+        hopeless.update(booking.pk for booking in result.unassigned)
+        with counter.get_lock():
+            counter.value += len(result.tickets)
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        'Stress concurrent approvals from several processes and check for double-assigned spots. '
+        'Creates and removes its own bench spots, users and bookings in the configured database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', default='1,2,4,8', help='Comma separated worker counts')
+        parser.add_argument('--spots', type=int, default=200)
+        parser.add_argument('--bookings', type=int, default=2000)
+        parser.add_argument('--batch', type=int, default=20, help='Bookings per approval call')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if ParkingSpot.objects.filter(spot_number__startswith=SPOT_PREFIX).exists():
+            raise CommandError(f'Spots starting with {SPOT_PREFIX!r} already exist; clean them up first.')
+
+        context = multiprocessing.get_context('fork')
+        worker_counts = [int(n) for n in options['workers'].split(',')]
+        user, approver = self._setup(options)
+        try:
+            for workers in worker_counts:
+                self._reset()
+                counter = context.Value('i', 0)
+                connections.close_all()
+                processes = [
+                    context.Process(
+                        target=_worker,
+                        args=(approver.pk, options['batch'], options['seed'] + n, counter),
+                    )
+                    for n in range(workers)
+                ]
+                started = time.perf_counter()
+                for process in processes:
+                    process.start()
+                for process in processes:
+                    process.join()
+                elapsed = time.perf_counter() - started
+
+                approved, doubles, ticket_mismatch = self._verify()
+                self.stdout.write(
+                    f"workers={workers:<3} approved={approved:<6} "
+                    f"{approved / elapsed:8.1f} approvals/s  "
+                    f"double-assigned={doubles} ticket-mismatch={ticket_mismatch}"
+                )
+                if doubles or ticket_mismatch or counter.value != approved:
+                    raise CommandError('Concurrent approval produced inconsistent results')
+        finally:
+            self._cleanup()
+
+    def _setup(self, options):
+        rng = random.Random(options['seed'])
+        zones = [code for code, _ in ParkingSpot.ZONE_CHOICES]
+        ParkingSpot.objects.bulk_create([
+            ParkingSpot(spot_number=f'{SPOT_PREFIX}{n:04d}', zone=zones[n % len(zones)])
+            for n in range(options['spots'])
+        ])
+        user = User.objects.create_user(USER_NAME)
+        approver = User.objects.create_user(APPROVER_NAME, is_staff=True)
+        day = date.today() + timedelta(days=1)
+        bookings = []
+        for _ in range(options['bookings']):
+            start = rng.randrange(7 * 60, 18 * 60)
+            end = start + rng.choice([60, 120, 240])
+            bookings.append(Booking(
+                booking_id=f"BN{len(bookings):08d}",
+                user=user, car_license='BENCH', car_model='Bench', phone_number='0',
+                booking_date=day,
+                start_time=dtime(start // 60, start % 60),
+                end_time=dtime(end // 60, end % 60),
+            ))
+        Booking.objects.bulk_create(bookings, batch_size=500)
+        return user, approver
+
+    def _reset(self):
+        bookings = Booking.objects.filter(user__username=USER_NAME)
+        Ticket.objects.filter(booking__in=bookings).delete()
+        bookings.update(status='WAITING', parking_spot=None, approved_by=None, approved_at=None)
+
+    def _verify(self):
+        windows = defaultdict(list)
+        approved = 0
+        for spot_id, day, start, end in Booking.objects.filter(
+            user__username=USER_NAME, status='APPROVED',
+        ).values_list('parking_spot_id', 'booking_date', 'start_time', 'end_time'):
+            approved += 1
+            windows[spot_id, day].append(interval(start, end))
+
+        doubles = 0
+        for spans in windows.values():
+            spans.sort()
+            doubles += sum(1 for a, b in zip(spans, spans[1:]) if b[0] < a[1])
+
+        tickets = Ticket.objects.filter(booking__user__username=USER_NAME).count()
+        return approved, doubles, tickets != approved
+
+    def _cleanup(self):
+        Booking.objects.filter(user__username=USER_NAME).delete()
+        ParkingSpot.objects.filter(spot_number__startswith=SPOT_PREFIX).delete()
+        User.objects.filter(username__in=[USER_NAME, APPROVER_NAME]).delete()
+        # _reset() rewinds bookings with a bulk update behind the counters' back
+        BookingStat.objects.rebuild()
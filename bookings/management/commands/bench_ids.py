@@ -0,0 +1,76 @@
+import time
+import uuid
+from datetime import date, time as dtime
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from bookings.ids import IdGenerator
+from bookings.models import Booking
+
+
+class Rollback(Exception):
+    pass
+
+
+def legacy_booking_id():
+    """The previous scheme: date + 6 random hex characters"""
+    return f"PK{timezone.now().strftime('%Y%m%d')}{uuid.uuid4().hex[:6].upper()}"
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the time-ordered booking IDs with the previous random suffix scheme: '
+        'generation speed, collisions, and insert throughput into the unique index. '
+        'Inserted rows are rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200_000)
+        parser.add_argument('--batch', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        generator = IdGenerator()
+        schemes = [
+            ('random suffix', legacy_booking_id),
+            ('time-ordered', lambda: generator.next('PK')),
+        ]
+
+        for name, make_id in schemes:
+            started = time.perf_counter()
+            ids = [make_id() for _ in range(rows)]
+            generated = time.perf_counter() - started
+
+            collisions = rows - len(set(ids))
+            ordered = all(a < b for a, b in zip(ids, ids[1:]))
+            ids = list(dict.fromkeys(ids))
+            elapsed = self._insert(ids, options['batch'])
+            self.stdout.write(
+                f"{name:<14} {generated / rows * 1e9:7.0f} ns/id  "
+                f"collisions={collisions:<5} monotonic={ordered!s:<5}  "
+                f"insert {len(ids) / elapsed:9.0f} rows/s"
+            )
+
+    def _insert(self, ids, batch):
+        day = date.today()
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user('bench-ids-user')
+                started = time.perf_counter()
+                for offset in range(0, len(ids), batch):
+                    Booking.objects.bulk_create([
+                        Booking(
+                            booking_id=booking_id, user=user,
+                            car_license='BENCH', car_model='Bench', phone_number='0',
+                            booking_date=day, start_time=dtime(8), end_time=dtime(9),
+                        )
+                        for booking_id in ids[offset:offset + batch]
+                    ])
+                elapsed = time.perf_counter() - started
+                raise Rollback
+        except Rollback:
+            pass
+        return elapsed
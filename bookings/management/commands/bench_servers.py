@@ -0,0 +1,157 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+
+def server_commands(port, workers):
+    return [
+        ('WSGI gunicorn', 'False', [
+            sys.executable, '-m', 'gunicorn', 'config.wsgi:application',
+            '--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--log-level', 'warning',
+        ]),
+        ('ASGI uvicorn', 'True', [
+            sys.executable, '-m', 'uvicorn', 'config.asgi:application',
+            '--port', str(port), '--workers', str(workers), '--log-level', 'warning', '--no-access-log',
+        ]),
+    ]
+
+
+# Loaded by the server processes only, through PYTHONPATH
+LATENCY_HOOK = """\
+import time
+from django.db.backends import utils
+
+_execute = utils.CursorWrapper._execute
+
+
+def _slow_execute(self, *args, **kwargs):
+    time.sleep({seconds})
+    return _execute(self, *args, **kwargs)
+
+
+utils.CursorWrapper._execute = _slow_execute
+"""
+
+
+def wait_for_port(port, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f'Server did not start listening on port {port}')
+
+
+async def fetch(port, path, cookie):
+    """One request on a fresh connection; returns the status code"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        writer.write(
+            f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nCookie: {cookie}\r\nConnection: close\r\n\r\n'.encode()
+        )
+        await writer.drain()
+        status_line = await reader.readline()
+        while await reader.read(65536):
+            pass
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def load(port, paths, cookie, clients, requests):
+    """``requests`` requests spread over ``clients`` concurrent connections"""
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def client():
+        nonlocal errors
+        for n in remaining:
+            started = time.perf_counter()
+            try:
+                status = await fetch(port, paths[n % len(paths)], cookie)
+            except OSError:
+                status = None
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return time.perf_counter() - started, sorted(latencies), errors
+
+
+class Command(BaseCommand):
+    help = (
+        'Start the app under WSGI (gunicorn, sync workers) and ASGI (uvicorn, async read views) '
+        'in turn and compare requests/sec and latency percentiles at the same concurrency.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', default='u', help='Logged-in user for the booking pages')
+        parser.add_argument('--clients', type=int, default=200)
+        parser.add_argument('--requests', type=int, default=4000)
+        parser.add_argument('--workers', type=int, default=3)
+        parser.add_argument('--port', type=int, default=8599)
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='Path to request (repeatable); defaults to home and my bookings')
+        parser.add_argument('--db-latency', type=float, default=0,
+                            help='Milliseconds added to every query in the servers, to mimic a remote database')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['user']}' does not exist")
+
+        client = Client()
+        client.force_login(user)
+        cookie = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+        paths = options['paths'] or ['/', '/my-bookings/']
+        port = options['port']
+
+        self.stdout.write(
+            f"{options['requests']} requests, {options['clients']} concurrent clients, "
+            f"{options['workers']} workers, {options['db_latency']:g} ms per query, paths: {', '.join(paths)}"
+        )
+        with tempfile.TemporaryDirectory() as hook_dir:
+            pythonpath = os.environ.get('PYTHONPATH', '')
+            if options['db_latency']:
+                with open(os.path.join(hook_dir, 'sitecustomize.py'), 'w') as hook:
+                    hook.write(LATENCY_HOOK.format(seconds=options['db_latency'] / 1000))
+                pythonpath = os.pathsep.join(filter(None, [hook_dir, pythonpath]))
+            for name, async_views, command in server_commands(port, options['workers']):
+                env = {**os.environ, 'ASYNC_VIEWS': async_views, 'PYTHONPATH': pythonpath}
+                self._run(name, command, env, port, paths, cookie, options)
+
+    def _run(self, name, command, env, port, paths, cookie, options):
+        server = subprocess.Popen(command, env=env, cwd=settings.BASE_DIR)
+        try:
+            wait_for_port(port)
+            # Warm up imports, template caches and connections in every worker
+            asyncio.run(load(port, paths, cookie, options['workers'] * 2, options['workers'] * 20))
+            elapsed, latencies, errors = asyncio.run(
+                load(port, paths, cookie, options['clients'], options['requests'])
+            )
+        finally:
+            server.terminate()
+            server.wait()
+
+        def pct(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+        self.stdout.write(
+            f"{name:<14} {len(latencies) / elapsed:8.1f} req/s  "
+            f"p50 {pct(0.50):7.1f} ms  p99 {pct(0.99):7.1f} ms  errors {errors}"
+        )
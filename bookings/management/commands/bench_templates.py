@@ -0,0 +1,136 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.template.backends.django import DjangoTemplates
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+
+from bookings.models import Booking, BookingStat
+from bookings.occupancy import build_occupancy_snapshot
+
+PLAIN_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+NO_FRAGMENTS = {
+    **settings.CACHES,
+    'fragments': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+def engine(loaders):
+    """A template backend like settings.TEMPLATES but with the given loaders"""
+    config = settings.TEMPLATES[0]
+    return DjangoTemplates({
+        'NAME': 'bench',
+        'DIRS': config['DIRS'],
+        'APP_DIRS': False,
+        'OPTIONS': {**config['OPTIONS'], 'loaders': loaders},
+    })
+
+
+class Command(BaseCommand):
+    help = (
+        'Time rendering of the main pages with a plain template loader, the cached loader, '
+        'and the cached loader with warm fragment caches, plus a warm render after one row changed. '
+        'Contexts are loaded from the database up front, so only rendering is timed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', default='u', help='User whose bookings fill my bookings')
+        parser.add_argument('--rows', type=int, default=100, help='Booking rows per list')
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['user']}' does not exist")
+        staff = User.objects.filter(is_staff=True).first() or user
+        rows = options['rows']
+
+        pages = [
+            ('home.html', AnonymousUser(), build_occupancy_snapshot(), None),
+            ('my_bookings.html', user, self._my_bookings(user, rows), 'bookings'),
+            ('admin_dashboard.html', staff, self._dashboard(rows), 'waiting_bookings'),
+        ]
+        plain = engine(PLAIN_LOADERS)
+        cached = engine([('django.template.loaders.cached.Loader', PLAIN_LOADERS)])
+
+        self.stdout.write(f"{options['repeat']} renders each, {rows} rows per list, ms per render")
+        self.stdout.write(f"{'template':<22}{'plain':>10}{'cached':>10}{'+fragments':>12}{'1 changed':>11}")
+        for name, viewer, context, row_key in pages:
+            template_name = f'bookings/{name}'
+            results = []
+            with override_settings(CACHES=NO_FRAGMENTS):
+                for backend in (plain, cached):
+                    results.append(self._time(backend, template_name, viewer, context, options['repeat']))
+
+            caches['fragments'].clear()
+            results.append(self._time(cached, template_name, viewer, context, options['repeat']))
+            results.append(self._changed(cached, template_name, viewer, context, row_key, options['repeat']))
+
+            self.stdout.write(
+                f"{name:<22}" + f"{results[0]:10.2f}{results[1]:10.2f}{results[2]:12.2f}"
+                + (f"{results[3]:11.2f}" if results[3] is not None else f"{'-':>11}")
+            )
+
+    def _my_bookings(self, user, rows):
+        bookings = Booking.objects.filter(user=user)
+        return {
+            'bookings': list(bookings.select_related('parking_spot').order_by('-created_at', '-id')[:rows]),
+            'next_cursor': None,
+            'total': 0, 'pending': 0, 'approved': 0, 'rejected': 0,
+        }
+
+    def _dashboard(self, rows):
+        totals = BookingStat.objects.totals()
+        return {
+            'waiting_bookings': list(
+                Booking.objects.filter(status='WAITING').select_related('user').order_by('-created_at', '-id')[:rows]
+            ),
+            'next_cursor': None,
+            'approved_bookings': list(
+                Booking.objects.filter(status='APPROVED')
+                .select_related('user', 'parking_spot', 'approved_by').order_by('-created_at', '-id')[:5]
+            ),
+            'waiting_count': totals.get('WAITING', 0),
+            'approved_count': totals.get('APPROVED', 0),
+            'total_count': sum(totals.values()),
+        }
+
+    def _request(self, viewer):
+        request = RequestFactory().get('/')
+        request.user = viewer
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        return request
+
+    def _time(self, backend, template_name, viewer, context, repeat):
+        template = backend.get_template(template_name)
+        template.render(context, self._request(viewer))  # warm up
+        started = time.perf_counter()
+        for _ in range(repeat):
+            template.render(context, self._request(viewer))
+        return (time.perf_counter() - started) / repeat * 1000
+
+    def _changed(self, backend, template_name, viewer, context, row_key, repeat):
+        """Warm render where one row's ``updated_at`` moved on each time"""
+        if not context.get(row_key):
+            return None
+        template = backend.get_template(template_name)
+        booking = context[row_key][0]
+        original = booking.updated_at
+        started = time.perf_counter()
+        try:
+            for _ in range(repeat):
+                booking.updated_at = timezone.now()
+                template.render(context, self._request(viewer))
+        finally:
+            booking.updated_at = original
+        return (time.perf_counter() - started) / repeat * 1000
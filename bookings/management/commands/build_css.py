@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from bookings import stylesheet
+
+
+class Command(BaseCommand):
+    help = (
+        'Write bookings/css/app.css with rules for the utility classes used in the templates '
+        'and form widgets. collectstatic runs this first.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only report whether app.css is up to date; exit 1 if not, or if a '
+                                 'class attribute uses a name no rule covers')
+
+    def handle(self, *args, **options):
+        missing = stylesheet.unstyled()
+        if missing:
+            names = ', '.join(f"{name} ({', '.join(files)})" for name, files in sorted(missing.items()))
+            raise CommandError(
+                f'No rule for {names}. Add the utility to bookings/stylesheet.py, '
+                f'or the name to CUSTOM_CLASSES if it is styled elsewhere.'
+            )
+        css, count = stylesheet.build(stylesheet.scan())
+        output = stylesheet.OUTPUT
+        current = output.read_text(encoding='utf-8') if output.exists() else None
+        if options['check']:
+            if current != css:
+                raise CommandError(f'{output} is out of date, run manage.py build_css')
+            self.stdout.write(f'{output} is up to date ({count} utilities).')
+            return
+        if current != css:
+            output.parent.mkdir(parents=True, exist_ok=True)
+            output.write_text(css, encoding='utf-8')
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {count} utilities, {len(css.encode()) / 1024:.1f} KiB to {output}.'
+        ))
@@ -0,0 +1,141 @@
+import random
+import re
+from datetime import date, time as dtime, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from bookings.models import Booking, ParkingSpot, Ticket, UserCar, booking_ends_at
+from bookings.pagination import PAGE_SIZE
+
+SQLITE_SCAN = re.compile(r'\bSCAN (\w+)(?!.*\bUSING\b)')
+POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+class Rollback(Exception):
+    pass
+
+
+def hot_queries(user, car, booking, day):
+    """The queries behind the busiest views in bookings/views.py"""
+    return [
+        ('my_bookings: stats', Booking.objects.filter(user=user).only('status')),
+        ('my_bookings: page', Booking.objects.filter(user=user).select_related('parking_spot')
+            .order_by('-created_at', '-id')[:PAGE_SIZE + 1]),
+        ('my_bookings: next page', Booking.objects.filter(user=user, created_at__lt=booking.created_at)
+            .select_related('parking_spot').order_by('-created_at', '-id')[:PAGE_SIZE + 1]),
+        ('admin_dashboard: waiting queue', Booking.objects.filter(status='WAITING').select_related('user')
+            .order_by('-created_at', '-id')[:PAGE_SIZE + 1]),
+        ('admin_dashboard: latest approved', Booking.objects.filter(status='APPROVED')
+            .select_related('user', 'parking_spot', 'approved_by').order_by('-created_at', '-id')[:5]),
+        ('booking_detail', Booking.objects.filter(booking_id=booking.booking_id, user=user)),
+        ('view_ticket', Ticket.objects.filter(booking=booking)),
+        ('print_tickets', Ticket.objects.filter(booking__booking_date=day, booking__status='APPROVED')
+            .select_related('booking', 'booking__user', 'booking__parking_spot')),
+        ('allocation: day index', Booking.objects.filter(
+            booking_date=day, status='APPROVED', parking_spot__isnull=False,
+        ).values_list('parking_spot_id', 'start_time', 'end_time')),
+        ('create_booking: default car', UserCar.objects.filter(user=user, is_default=True)),
+        ('my_cars', UserCar.objects.filter(user=user)),
+        ('delete_car: active bookings', Booking.objects.filter(user_car=car, status__in=['WAITING', 'APPROVED'])),
+        ('register: duplicate e-mail', User.objects.filter(email=user.email)),
+        ('sweeper: expired', Booking.objects.filter(status='APPROVED', ends_at__lte=timezone.now())
+            .values_list('pk', 'booking_date', 'parking_spot_id')),
+        ('sweeper: upcoming', Booking.objects.filter(status='APPROVED', ends_at__gt=timezone.now())
+            .order_by('ends_at').values_list('ends_at', flat=True).distinct()[:100]),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'EXPLAIN the hot queries of the booking views against seeded data and fail if any '
+        'of them needs a sequential scan. The seed data is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--bookings', type=int, default=5000)
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            raise CommandError(f'Unsupported database backend: {connection.vendor}')
+
+        failures = []
+        try:
+            with transaction.atomic():
+                queries = self._seed(options)
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+                    if connection.vendor == 'postgresql':
+                        # Tiny tables make seq scans look cheap; only accept
+                        # one when there is no index the planner could use
+                        cursor.execute('SET LOCAL enable_seqscan = off')
+
+                for name, queryset in queries:
+                    plan = queryset.explain()
+                    scans = self._scans(plan)
+                    status = self.style.ERROR('SEQ SCAN ' + ', '.join(scans)) if scans else self.style.SUCCESS('ok')
+                    self.stdout.write(f'{name:<36} {status}')
+                    if options['verbose_plans'] or scans:
+                        self.stdout.write('    ' + plan.replace('\n', '\n    '))
+                    if scans:
+                        failures.append(name)
+                raise Rollback
+        except Rollback:
+            pass
+
+        if failures:
+            raise CommandError(f'{len(failures)} hot queries fall back to a sequential scan')
+        self.stdout.write(self.style.SUCCESS('All hot queries use an index.'))
+
+    def _scans(self, plan):
+        pattern = SQLITE_SCAN if connection.vendor == 'sqlite' else POSTGRES_SCAN
+        return sorted({match.group(1) for match in pattern.finditer(plan)})
+
+    def _seed(self, options):
+        rng = random.Random(0)
+        zones = [code for code, _ in ParkingSpot.ZONE_CHOICES]
+        spots = ParkingSpot.objects.bulk_create([
+            ParkingSpot(spot_number=f'QP{n:04d}', zone=zones[n % len(zones)])
+            for n in range(100)
+        ])
+        users = User.objects.bulk_create([
+            User(username=f'qp-user-{n}', email=f'qp-user-{n}@example.com')
+            for n in range(options['users'])
+        ])
+        cars = UserCar.objects.bulk_create([
+            UserCar(user=user, car_license=f'QP{n:05d}', car_model='Plan', is_default=True)
+            for n, user in enumerate(users)
+        ])
+
+        day = date.today()
+        statuses = ['WAITING', 'APPROVED', 'APPROVED', 'REJECTED', 'CANCELLED', 'COMPLETED']
+        bookings = []
+        for n in range(options['bookings']):
+            status = rng.choice(statuses)
+            owner = rng.randrange(len(users))
+            booking_date = day + timedelta(days=rng.randrange(-60, 60))
+            bookings.append(Booking(
+                booking_id=f'QP{n:010d}',
+                user=users[owner], user_car=cars[owner],
+                parking_spot=rng.choice(spots) if status == 'APPROVED' else None,
+                car_license=cars[owner].car_license, car_model='Plan', phone_number='0',
+                booking_date=booking_date,
+                start_time=dtime(8), end_time=dtime(17),
+                ends_at=booking_ends_at(booking_date, dtime(8), dtime(17)),
+                status=status,
+            ))
+        bookings = Booking.objects.bulk_create(bookings, batch_size=500)
+        Ticket.objects.bulk_create(
+            [
+                Ticket(booking=booking, ticket_number=f'QPT{n:010d}')
+                for n, booking in enumerate(bookings) if booking.status == 'APPROVED'
+            ],
+            batch_size=500,
+        )
+
+        sample = Booking.objects.filter(status='APPROVED', booking_id__startswith='QP').first()
+        return hot_queries(sample.user, sample.user_car, sample, sample.booking_date)
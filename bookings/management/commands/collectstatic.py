@@ -0,0 +1,10 @@
+from django.contrib.staticfiles.management.commands.collectstatic import Command as CollectStaticCommand
+from django.core.management import call_command
+
+
+class Command(CollectStaticCommand):
+    """collectstatic that rebuilds app.css first, so the hashed copy is never stale"""
+
+    def handle(self, **options):
+        call_command('build_css', verbosity=options['verbosity'], stdout=self.stdout)
+        return super().handle(**options)
@@ -0,0 +1,28 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from bookings.fleet import FleetFormatError, guess_format, import_fleet, read_rows, stream_report
+
+
+class Command(BaseCommand):
+    help = 'Import a CSV or JSON fleet file as cars of one user and print a per-row CSV report.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'json'], help='Defaults to the file extension')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']!r} does not exist")
+
+        fmt = options['format'] or guess_format(options['path'])
+        with open(options['path'], 'rb') as f:
+            try:
+                rows = read_rows(f, fmt)
+            except FleetFormatError as exc:
+                raise CommandError(str(exc))
+            for line in stream_report(import_fleet(user, rows)):
+                self.stdout.write(line, ending='')
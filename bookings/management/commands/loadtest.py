@@ -0,0 +1,467 @@
+import http.client
+import json
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import time as time_of_day, timedelta
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from bookings.approvals import approve_bookings
+from bookings.cars import invalidate_user_cars
+from bookings.models import Booking, ParkingSpot, Ticket, UserCar
+from bookings.occupancy import invalidate_occupancy
+
+PREFIX = 'loadtest'
+PASSWORD = 'loadtest-password'
+
+# Share of requests per route, by URL name
+MIX = {
+    'home': 40,
+    'my_bookings': 25,
+    'view_ticket': 15,
+    'create_booking': 10,
+    'admin_dashboard': 5,
+    'approve_booking': 5,
+}
+
+PERCENTILES = (50, 95, 99)
+
+SERVER_TIMING = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+
+
+class Response:
+    __slots__ = ('status', 'server_timing', 'size')
+
+    def __init__(self, status, server_timing, size):
+        self.status = status
+        self.server_timing = server_timing
+        self.size = size
+
+
+class WsgiSession:
+    """Requests straight through Django's WSGI handler, no server or sockets"""
+
+    def __init__(self):
+        # The test client's default Host, 'testserver', is not in ALLOWED_HOSTS
+        self.client = Client(raise_request_exception=False, HTTP_HOST=_allowed_host())
+
+    def login(self, user):
+        # Skips the password hash; the login view itself is not under test
+        self.client.force_login(user)
+
+    def request(self, method, path, data=None):
+        if method == 'POST':
+            response = self.client.post(path, data)
+        else:
+            response = self.client.get(path)
+        return Response(response.status_code, response.headers.get('Server-Timing'), len(response.content))
+
+    def close(self):
+        pass
+
+
+class HttpSession:
+    """One keep-alive connection to a running server, with its own cookies"""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.cookies = {}
+        self.connection = None
+
+    def login(self, user):
+        self.request('GET', '/login/')
+        self.request('POST', '/login/', {'username': user.username, 'password': PASSWORD})
+        if settings.SESSION_COOKIE_NAME not in self.cookies:
+            raise CommandError(f'Could not log in as {user.username}')
+
+    def request(self, method, path, data=None):
+        headers = {'Cookie': '; '.join(f'{name}={value}' for name, value in self.cookies.items())}
+        body = None
+        if method == 'POST':
+            token = self.cookies.get(settings.CSRF_COOKIE_NAME, '')
+            body = urlencode({**(data or {}), 'csrfmiddlewaretoken': token})
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        for attempt in (1, 2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            try:
+                self.connection.request(method, path, body, headers)
+                response = self.connection.getresponse()
+                content = response.read()
+                break
+            except (http.client.HTTPException, OSError):
+                # Server closed the keep-alive connection; retry once on a new one
+                self.close()
+                if attempt == 2:
+                    raise
+        for header in response.headers.get_all('Set-Cookie') or ():
+            for name, morsel in SimpleCookie(header).items():
+                self.cookies[name] = morsel.value
+        return Response(response.status, response.headers.get('Server-Timing'), len(content))
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def _allowed_host():
+    """A Host header that ALLOWED_HOSTS accepts"""
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*':
+            # '.example.com' also matches example.com itself
+            return host.lstrip('.')
+    return 'localhost'
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+
+def summarise(samples, elapsed):
+    """Per-route and overall figures from ``[(route, seconds, status, queries, db_ms, size)]``"""
+    by_route = defaultdict(list)
+    for sample in samples:
+        by_route[sample[0]].append(sample)
+    by_route['ALL'] = samples
+
+    routes = {}
+    for route, rows in sorted(by_route.items()):
+        latencies = sorted(seconds * 1000 for _, seconds, _, _, _, _ in rows)
+        statuses = defaultdict(int)
+        for row in rows:
+            statuses[str(row[2])] += 1
+        queries = [row[3] for row in rows if row[3] is not None]
+        routes[route] = {
+            'requests': len(rows),
+            'throughput': round(len(rows) / elapsed, 2) if elapsed else None,
+            'errors': sum(1 for row in rows if row[2] is None or row[2] >= 400),
+            'statuses': dict(statuses),
+            'mean_ms': round(sum(latencies) / len(latencies), 2),
+            **{f'p{p}_ms': round(percentile(latencies, p), 2) for p in PERCENTILES},
+            'max_ms': round(latencies[-1], 2),
+            'queries_mean': round(sum(queries) / len(queries), 2) if queries else None,
+            'queries_max': max(queries) if queries else None,
+            'db_ms_mean': round(sum(row[4] for row in rows if row[4] is not None) / len(queries), 2) if queries else None,
+            'bytes_mean': round(sum(row[5] for row in rows) / len(rows)),
+        }
+    return routes
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed synthetic users, staff, cars, spots and bookings, then drive a mix of home polling, '
+        'create_booking, my_bookings, view_ticket, admin_dashboard and approve_booking requests, '
+        'either in-process through the WSGI handler or against a running server (--url). Reports '
+        'throughput, p50/p95/p99 latency and queries per request per route, and saves it as JSON. '
+        'Query counts come from the Server-Timing header, so start a server with SERVER_TIMING=True.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='Base URL of a running server on the same database, '
+                                          'e.g. http://127.0.0.1:8000; default is in-process')
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--warmup', type=int, default=100, help='Untimed requests first')
+        parser.add_argument('--concurrency', type=int, default=1, help='Client threads')
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--staff', type=int, default=2)
+        parser.add_argument('--spots', type=int, default=60, help='Top the spot table up to this many')
+        parser.add_argument('--bookings', type=int, default=20, help='Seeded bookings per user')
+        parser.add_argument('--mix', help='Route weights, e.g. home=50,my_bookings=50')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', default='loadtest.json', help='Where to save the results')
+        parser.add_argument('--compare', help='Earlier results file to compare against')
+        parser.add_argument('--flush', action='store_true',
+                            help=f"Delete the '{PREFIX}-*' users, their data and the LT spots and exit")
+
+    def handle(self, *args, **options):
+        if options['flush']:
+            self._flush()
+            return
+
+        mix = self._mix(options['mix'])
+        rng = random.Random(options['seed'])
+        users, staff = self._seed(options, rng)
+        self.waiting = list(
+            Booking.objects.filter(user__in=users, status='WAITING').values_list('pk', flat=True)
+        )
+        self.tickets = defaultdict(list)
+        for user_id, booking_id in Ticket.objects.filter(
+            booking__user__in=users, booking__status='APPROVED',
+        ).values_list('booking__user_id', 'booking__booking_id'):
+            self.tickets[user_id].append(booking_id)
+        self.cars = {
+            car.user_id: car for car in UserCar.objects.filter(user__in=users, is_default=True)
+        }
+        self.lock = threading.Lock()
+
+        target = options['url'] or 'wsgi'
+        routes, weights = zip(*mix.items())
+        plan = rng.choices(routes, weights, k=options['warmup'] + options['requests'])
+        workers = max(1, options['concurrency'])
+        self.stdout.write(
+            f"{options['requests']} requests against {target}, {workers} client threads, "
+            f"{len(users)} users, {len(staff)} staff, mix {', '.join(f'{r}={w}' for r, w in mix.items())}"
+        )
+
+        # Query counts from Server-Timing; a remote server needs SERVER_TIMING=True itself
+        with override_settings(SERVER_TIMING=True):
+            clients = [
+                self._clients(options['url'], users[k::workers] or users, staff)
+                for k in range(workers)
+            ]
+            warmup, timed = plan[:options['warmup']], plan[options['warmup']:]
+            self._run(clients, warmup, options['seed'])
+            started = time.perf_counter()
+            samples = self._run(clients, timed, options['seed'] + 1)
+            elapsed = time.perf_counter() - started
+        for sessions in clients:
+            for session in sessions['all']:
+                session.close()
+
+        results = {
+            'target': target,
+            'started': timezone.now().isoformat(timespec='seconds'),
+            'options': {key: options[key] for key in (
+                'requests', 'concurrency', 'users', 'staff', 'spots', 'bookings', 'seed',
+            )},
+            'mix': mix,
+            'elapsed_s': round(elapsed, 3),
+            'routes': summarise(samples, elapsed),
+        }
+        self._report(results)
+        overall = results['routes']['ALL']
+        if overall['errors'] == overall['requests']:
+            raise CommandError(
+                f"Every request failed ({', '.join(f'{status}: {n}' for status, n in overall['statuses'].items())}); "
+                'not saving the results'
+            )
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as f:
+                self._compare(json.load(f), results)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Saved to {options['output']}")
+
+    def _mix(self, spec):
+        if not spec:
+            return dict(MIX)
+        mix = {}
+        for part in spec.split(','):
+            route, _, weight = part.partition('=')
+            if route not in MIX or not weight.isdigit():
+                raise CommandError(f"Bad --mix entry '{part}', routes are {', '.join(MIX)}")
+            mix[route] = int(weight)
+        return mix
+
+    # Data --------------------------------------------------------------
+
+    def _seed(self, options, rng):
+        """Create whatever of the synthetic data set is missing"""
+        password = make_password(PASSWORD)
+        names = [f'{PREFIX}-user-{n}' for n in range(options['users'])]
+        staff_names = [f'{PREFIX}-staff-{n}' for n in range(options['staff'])]
+        User.objects.bulk_create(
+            [User(username=name, password=password) for name in names]
+            + [User(username=name, password=password, is_staff=True) for name in staff_names],
+            ignore_conflicts=True,
+        )
+        users = list(User.objects.filter(username__in=names).order_by('id'))
+        staff = list(User.objects.filter(username__in=staff_names).order_by('id'))
+        if not users or not staff:
+            raise CommandError('Need at least one user and one staff member')
+
+        missing = options['spots'] - ParkingSpot.objects.count()
+        if missing > 0:
+            first = ParkingSpot.objects.filter(spot_number__startswith='LT').count()
+            ParkingSpot.objects.bulk_create([
+                ParkingSpot(spot_number=f'LT{n:05d}', zone='ABC'[n % 3])
+                for n in range(first, first + missing)
+            ], ignore_conflicts=True)
+            invalidate_occupancy()
+
+        without_cars = [user for user in users if not UserCar.objects.filter(user=user).exists()]
+        UserCar.objects.bulk_create([
+            UserCar(user=user, car_license=f'LT {user.pk:04d}', car_model='Toyota Yaris', is_default=True)
+            for user in without_cars
+        ], ignore_conflicts=True)
+        for user in without_cars:
+            invalidate_user_cars(user.pk)
+
+        created = []
+        with transaction.atomic():
+            for user in users:
+                have = Booking.objects.filter(user=user).count()
+                for _ in range(max(0, options['bookings'] - have)):
+                    booking = Booking(user=user, status='WAITING', **self._booking_fields(user, rng))
+                    booking.save()
+                    created.append(booking.pk)
+        # Half of them approved through the real allocator, so there are tickets to view
+        if created:
+            approve_bookings(created[::2], staff[0])
+        return users, staff
+
+    def _flush(self):
+        seeded = User.objects.filter(username__startswith=f'{PREFIX}-')
+        spots = ParkingSpot.objects.filter(spot_number__startswith='LT')
+        with transaction.atomic():
+            # Real bookings on synthetic spots let go of them first
+            Booking.objects.exclude(user__in=seeded).filter(parking_spot__in=spots).update(parking_spot=None)
+            deleted, _ = seeded.delete()
+            removed, _ = spots.delete()
+            transaction.on_commit(invalidate_occupancy)
+        self.stdout.write(f'Deleted {deleted + removed} rows.')
+
+    def _booking_fields(self, user, rng):
+        start = rng.randint(7, 18)
+        return {
+            'car_license': f'LT {user.pk:04d}',
+            'car_model': 'Toyota Yaris',
+            'phone_number': '081-234-5678',
+            'booking_date': timezone.localdate() + timedelta(days=rng.randint(1, 14)),
+            'start_time': time_of_day(start),
+            'end_time': time_of_day(min(23, start + rng.randint(1, 4))),
+        }
+
+    # Load --------------------------------------------------------------
+
+    def _clients(self, url, users, staff):
+        """Logged-in sessions for one client thread"""
+        def session(user=None):
+            client = HttpSession(url) if url else WsgiSession()
+            if user is not None:
+                client.login(user)
+            return client
+
+        sessions = {
+            'anonymous': session(),
+            'users': [(user, session(user)) for user in users],
+            'staff': [session(user) for user in staff],
+        }
+        sessions['all'] = [sessions['anonymous']] + [s for _, s in sessions['users']] + sessions['staff']
+        return sessions
+
+    def _run(self, clients, plan, seed):
+        samples = []
+        threads = [
+            threading.Thread(target=self._worker, args=(sessions, plan[k::len(clients)], seed + k, samples))
+            for k, sessions in enumerate(clients)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return samples
+
+    def _worker(self, sessions, plan, seed, samples):
+        rng = random.Random(seed)
+        mine = []
+        try:
+            for route in plan:
+                session, method, path, data = self._next_request(route, sessions, rng)
+                started = time.perf_counter()
+                try:
+                    response = session.request(method, path, data)
+                except (http.client.HTTPException, OSError):
+                    mine.append((route, time.perf_counter() - started, None, None, None, 0))
+                    continue
+                elapsed = time.perf_counter() - started
+                timing = SERVER_TIMING.search(response.server_timing or '')
+                mine.append((
+                    route, elapsed, response.status,
+                    int(timing[2]) if timing else None, float(timing[1]) if timing else None,
+                    response.size,
+                ))
+        finally:
+            # In-process threads hold their own database connections
+            connection.close()
+            with self.lock:
+                samples.extend(mine)
+
+    def _next_request(self, route, sessions, rng):
+        """``(session, method, path, data)`` for one request of ``route``"""
+        user, session = rng.choice(sessions['users'])
+        if route == 'home':
+            # Half the polling comes from visitors who are not logged in
+            return (sessions['anonymous'] if rng.random() < 0.5 else session), 'GET', '/', None
+        if route == 'my_bookings':
+            return session, 'GET', '/my-bookings/', None
+        if route == 'view_ticket':
+            with self.lock:
+                tickets = self.tickets.get(user.pk)
+            if tickets:
+                return session, 'GET', f'/ticket/{rng.choice(tickets)}/', None
+            return session, 'GET', '/my-bookings/', None
+        if route == 'create_booking':
+            car = self.cars.get(user.pk)
+            fields = self._booking_fields(user, rng)
+            for name in ('booking_date', 'start_time', 'end_time'):
+                fields[name] = fields[name].isoformat()
+            return session, 'POST', '/create/', {**fields, 'user_car': car.pk if car else '', 'note': ''}
+        staff = rng.choice(sessions['staff'])
+        if route == 'approve_booking':
+            pk = self._waiting_booking()
+            if pk is not None:
+                return staff, 'GET', f'/approve/{pk}/', None
+        return staff, 'GET', '/admin-dashboard/', None
+
+    def _waiting_booking(self):
+        with self.lock:
+            if not self.waiting:
+                self.waiting = list(
+                    Booking.objects.filter(user__username__startswith=f'{PREFIX}-', status='WAITING')
+                    .order_by('-id').values_list('pk', flat=True)[:500]
+                )
+            return self.waiting.pop() if self.waiting else None
+
+    # Output ------------------------------------------------------------
+
+    def _report(self, results):
+        self.stdout.write(f"{results['elapsed_s']:.2f} s, {results['routes']['ALL']['throughput']} requests/s")
+        self.stdout.write(
+            f"{'route':<18}{'reqs':>7}{'err':>6}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'queries':>9}"
+        )
+        for route, row in results['routes'].items():
+            queries = f"{row['queries_mean']:.1f}" if row['queries_mean'] is not None else '-'
+            self.stdout.write(
+                f"{route:<18}{row['requests']:>7}{row['errors']:>6}{row['throughput']:>9.1f}"
+                f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}{queries:>9}"
+            )
+
+    def _compare(self, before, after):
+        self.stdout.write(f"\nChange from {before.get('started', 'earlier run')} (negative is faster)")
+        self.stdout.write(f"{'route':<18}{'p50':>10}{'p95':>10}{'p99':>10}{'req/s':>10}{'queries':>10}")
+
+        def change(old, new):
+            if old is None or new is None or not old:
+                return f"{'-':>10}"
+            return f'{(new / old - 1) * 100:>+9.1f}%'
+
+        for route, row in after['routes'].items():
+            old = before['routes'].get(route)
+            if old is None:
+                continue
+            queries = (
+                f"{row['queries_mean'] - old['queries_mean']:>+10.1f}"
+                if row.get('queries_mean') is not None and old.get('queries_mean') is not None else f"{'-':>10}"
+            )
+            self.stdout.write(
+                f"{route:<18}{change(old['p50_ms'], row['p50_ms'])}{change(old['p95_ms'], row['p95_ms'])}"
+                f"{change(old['p99_ms'], row['p99_ms'])}{change(old['throughput'], row['throughput'])}{queries}"
+            )
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from bookings.models import BookingStat
+
+
+class Command(BaseCommand):
+    help = 'Recount the dashboard booking statistics from the bookings table.'
+
+    def handle(self, *args, **options):
+        BookingStat.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {BookingStat.objects.count()} booking stat rows.'
+        ))
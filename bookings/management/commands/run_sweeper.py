@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from bookings.expiry import REFRESH_SECONDS, Sweeper, sweep
+
+
+class Command(BaseCommand):
+    help = (
+        'Close approved bookings whose end time has passed and free their spots. '
+        'Runs as a long-lived loop that wakes when the next booking ends; use --once from cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Sweep once and exit')
+        parser.add_argument('--refresh', type=int, default=REFRESH_SECONDS,
+                            help='Seconds between reloads of upcoming end times')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            self.report(sweep())
+            return
+        self.stdout.write(f"Sweeper running (refresh every {options['refresh']}s)")
+        Sweeper(refresh=options['refresh']).run(on_sweep=self.report)
+
+    def report(self, result):
+        self.stdout.write(f'Closed {result.closed} bookings, freed {result.freed} spots')
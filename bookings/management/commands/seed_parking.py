@@ -0,0 +1,503 @@
+import io
+import math
+import random
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, time as time_of_day, timezone as dt_timezone
+
+import numpy as np
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from bookings.allocation import SLOT_MINUTES, SpotIndex
+from bookings.backends import user_cache_key
+from bookings.cars import cars_cache_key
+from bookings.ids import SEQ_LIMIT, TOOL_NODE, compose_id
+from bookings.models import Booking, BookingStat, ParkingSpot, Ticket, UserCar, booking_ends_at
+from bookings.occupancy import invalidate_occupancy
+
+PREFIX = 'seed'
+PASSWORD = 'seed-password'
+
+# Spot numbers start with this, like LT (loadtest) and QP (check_query_plans)
+SPOT_PREFIX = 'SD'
+
+# IDs are built from the rows' own timestamps (all before --today) with the
+# node ids.py keeps out of every running app's range, so they cannot collide
+SEED_NODE = TOOL_NODE
+
+CHUNK_SIZE = 10_000
+
+MS_PER_MINUTE = 60_000
+MS_PER_DAY = 24 * 60 * MS_PER_MINUTE
+SLOT_MS = SLOT_MINUTES * MS_PER_MINUTE
+SLOTS_PER_HOUR = 60 // SLOT_MINUTES
+
+CAR_MODELS = [
+    'Toyota Yaris', 'Toyota Vios', 'Toyota Corolla Cross', 'Toyota Hilux Revo', 'Honda City',
+    'Honda Civic', 'Honda HR-V', 'Isuzu D-Max', 'Mazda 2', 'Mazda CX-30', 'Nissan Almera',
+    'Mitsubishi Xpander', 'Ford Ranger', 'MG ZS EV', 'BYD Atto 3', 'Suzuki Swift',
+]
+CAR_COLORS = ['White', 'Black', 'Silver', 'Grey', 'Red', 'Blue', 'Brown']
+PLATE_LETTERS = 'กขคฆงจฉชซญฐฒณดตถทธนบปผพฟภมยรลวศษสหฬอฮ'
+NOTES = {'': 90, 'ขอที่จอดใกล้ลิฟต์': 3, 'มาส่งของ': 3, 'Visitor': 3, 'EV charging please': 1}
+
+# Cars per user
+CAR_COUNTS = {1: 70, 2: 22, 3: 8}
+
+# Start hour of a booking: commuters in the morning, errands and evening visits later
+START_HOURS = {
+    6: 3, 7: 10, 8: 14, 9: 10, 10: 6, 11: 5, 12: 6, 13: 6,
+    14: 5, 15: 4, 16: 4, 17: 6, 18: 6, 19: 4, 20: 2,
+}
+
+# Length in hours: short visits, half days and office days
+DURATIONS = {1: 18, 2: 22, 3: 15, 4: 10, 5: 5, 6: 4, 8: 12, 9: 10, 10: 4}
+
+# Days between making a booking and the booking date
+LEAD_DAYS = {0: 20, 1: 30, 2: 12, 3: 8, 4: 6, 5: 5, 6: 4, 7: 6, 14: 6, 30: 3}
+
+# Outcome of bookings that have ended, and of those still to come.
+# APPROVED/COMPLETED need a free spot; without one a booking is REJECTED
+# (ended) or stays WAITING (still to come), as in approve_bookings().
+PAST_STATUSES = {'COMPLETED': 79, 'CANCELLED': 9, 'REJECTED': 12}
+OPEN_STATUSES = {'WAITING': 30, 'APPROVED': 55, 'CANCELLED': 10, 'REJECTED': 5}
+
+# A few regulars book most days, most users now and then
+MAX_USER_WEIGHT = 8
+
+STATUSES = [code for code, _ in Booking.STATUS_CHOICES]
+BOOKING_FIELDS = (
+    'booking_id', 'user', 'user_car', 'parking_spot', 'car_license', 'car_model', 'phone_number',
+    'booking_date', 'start_time', 'end_time', 'ends_at', 'status', 'note',
+    'created_at', 'updated_at', 'approved_by', 'approved_at',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Load a production-sized synthetic data set: users and their cars, parking spots in every '
+        'zone, and bookings with tickets over the last --days days and the month ahead. Rows are '
+        'streamed in chunks straight into the tables (COPY on PostgreSQL) without per-object '
+        'save(); the same --seed and --today always give the same data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20_000)
+        parser.add_argument('--staff', type=int, default=20, help='Staff users who approve the bookings')
+        parser.add_argument('--spots', type=int, default=2_000)
+        parser.add_argument('--bookings', type=int, default=1_000_000)
+        parser.add_argument('--days', type=int, default=365, help='Days of booking history')
+        parser.add_argument('--today', type=lambda value: datetime.strptime(value, '%Y-%m-%d').date(),
+                            help='Day the history runs up to, YYYY-MM-DD (default today)')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--chunk', type=int, default=CHUNK_SIZE, help='Rows per insert')
+        parser.add_argument('--flush', action='store_true',
+                            help=f"Delete the '{PREFIX}-*' users, their data and the {SPOT_PREFIX} spots and exit")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        self.chunk = max(1, options['chunk'])
+        seeded = User.objects.filter(username__startswith=f'{PREFIX}-')
+        if options['flush']:
+            self._flush(seeded)
+            self.stdout.write(f'Deleted the seed data in {time.perf_counter() - started:.1f}s.')
+            return
+        if seeded.exists() or ParkingSpot.objects.filter(spot_number__startswith=SPOT_PREFIX).exists():
+            raise CommandError('The database already has seed data; run with --flush first')
+        if min(options['users'], options['staff'], options['spots'], options['days']) < 1:
+            raise CommandError('Need at least one user, one staff member, one spot and one day')
+
+        self.rng = random.Random(options['seed'])
+        today = options['today'] or timezone.localdate()
+        self.until = _ms(_midnight(today))
+        self.since = self.until - options['days'] * MS_PER_DAY
+        self.suffix = '+00:00' if connection.vendor == 'postgresql' else ''
+
+        with transaction.atomic():
+            users, staff = self._users(options['users'], options['staff'])
+            spots = self._spots(options['spots'])
+            cars = self._cars(users)
+            with self._without_indexes(Booking, Ticket):
+                counts = self._bookings(options['bookings'], users, staff, spots, cars)
+            # Bulk writes skip the signals: recount and mark taken spots here
+            ParkingSpot.objects.filter(
+                pk__in=Booking.objects.filter(status='APPROVED', parking_spot__in=spots).values('parking_spot'),
+            ).update(is_available=False)
+            BookingStat.objects.rebuild()
+            transaction.on_commit(invalidate_occupancy)
+        self._forget_cached([pk for pk, _ in users + staff])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(users)} users, {len(staff)} staff, {sum(map(len, cars.values()))} cars, "
+            f"{len(spots)} spots, {counts['bookings']} bookings and {counts['tickets']} tickets "
+            f"in {time.perf_counter() - started:.1f}s."
+        ))
+        if counts['status']:
+            self.stdout.write('  ' + ', '.join(f'{status} {n}' for status, n in sorted(counts['status'].items())))
+
+    # Rows ----------------------------------------------------------------
+
+    def _users(self, count, staff_count):
+        """``(users, staff)`` as lists of ``(pk, phone number)``"""
+        rng = self.rng
+        password = make_password(PASSWORD)
+        names = [f'{PREFIX}-{n:06d}' for n in range(count)]
+        staff_names = [f'{PREFIX}-staff-{n:03d}' for n in range(staff_count)]
+        joined = self._stamps([self.since - rng.randrange(365 * MS_PER_DAY) for _ in names + staff_names])
+        self._insert_chunked(User, (
+            'password', 'is_superuser', 'username', 'first_name', 'last_name', 'email',
+            'is_staff', 'is_active', 'date_joined',
+        ), [
+            (password, False, name, '', '', '', n >= count, True, date_joined)
+            for n, (name, date_joined) in enumerate(zip(names + staff_names, joined))
+        ])
+
+        ids = dict(User.objects.filter(username__startswith=f'{PREFIX}-').values_list('username', 'pk'))
+        # เบอร์มือถือแบบ 08x-xxx-xxxx
+        users = [
+            (ids[name], f'0{rng.choice("689")}{rng.randrange(10)}-{rng.randrange(1000):03d}-{rng.randrange(10000):04d}')
+            for name in names
+        ]
+        return users, [(ids[name], '') for name in staff_names]
+
+    def _spots(self, count):
+        """Spot ids in allocation order (``ParkingSpot.Meta.ordering``)"""
+        zones = [code for code, _ in ParkingSpot.ZONE_CHOICES]
+        self._insert_chunked(ParkingSpot, ('spot_number', 'zone', 'in_service', 'is_available'), [
+            (f'{SPOT_PREFIX}{zones[n % len(zones)]}{n:05d}', zones[n % len(zones)], True, True)
+            for n in range(count)
+        ])
+        return list(
+            ParkingSpot.objects.filter(spot_number__startswith=SPOT_PREFIX).values_list('pk', flat=True)
+        )
+
+    def _cars(self, users):
+        """``{user pk: [(car pk, licence, model)]}``, default car first"""
+        rng = self.rng
+        counts, weights = zip(*CAR_COUNTS.items())
+        rows = []
+        added_at = self._stamps([self.since - rng.randrange(30 * MS_PER_DAY) for _ in users])
+        for (user_id, _), count, added in zip(users, rng.choices(counts, weights, k=len(users)), added_at):
+            plates = set()
+            while len(plates) < count:
+                plates.add(f'{rng.choice(PLATE_LETTERS)}{rng.choice(PLATE_LETTERS)} {rng.randint(1, 9999)}')
+            for n, plate in enumerate(sorted(plates)):
+                rows.append((user_id, plate, rng.choice(CAR_MODELS), rng.choice(CAR_COLORS), n == 0, added, added))
+        self._insert_chunked(UserCar, (
+            'user', 'car_license', 'car_model', 'car_color', 'is_default', 'created_at', 'updated_at',
+        ), rows)
+
+        cars = {}
+        for user_id, pk, plate, model in UserCar.objects.filter(
+            user__username__startswith=f'{PREFIX}-',
+        ).order_by('user', '-is_default', 'pk').values_list('user', 'pk', 'car_license', 'car_model'):
+            cars.setdefault(user_id, []).append((pk, plate, model))
+        return cars
+
+    def _bookings(self, count, users, staff, spots, cars):
+        """Generate bookings in the order they were made, a chunk at a time, with their tickets.
+
+        Each chunk is drawn as NumPy columns; only the spot assignment walks the
+        rows, through a ``SpotIndex`` per booking date like the real allocator,
+        so no two approved bookings of a spot overlap.
+        """
+        rng = np.random.default_rng(self.rng.getrandbits(64))
+        until = self.until
+        # Mean spacing of creation times, with room for six standard deviations
+        # of the random walk so it does not run past `until`
+        gap = max(1, (until - self.since) // (count + 6 * math.isqrt(count) + 1))
+        clock = [time_of_day(minute // 60, minute % 60) for minute in range(0, 24 * 60, SLOT_MINUTES)]
+        times = np.array([value.isoformat() for value in clock], dtype=object)
+
+        user_ids = np.array([pk for pk, _ in users], dtype=object)
+        phones = np.array([phone for _, phone in users], dtype=object)
+        user_weights = np.array([min(self.rng.paretovariate(1.5), MAX_USER_WEIGHT) for _ in users])
+        user_weights /= user_weights.sum()
+        staff_ids = np.array([pk for pk, _ in staff], dtype=object)
+        # Every user's cars side by side, default car first
+        car_rows = [car for pk, _ in users for car in cars[pk]]
+        car_ids, plates, models = (np.array(column, dtype=object) for column in zip(*car_rows))
+        car_count = np.array([len(cars[pk]) for pk, _ in users])
+        car_first = np.cumsum(car_count) - car_count
+
+        names = np.array(STATUSES, dtype=object)
+        waiting, approved, rejected, cancelled, completed = (STATUSES.index(code) for code in (
+            'WAITING', 'APPROVED', 'REJECTED', 'CANCELLED', 'COMPLETED'))
+        past_codes = np.array([STATUSES.index(code) for code in PAST_STATUSES])
+        open_codes = np.array([STATUSES.index(code) for code in OPEN_STATUSES])
+
+        days = {}       # 15-minute bucket since the epoch -> local date ordinal
+        midnights = {}  # date ordinal -> local midnight in ms
+        end_times = {}  # date ordinal * slots + end slot -> ends_at in ms
+        iso_dates = {}  # date ordinal -> ISO date
+        indexes = {}    # date ordinal -> SpotIndex of the spots given out so far
+        ticket_seqs = {}
+        counts = {'bookings': 0, 'tickets': 0, 'status': dict.fromkeys(STATUSES, 0)}
+        created = self.since
+
+        def local_day(bucket):
+            return timezone.localtime(_aware(bucket * SLOT_MS)).toordinal()
+
+        def midnight(ordinal):
+            return _ms(_midnight(date.fromordinal(ordinal)))
+
+        def ending(key):
+            return _ms(booking_ends_at(date.fromordinal(key // len(clock)), time_of_day.min, clock[key % len(clock)]))
+
+        for offset in range(0, count, self.chunk):
+            size = min(self.chunk, count - offset)
+
+            # Strictly increasing, so every booking_id gets sequence 0
+            made = created + np.cumsum(1 + (rng.exponential(size=size) * gap).astype(np.int64))
+            made = np.minimum(made, until - 1)
+            created = int(made[-1])
+            day = _lookup(days, made // SLOT_MS, local_day)
+            # No new booking can land on a day that has gone
+            for old in [old for old in indexes if old < day[0]]:
+                del indexes[old]
+
+            start = (np.array(list(START_HOURS))[_draw(rng, START_HOURS, size)] * SLOTS_PER_HOUR
+                     + rng.integers(SLOTS_PER_HOUR, size=size))
+            end = np.minimum(start + np.array(list(DURATIONS))[_draw(rng, DURATIONS, size)] * SLOTS_PER_HOUR,
+                             len(clock) - 1)
+            booking_date = day + np.array(list(LEAD_DAYS))[_draw(rng, LEAD_DAYS, size)]
+
+            # Booked for later today, but that time has passed: make it tomorrow
+            booking_date += _lookup(midnights, booking_date, midnight) + start * SLOT_MS <= made
+            starts_at = _lookup(midnights, booking_date, midnight) + start * SLOT_MS
+            ends_at = _lookup(end_times, booking_date * len(clock) + end, ending)
+            ended = ends_at <= until
+            status = np.where(ended, past_codes[_draw(rng, PAST_STATUSES, size)],
+                              open_codes[_draw(rng, OPEN_STATUSES, size)])
+
+            spot = np.full(size, None, dtype=object)
+            wanted = np.flatnonzero((status == approved) | (status == completed))
+            missed = []
+            for row, ordinal, first, last in zip(wanted.tolist(), booking_date[wanted].tolist(),
+                                                 start[wanted].tolist(), end[wanted].tolist()):
+                index = indexes.get(ordinal)
+                if index is None:
+                    index = indexes[ordinal] = SpotIndex(spots)
+                spot_id = index.find_free(clock[first], clock[last])
+                if spot_id is None:
+                    missed.append(row)
+                else:
+                    index.reserve(spot_id, clock[first], clock[last])
+                    spot[row] = spot_id
+            status[missed] = np.where(ended[missed], rejected, waiting)
+            assigned = spot != None  # noqa: E711
+
+            # Reviewed within a couple of hours, and before the booking starts
+            reviewed = np.minimum(np.minimum(
+                made + MS_PER_MINUTE + (rng.exponential(size=size) * 90 * MS_PER_MINUTE).astype(np.int64),
+                np.maximum(made + 1, starts_at - MS_PER_MINUTE),
+            ), until - 1)
+            updated = np.select([status == waiting, status == completed, status == cancelled], [
+                made, ends_at, made + rng.integers(np.maximum(1, np.minimum(starts_at, until) - made)),
+            ], reviewed)
+
+            who = rng.choice(len(users), size=size, p=user_weights)
+            car = car_first[who] + np.where(
+                rng.random(size) < 0.85, 0, (rng.random(size) * car_count[who]).astype(np.int64),
+            )
+            ordinals, inverse = np.unique(booking_date, return_inverse=True)
+            for ordinal in ordinals.tolist():
+                if ordinal not in iso_dates:
+                    iso_dates[ordinal] = date.fromordinal(ordinal).isoformat()
+            booking_ids = [compose_id('PK', ms, 0, SEED_NODE) for ms in made.tolist()]
+            reviewed_text = np.array(self._stamps(reviewed), dtype=object)
+            approved_at = np.where(assigned, reviewed_text, None)
+
+            bookings = list(zip(
+                booking_ids, user_ids[who].tolist(), car_ids[car].tolist(), spot.tolist(),
+                plates[car].tolist(), models[car].tolist(), phones[who].tolist(),
+                np.array([iso_dates[ordinal] for ordinal in ordinals.tolist()], dtype=object)[inverse].tolist(),
+                times[start].tolist(), times[end].tolist(), self._stamps(ends_at), names[status].tolist(),
+                np.array(list(NOTES), dtype=object)[_draw(rng, NOTES, size)].tolist(),
+                self._stamps(made), self._stamps(updated),
+                np.where(assigned, staff_ids[rng.integers(len(staff_ids), size=size)], None).tolist(),
+                approved_at.tolist(),
+            ))
+            self._insert(Booking, BOOKING_FIELDS, bookings)
+            counts['bookings'] += size
+            for code, n in zip(STATUSES, np.bincount(status, minlength=len(STATUSES)).tolist()):
+                counts['status'][code] += n
+
+            approvals = np.flatnonzero(assigned).tolist()
+            if approvals:
+                counts['tickets'] += self._tickets(booking_ids[0], booking_ids[-1], [
+                    (booking_ids[row], ms, text) for row, ms, text in zip(
+                        approvals, reviewed[approvals].tolist(), approved_at[approvals].tolist())
+                ], ticket_seqs)
+                # Later tickets are issued after their booking was made, so after `created`
+                ticket_seqs = {ms: seq for ms, seq in ticket_seqs.items() if ms > created}
+            if offset // self.chunk % 20 == 19:
+                self.stdout.write(f"  {counts['bookings']} bookings")
+        counts['status'] = {code: n for code, n in counts['status'].items() if n}
+        return counts
+
+    def _tickets(self, first_id, last_id, approvals, seqs):
+        """Insert a ticket for each ``(booking_id, issued ms, issued as text)``, numbered by issue time"""
+        # booking_id follows creation order, so the chunk is one range of the unique index
+        pks = dict(Booking.objects.filter(booking_id__range=(first_id, last_id)).values_list('booking_id', 'pk'))
+        rows = []
+        for booking_id, issued, issued_text in approvals:
+            # Like IdGenerator: count within the millisecond, then move to the next one
+            while seqs.get(issued, -1) + 1 == SEQ_LIMIT:
+                issued += 1
+            seqs[issued] = seq = seqs.get(issued, -1) + 1
+            rows.append((compose_id('TK', issued, seq, SEED_NODE), pks[booking_id], f'QR-{booking_id}', issued_text))
+        self._insert(Ticket, ('ticket_number', 'booking', 'qr_code', 'issued_at'), rows)
+        return len(rows)
+
+    def _stamps(self, values):
+        """Milliseconds since the epoch as the UTC text a datetime column takes"""
+        if not len(values):
+            return []
+        # Format the whole column at once, then fix it up as one string
+        tail = '000' + self.suffix
+        text = np.datetime_as_string(np.asarray(values, dtype=np.int64).astype('datetime64[ms]')).tolist()
+        return ((tail + '\n').join(text) + tail).replace('T', ' ').split('\n')
+
+    # Storage -------------------------------------------------------------
+
+    def _insert_chunked(self, model, fields, rows):
+        for offset in range(0, len(rows), self.chunk):
+            self._insert(model, fields, rows[offset:offset + self.chunk])
+
+    def _insert(self, model, fields, rows):
+        """Write ``rows`` (tuples in ``fields`` order) without building model instances"""
+        if not rows:
+            return
+        opts = model._meta
+        quote = connection.ops.quote_name
+        table = quote(opts.db_table)
+        columns = ', '.join(quote(opts.get_field(name).column) for name in fields)
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                data = io.StringIO(''.join('\t'.join(map(_copy_value, row)) + '\n' for row in rows))
+                sql = f'COPY {table} ({columns}) FROM STDIN'
+                if hasattr(cursor.cursor, 'copy_expert'):
+                    cursor.cursor.copy_expert(sql, data)
+                else:
+                    # psycopg 3
+                    with cursor.cursor.copy(sql) as copy:
+                        copy.write(data.getvalue())
+            else:
+                placeholders = ', '.join(['%s'] * len(fields))
+                cursor.executemany(f'INSERT INTO {table} ({columns}) VALUES ({placeholders})', rows)
+
+    @contextmanager
+    def _without_indexes(self, *models):
+        """Drop the non-unique indexes of ``models`` while they are loaded and build them again after.
+
+        One build per index is far cheaper than updating eight B-trees row by
+        row. SQLite and PostgreSQL both roll DDL back with the transaction, so
+        an error leaves the indexes as they were.
+        """
+        quote = connection.ops.quote_name
+        indexes = [index for model in models for index in _plain_indexes(model._meta.db_table)]
+        with connection.cursor() as cursor:
+            for name, _ in indexes:
+                cursor.execute(f'DROP INDEX {quote(name)}')
+        yield
+        with connection.cursor() as cursor:
+            for _, sql in indexes:
+                cursor.execute(sql)
+
+    def _flush(self, seeded):
+        """Delete the seed rows with plain DELETEs; signals would load every booking one by one"""
+        user_ids = list(seeded.values_list('pk', flat=True))
+        spots = ParkingSpot.objects.filter(spot_number__startswith=SPOT_PREFIX)
+        with transaction.atomic():
+            # Real rows pointing at seed rows let go first, as SET_NULL would
+            others = Booking.objects.exclude(user__in=seeded)
+            others.filter(parking_spot__in=spots).update(parking_spot=None)
+            others.filter(approved_by__in=seeded).update(approved_by=None)
+            for queryset in (
+                Ticket.objects.filter(booking__user__in=seeded),
+                Booking.objects.filter(user__in=seeded),
+                UserCar.objects.filter(user__in=seeded),
+                spots,
+            ):
+                self._delete(queryset)
+            seeded.delete()
+            BookingStat.objects.rebuild()
+            transaction.on_commit(invalidate_occupancy)
+        self._forget_cached(user_ids)
+
+    def _delete(self, queryset):
+        sql, params = queryset.values('pk').query.sql_with_params()
+        opts = queryset.model._meta
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {quote(opts.db_table)} WHERE {quote(opts.pk.column)} IN ({sql})', params)
+
+    def _forget_cached(self, user_ids):
+        # The same entries the User and UserCar signals would have dropped
+        keys = [key for pk in user_ids for key in (user_cache_key(pk), cars_cache_key(pk))]
+        for offset in range(0, len(keys), self.chunk):
+            cache.delete_many(keys[offset:offset + self.chunk])
+
+
+def _draw(rng, weights, size):
+    """``size`` positions in the ``weights`` dict, drawn by weight"""
+    p = np.array(list(weights.values()), dtype=float)
+    return rng.choice(len(p), size=size, p=p / p.sum())
+
+
+def _lookup(cache, keys, compute):
+    """``compute(key)`` for an array of int ``keys``, worked out once per distinct key"""
+    unique, inverse = np.unique(keys, return_inverse=True)
+    values = []
+    for key in unique.tolist():
+        if key not in cache:
+            cache[key] = compute(key)
+        values.append(cache[key])
+    return np.array(values, dtype=np.int64)[inverse]
+
+
+def _plain_indexes(table):
+    """``(name, CREATE INDEX statement)`` of the indexes on ``table`` that enforce nothing"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                'SELECT m.name, m.sql FROM sqlite_master m JOIN pragma_index_list(%s) l ON l.name = m.name '
+                'WHERE l."unique" = 0 AND m.sql IS NOT NULL', [table],
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT c.relname, pg_get_indexdef(i.indexrelid) FROM pg_index i '
+                'JOIN pg_class c ON c.oid = i.indexrelid '
+                'WHERE i.indrelid = %s::regclass AND NOT i.indisunique', [connection.ops.quote_name(table)],
+            )
+        else:
+            return []
+        return cursor.fetchall()
+
+
+def _midnight(day):
+    return timezone.make_aware(datetime.combine(day, time_of_day.min))
+
+
+def _ms(value):
+    return int(value.timestamp() * 1000)
+
+
+def _aware(ms):
+    return datetime.fromtimestamp(ms / 1000, tz=dt_timezone.utc)
+
+
+def _copy_value(value):
+    """A value in PostgreSQL's COPY text format"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, str):
+        return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+    return str(value)
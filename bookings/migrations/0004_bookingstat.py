@@ -0,0 +1,50 @@
+# Generated by Django 5.2.5 on 2026-10-18 00:45
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_stats(apps, schema_editor):
+    Booking = apps.get_model('bookings', 'Booking')
+    BookingStat = apps.get_model('bookings', 'BookingStat')
+    BookingStat.objects.bulk_create(
+        [
+            BookingStat(
+                booking_date=row['booking_date'],
+                zone=row['parking_spot__zone'] or '',
+                status=row['status'],
+                count=row['n'],
+            )
+            for row in Booking.objects.values(
+                'booking_date', 'parking_spot__zone', 'status',
+            ).annotate(n=Count('id')).order_by()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0003_alter_booking_options_alter_parkingspot_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('booking_date', models.DateField(verbose_name='Booking Date')),
+                ('zone', models.CharField(blank=True, max_length=1, verbose_name='Zone')),
+                ('status', models.CharField(choices=[('WAITING', 'Waiting for Approval'), ('APPROVED', 'Approved'), ('REJECTED', 'Rejected'), ('CANCELLED', 'Cancelled')], max_length=10, verbose_name='Status')),
+                ('count', models.IntegerField(default=0, verbose_name='Bookings')),
+            ],
+            options={
+                'verbose_name': 'Booking Statistic',
+                'verbose_name_plural': 'Booking Statistics',
+                'ordering': ['-booking_date', 'zone', 'status'],
+                'unique_together': {('booking_date', 'zone', 'status')},
+            },
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.5 on 2026-10-18 01:19
+
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_ends_at(apps, schema_editor):
+    Booking = apps.get_model('bookings', 'Booking')
+    tz = timezone.get_default_timezone()
+    batch = []
+    for booking in Booking.objects.only('booking_date', 'start_time', 'end_time').iterator(chunk_size=2000):
+        if booking.end_time <= booking.start_time:
+            end = datetime.combine(booking.booking_date + timedelta(days=1), time.min)
+        else:
+            end = datetime.combine(booking.booking_date, booking.end_time)
+        booking.ends_at = timezone.make_aware(end, tz)
+        batch.append(booking)
+        if len(batch) == 2000:
+            Booking.objects.bulk_update(batch, ['ends_at'])
+            batch = []
+    Booking.objects.bulk_update(batch, ['ends_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_booking_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='ends_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Ends At'),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='status',
+            field=models.CharField(choices=[('WAITING', 'Waiting for Approval'), ('APPROVED', 'Approved'), ('REJECTED', 'Rejected'), ('CANCELLED', 'Cancelled'), ('COMPLETED', 'Completed')], default='WAITING', max_length=10, verbose_name='Status'),
+        ),
+        migrations.AlterField(
+            model_name='bookingstat',
+            name='status',
+            field=models.CharField(choices=[('WAITING', 'Waiting for Approval'), ('APPROVED', 'Approved'), ('REJECTED', 'Rejected'), ('CANCELLED', 'Cancelled'), ('COMPLETED', 'Completed')], max_length=10, verbose_name='Status'),
+        ),
+        migrations.RunPython(backfill_ends_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status', 'APPROVED')), fields=['ends_at'], name='booking_approved_ends_idx'),
+        ),
+    ]
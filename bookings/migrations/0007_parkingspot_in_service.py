@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-18 02:46
+
+from django.db import migrations, models
+
+
+def carry_over_closed_spots(apps, schema_editor):
+    # Spots switched off in the admin before this field existed: unavailable
+    # without any approved booking holding them
+    ParkingSpot = apps.get_model('bookings', 'ParkingSpot')
+    Booking = apps.get_model('bookings', 'Booking')
+    ParkingSpot.objects.filter(is_available=False).exclude(
+        pk__in=Booking.objects.filter(status='APPROVED', parking_spot__isnull=False).values('parking_spot'),
+    ).update(in_service=False, is_available=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0006_booking_ends_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parkingspot',
+            name='in_service',
+            field=models.BooleanField(default=True, verbose_name='In Service'),
+        ),
+        migrations.RunPython(carry_over_closed_spots, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,12 @@
-from django.db import models
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import models, transaction
+from django.db.models import Count, F, Q
 from django.contrib.auth.models import User
 from django.utils import timezone
-import uuid
+
+from .ids import new_booking_id, new_ticket_number
 
 class UserCar(models.Model):
     """User's registered car"""
@@ -20,6 +25,10 @@ class UserCar(models.Model):
         verbose_name = 'User Car'
         verbose_name_plural = 'User Cars'
         unique_together = ['user', 'car_license']  # Prevent duplicate plates for the same user
+        indexes = [
+            # Default car lookup on every booking form and car save
+            models.Index(fields=['user'], condition=models.Q(is_default=True), name='usercar_default_idx'),
+        ]
     
     def __str__(self):
         return f"{self.car_license} - {self.car_model}"
@@ -46,6 +55,9 @@ class ParkingSpot(models.Model):
     
     spot_number = models.CharField(max_length=10, unique=True, verbose_name='Spot Number')
     zone = models.CharField(max_length=1, choices=ZONE_CHOICES, verbose_name='Zone')
+    # Set by admins; spots out of service are never allocated
+    in_service = models.BooleanField(default=True, verbose_name='In Service')
+    # Derived: cleared on approval, set again by the expiry sweeper
     is_available = models.BooleanField(default=True, verbose_name='Available')
     
     class Meta:
@@ -57,6 +69,15 @@ class ParkingSpot(models.Model):
         return f"{self.get_zone_display()} - {self.spot_number}"
 
 
+def booking_ends_at(booking_date, start_time, end_time):
+    """When a booking window ends; windows that end at or before they start run to midnight"""
+    if end_time <= start_time:
+        end = datetime.combine(booking_date + timedelta(days=1), time.min)
+    else:
+        end = datetime.combine(booking_date, end_time)
+    return timezone.make_aware(end, timezone.get_default_timezone())
+
+
 class Booking(models.Model):
     """Parking booking request"""
     STATUS_CHOICES = [
@@ -64,6 +85,7 @@ class Booking(models.Model):
         ('APPROVED', 'Approved'),
         ('REJECTED', 'Rejected'),
         ('CANCELLED', 'Cancelled'),
+        ('COMPLETED', 'Completed'),
     ]
     
     # Booking information
@@ -87,6 +109,8 @@ class Booking(models.Model):
     booking_date = models.DateField(verbose_name='Booking Date')
     start_time = models.TimeField(verbose_name='Start Time')
     end_time = models.TimeField(verbose_name='End Time')
+    # booking_date + end_time as a timestamp, kept in sync by save()
+    ends_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name='Ends At')
     
     # Status
     status = models.CharField(
@@ -108,12 +132,56 @@ class Booking(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Parking Booking'
         verbose_name_plural = 'Parking Bookings'
+        indexes = [
+            # Admin queues: one status, newest first
+            models.Index(fields=['status', '-created_at', '-id'], name='booking_status_created_idx'),
+            # My bookings: one user's history, newest first
+            models.Index(fields=['user', '-created_at', '-id'], name='booking_user_created_idx'),
+            # Spot allocation and ticket packs: one day's approved bookings
+            models.Index(fields=['booking_date', 'status'], name='booking_date_status_idx'),
+            # Expiry sweeper: approved bookings by end time
+            models.Index(fields=['ends_at'], name='booking_approved_ends_idx', condition=Q(status='APPROVED')),
+        ]
+    
+    # Fields that decide which BookingStat row a booking is counted in
+    STAT_FIELDS = ('booking_date', 'parking_spot_id', 'status')
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stat_state = instance.stat_state()
+        return instance
+    
+    def stat_state(self):
+        """``(booking_date, parking_spot_id, status)``, or None if any is deferred"""
+        if any(field not in self.__dict__ for field in self.STAT_FIELDS):
+            return None
+        return tuple(self.__dict__[field] for field in self.STAT_FIELDS)
     
     def save(self, *args, **kwargs):
         if not self.booking_id:
-            # Generate booking ID (date + shortened UUID)
-            self.booking_id = f"PK{timezone.now().strftime('%Y%m%d')}{uuid.uuid4().hex[:6].upper()}"
-        super().save(*args, **kwargs)
+            # Generate booking ID (date + time-ordered suffix)
+            self.booking_id = new_booking_id()
+        
+        update_fields = kwargs.get('update_fields')
+        if all(field in self.__dict__ for field in ('booking_date', 'start_time', 'end_time')):
+            self.ends_at = booking_ends_at(self.booking_date, self.start_time, self.end_time)
+            if update_fields is not None and {'booking_date', 'start_time', 'end_time'} & set(update_fields):
+                kwargs['update_fields'] = update_fields = [*update_fields, 'ends_at']
+        if update_fields is not None and not {'booking_date', 'parking_spot', 'parking_spot_id', 'status'} & set(update_fields):
+            super().save(*args, **kwargs)
+            return
+        
+        adding = self._state.adding
+        with transaction.atomic(using=kwargs.get('using')):
+            old = None if adding else getattr(self, '_stat_state', None)
+            if old is None and not adding:
+                old = Booking.objects.filter(pk=self.pk).values_list(*self.STAT_FIELDS).first()
+            super().save(*args, **kwargs)
+            new = self.stat_state() or Booking.objects.filter(pk=self.pk).values_list(*self.STAT_FIELDS).first()
+            if old != new:
+                BookingStat.objects.shift(removed=[old] if old else [], added=[new])
+        self._stat_state = new
     
     def __str__(self):
         return f"{self.booking_id} - {self.user.username}"
@@ -125,6 +193,7 @@ class Booking(models.Model):
             'APPROVED': 'green',
             'REJECTED': 'red',
             'CANCELLED': 'gray',
+            'COMPLETED': 'blue',
         }
         return colors.get(self.status, 'gray')
 
@@ -141,10 +210,113 @@ class Ticket(models.Model):
         verbose_name = 'Parking Ticket'
         verbose_name_plural = 'Parking Tickets'
     
+    @staticmethod
+    def generate_number():
+        return new_ticket_number()
+    
     def save(self, *args, **kwargs):
         if not self.ticket_number:
-            self.ticket_number = f"TK{timezone.now().strftime('%Y%m%d')}{uuid.uuid4().hex[:8].upper()}"
+            self.ticket_number = self.generate_number()
         super().save(*args, **kwargs)
     
     def __str__(self):
         return self.ticket_number
+
+
+class BookingStatManager(models.Manager):
+    # Counters matched per UPDATE statement
+    UPDATE_CHUNK = 200
+    
+    def apply(self, deltas):
+        """Add ``{(booking_date, zone, status): delta}`` to the counters.
+        
+        Missing counter rows are created first, then counters that move by
+        the same amount share one UPDATE, so a whole series of bookings
+        costs a couple of statements instead of one per day.
+        """
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        keys = sorted(deltas)
+        self.bulk_create(
+            [BookingStat(booking_date=day, zone=zone, status=status) for day, zone, status in keys],
+            ignore_conflicts=True,
+        )
+        by_delta = defaultdict(list)
+        for key in keys:
+            by_delta[deltas[key]].append(key)
+        for delta, same in sorted(by_delta.items()):
+            for offset in range(0, len(same), self.UPDATE_CHUNK):
+                match = Q()
+                for day, zone, status in same[offset:offset + self.UPDATE_CHUNK]:
+                    match |= Q(booking_date=day, zone=zone, status=status)
+                self.filter(match).update(count=F('count') + delta)
+    
+    def shift(self, removed=(), added=()):
+        """Move bookings between counters.
+        
+        ``removed`` and ``added`` are ``(booking_date, parking_spot_id, status)``
+        states as returned by ``Booking.stat_state()``.
+        """
+        removed, added = list(removed), list(added)
+        spot_ids = {state[1] for state in removed + added if state[1]}
+        zones = dict(ParkingSpot.objects.filter(pk__in=spot_ids).values_list('pk', 'zone')) if spot_ids else {}
+        
+        deltas = Counter()
+        for booking_date, spot_id, status in removed:
+            deltas[booking_date, zones.get(spot_id, ''), status] -= 1
+        for booking_date, spot_id, status in added:
+            deltas[booking_date, zones.get(spot_id, ''), status] += 1
+        self.apply(deltas)
+    
+    def move_spot(self, spot_id, old_zone, new_zone):
+        """Recount a spot's bookings under another zone ('' when the spot goes away)"""
+        deltas = Counter()
+        for row in Booking.objects.filter(parking_spot_id=spot_id).values(
+            'booking_date', 'status',
+        ).annotate(n=Count('id')).order_by():
+            deltas[row['booking_date'], old_zone, row['status']] -= row['n']
+            deltas[row['booking_date'], new_zone, row['status']] += row['n']
+        self.apply(deltas)
+    
+    def rebuild(self):
+        """Recount everything from the bookings table"""
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(
+                [
+                    BookingStat(
+                        booking_date=row['booking_date'],
+                        zone=row['parking_spot__zone'] or '',
+                        status=row['status'],
+                        count=row['n'],
+                    )
+                    for row in Booking.objects.values(
+                        'booking_date', 'parking_spot__zone', 'status',
+                    ).annotate(n=Count('id')).order_by()
+                ],
+                batch_size=1000,
+            )
+    
+    def totals(self):
+        """Booking count per status over all days"""
+        return dict(self.values_list('status').annotate(total=models.Sum('count')).order_by())
+
+
+class BookingStat(models.Model):
+    """Number of bookings per day, zone and status (dashboard read model)"""
+    booking_date = models.DateField(verbose_name='Booking Date')
+    zone = models.CharField(max_length=1, blank=True, verbose_name='Zone')
+    status = models.CharField(max_length=10, choices=Booking.STATUS_CHOICES, verbose_name='Status')
+    count = models.IntegerField(default=0, verbose_name='Bookings')
+    
+    objects = BookingStatManager()
+    
+    class Meta:
+        unique_together = ['booking_date', 'zone', 'status']
+        ordering = ['-booking_date', 'zone', 'status']
+        verbose_name = 'Booking Statistic'
+        verbose_name_plural = 'Booking Statistics'
+    
+    def __str__(self):
+        return f"{self.booking_date} {self.zone or '-'} {self.status}: {self.count}"
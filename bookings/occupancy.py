@@ -0,0 +1,116 @@
+import hashlib
+import math
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import Booking, ParkingSpot
+
+CACHE_KEY = 'occupancy-snapshot-v3'
+
+# Safety net for caches that are not shared between worker processes;
+# within a process the snapshot is invalidated by signals
+CACHE_TIMEOUT = 60
+
+SpotCell = namedtuple('SpotCell', 'spot_number is_available')
+ZoneOccupancy = namedtuple('ZoneOccupancy', 'code label total available spots')
+
+# Sent whenever the snapshot is dropped, i.e. availability may have changed
+occupancy_invalidated = Signal()
+
+
+def _spot_rows():
+    return ParkingSpot.objects.values_list('pk', 'zone', 'spot_number', 'in_service', 'is_available')
+
+
+def _booking_rows(now):
+    # Anything running now started today and has not ended (partial ends_at index)
+    return Booking.objects.filter(
+        status='APPROVED', ends_at__gt=now,
+        booking_date=timezone.localdate(now, timezone.get_default_timezone()), parking_spot__isnull=False,
+    ).values_list('parking_spot_id', 'start_time', 'ends_at').order_by()
+
+
+def build_occupancy_snapshot(now=None):
+    """Group every spot by zone in one query, with per-zone totals.
+
+    A spot counts as taken while an approved booking covers ``now``.
+    """
+    now = now or timezone.now()
+    return _group_spots(_spot_rows(), _booking_rows(now), now)
+
+
+async def abuild_occupancy_snapshot(now=None):
+    now = now or timezone.now()
+    return _group_spots(
+        [row async for row in _spot_rows()], [row async for row in _booking_rows(now)], now,
+    )
+
+
+def _group_spots(rows, bookings, now):
+    tz = timezone.get_default_timezone()
+    local = timezone.localtime(now, tz)
+    # The map can change without any write: when the next booking starts or ends
+    changes_at = timezone.make_aware(datetime.combine(local.date() + timedelta(days=1), time.min), tz)
+    occupied = set()
+    for spot_id, start_time, ends_at in bookings:
+        if start_time <= local.time():
+            occupied.add(spot_id)
+            changes_at = min(changes_at, ends_at)
+        else:
+            changes_at = min(changes_at, timezone.make_aware(datetime.combine(local.date(), start_time), tz))
+
+    rows = list(rows)
+    cells = {code: [] for code, _ in ParkingSpot.ZONE_CHOICES}
+    for pk, zone, spot_number, in_service, _ in rows:
+        cells.setdefault(zone, []).append(SpotCell(spot_number, in_service and pk not in occupied))
+
+    labels = dict(ParkingSpot.ZONE_CHOICES)
+    zones = []
+    for code, spots in cells.items():
+        available = sum(1 for spot in spots if spot.is_available)
+        zones.append(ZoneOccupancy(code, labels.get(code, code), len(spots), available, spots))
+
+    total = sum(zone.total for zone in zones)
+    available = sum(zone.available for zone in zones)
+    return {
+        'zones': zones,
+        # Changes whenever the map does; keys the rendered parking map
+        'version': hashlib.md5(repr(zones).encode(), usedforsecurity=False).hexdigest(),
+        # Changes whenever any spot row does; part of the API ETags
+        'spots_version': hashlib.md5(repr(rows).encode(), usedforsecurity=False).hexdigest(),
+        'total_spots': total,
+        'available_spots': available,
+        'occupied_spots': total - available,
+        'changes_at': changes_at,
+    }
+
+
+def cache_timeout(snapshot):
+    """Seconds the snapshot may be cached: never past its next change"""
+    left = (snapshot['changes_at'] - timezone.now()).total_seconds()
+    return max(1, min(CACHE_TIMEOUT, math.ceil(left)))
+
+
+def get_occupancy_snapshot():
+    snapshot = cache.get(CACHE_KEY)
+    if snapshot is None:
+        snapshot = build_occupancy_snapshot()
+        cache.set(CACHE_KEY, snapshot, cache_timeout(snapshot))
+    return snapshot
+
+
+async def aget_occupancy_snapshot():
+    snapshot = await cache.aget(CACHE_KEY)
+    if snapshot is None:
+        snapshot = await abuild_occupancy_snapshot()
+        await cache.aset(CACHE_KEY, snapshot, cache_timeout(snapshot))
+    return snapshot
+
+
+def invalidate_occupancy():
+    cache.delete(CACHE_KEY)
+    occupancy_invalidated.send(sender=None)
@@ -0,0 +1,58 @@
+from datetime import datetime
+
+from django.db.models import Q
+from django.utils.encoding import force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+PAGE_SIZE = 20
+
+
+def encode_cursor(obj, field='created_at'):
+    """Opaque cursor pointing just after ``obj`` in ``(-<field>, -id)`` order"""
+    return urlsafe_base64_encode(f"{getattr(obj, field).isoformat()}|{obj.pk}".encode())
+
+
+def decode_cursor(cursor):
+    """Return ``(datetime, pk)`` or ``None`` for a missing or malformed cursor"""
+    if not cursor:
+        return None
+    try:
+        created_at, pk = force_str(urlsafe_base64_decode(cursor)).split('|')
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, TypeError):
+        return None
+
+
+def keyset_page(queryset, cursor=None, size=PAGE_SIZE, field='created_at'):
+    """One page of ``queryset`` newest first, seeking past ``cursor``.
+
+    Unlike ``OFFSET`` the cost does not grow with the page number: the
+    ``(<field>, id)`` position is a plain range condition. Returns
+    ``(items, next_cursor)``; ``next_cursor`` is ``None`` on the last page.
+    """
+    items = list(_seek(queryset, cursor, field)[:size + 1])
+    return _cut(items, size, field)
+
+
+async def akeyset_page(queryset, cursor=None, size=PAGE_SIZE, field='created_at'):
+    """``keyset_page`` for async views"""
+    items = [obj async for obj in _seek(queryset, cursor, field)[:size + 1]]
+    return _cut(items, size, field)
+
+
+def _seek(queryset, cursor, field):
+    queryset = queryset.order_by(f'-{field}', '-id')
+    position = decode_cursor(cursor)
+    if position:
+        value, pk = position
+        queryset = queryset.filter(
+            Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk})
+        )
+    return queryset
+
+
+def _cut(items, size, field):
+    if len(items) > size:
+        items = items[:size]
+        return items, encode_cursor(items[-1], field)
+    return items, None
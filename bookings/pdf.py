@@ -0,0 +1,264 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.template.loader import render_to_string
+
+from .tickets import qr_payload, render_qr_png
+
+# Seconds a request waits for a single ticket before giving up
+SINGLE_TICKET_TIMEOUT = 30
+
+# Failed renders of one file before requests stop queueing it again
+MAX_RENDER_ATTEMPTS = 3
+
+# A lock file older than this belongs to a worker that died mid-render
+LOCK_STALE_AFTER = 10 * 60
+
+_pool = None
+_pool_lock = threading.RLock()
+_pending = {}
+
+# Set once per render process by _init_renderer
+_stylesheets = None
+_font_config = None
+
+
+class RenderError(Exception):
+    """The PDF could not be rendered (or not in time)"""
+
+
+def _init_renderer(css_text):
+    """Parse the shared stylesheet and font setup once per render process"""
+    global _stylesheets, _font_config
+    from weasyprint import CSS
+    from weasyprint.text.fonts import FontConfiguration
+
+    _font_config = FontConfiguration()
+    _stylesheets = [CSS(string=css_text, font_config=_font_config)]
+
+
+def _url_fetcher(url):
+    """Serve ``qr:<payload>`` images from the render process itself"""
+    if url.startswith('qr:'):
+        return {'string': render_qr_png(unquote(url[3:])), 'mime_type': 'image/png'}
+    from weasyprint import default_url_fetcher
+    return default_url_fetcher(url)
+
+
+def _render_to_file(documents, path, stale_prefix=None):
+    """Render HTML documents into one PDF at ``path`` (runs in the pool)"""
+    from weasyprint import HTML
+
+    rendered = [
+        HTML(string=html, url_fetcher=_url_fetcher).render(
+            stylesheets=_stylesheets, font_config=_font_config,
+        )
+        for html in documents
+    ]
+    merged = rendered[0].copy([page for document in rendered for page in document.pages])
+
+    path = Path(path)
+    tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+    merged.write_pdf(tmp)
+    os.replace(tmp, path)
+
+    if stale_prefix:
+        for old in [*path.parent.glob(f'{stale_prefix}*.pdf'), *path.parent.glob(f'{stale_prefix}*.failed')]:
+            if old != path:
+                old.unlink(missing_ok=True)
+    return str(path)
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            with open(finders.find('bookings/css/ticket_pdf.css'), encoding='utf-8') as f:
+                css_text = f.read()
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.PDF_RENDER_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_renderer,
+                initargs=(css_text,),
+            )
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _lock_path(path):
+    return path.with_suffix('.lock')
+
+
+def _failed_path(path):
+    return path.with_suffix('.failed')
+
+
+def _take_lock(path):
+    """Claim the render of ``path`` for this process; other workers see the lock file"""
+    lock = _lock_path(path)
+    for _ in range(2):
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            try:
+                if time.time() - lock.stat().st_mtime < LOCK_STALE_AFTER:
+                    return False
+            except FileNotFoundError:
+                continue
+            # The worker holding it died mid-render
+            lock.unlink(missing_ok=True)
+    return False
+
+
+def _failures(path):
+    """``(attempts, last error)`` of the failed renders of ``path`` in any worker"""
+    try:
+        attempts, _, error = _failed_path(path).read_text(encoding='utf-8').partition('\n')
+        return int(attempts), error
+    except (OSError, ValueError):
+        return 0, ''
+
+
+def _record_failure(path, error):
+    attempts, _ = _failures(path)
+    marker = _failed_path(path)
+    tmp = marker.with_suffix(f'.{os.getpid()}.tmp')
+    tmp.write_text(f'{attempts + 1}\n{error}', encoding='utf-8')
+    os.replace(tmp, marker)
+
+
+def _finished(path, future):
+    _pending.pop(str(path), None)
+    try:
+        if future.cancelled():
+            _record_failure(path, 'cancelled')
+        elif future.exception() is not None:
+            _record_failure(path, repr(future.exception()))
+    finally:
+        _lock_path(path).unlink(missing_ok=True)
+
+
+def _submit(path, build_documents, stale_prefix=None):
+    """Queue a render of ``path`` unless a worker already has one in flight.
+
+    Returns the future, or ``None`` when another process holds the render.
+    """
+    key = str(path)
+    with _pool_lock:
+        future = _pending.get(key)
+        if future is not None and not future.done():
+            return future
+        if not _take_lock(path):
+            return None
+        if path.exists():
+            # Finished by another worker since the caller looked
+            _lock_path(path).unlink(missing_ok=True)
+            return None
+        try:
+            documents = build_documents()
+            try:
+                future = _get_pool().submit(_render_to_file, documents, key, stale_prefix)
+            except BrokenProcessPool:
+                # A render process died; start a fresh pool
+                _reset_pool()
+                future = _get_pool().submit(_render_to_file, documents, key, stale_prefix)
+        except BaseException:
+            _lock_path(path).unlink(missing_ok=True)
+            raise
+        _pending[key] = future
+        future.add_done_callback(lambda f: _finished(path, f))
+    return future
+
+
+def _check_failures(path):
+    attempts, error = _failures(path)
+    if attempts >= MAX_RENDER_ATTEMPTS:
+        raise RenderError(f'Rendering failed {attempts} times: {error}')
+
+
+def _cache_dir():
+    path = Path(settings.PDF_CACHE_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _version(booking):
+    return int(booking.updated_at.timestamp() * 1_000_000)
+
+
+def _ticket_html(ticket):
+    return render_to_string('bookings/ticket_pdf.html', {
+        'ticket': ticket,
+        'booking': ticket.booking,
+        'qr_src': 'qr:' + quote(qr_payload(ticket), safe=''),
+    })
+
+
+def ticket_pdf(ticket):
+    """Path of the PDF for one ticket, rendering it if the booking changed.
+
+    Raises ``RenderError`` when the render fails or takes longer than
+    ``SINGLE_TICKET_TIMEOUT``.
+    """
+    prefix = f'ticket-{ticket.ticket_number}-'
+    path = _cache_dir() / f'{prefix}{_version(ticket.booking)}.pdf'
+    if path.exists():
+        return path
+    _check_failures(path)
+    future = _submit(path, lambda: [_ticket_html(ticket)], prefix)
+    if future is None:
+        # Another worker is rendering it: wait for its file
+        deadline = time.monotonic() + SINGLE_TICKET_TIMEOUT
+        attempts, _ = _failures(path)
+        while not path.exists():
+            if _failures(path)[0] > attempts:
+                _check_failures(path)
+                raise RenderError('Rendering failed in another worker')
+            if time.monotonic() > deadline:
+                raise RenderError(f'Not rendered within {SINGLE_TICKET_TIMEOUT}s')
+            time.sleep(0.2)
+        return path
+    try:
+        future.result(SINGLE_TICKET_TIMEOUT)
+    except TimeoutError as exc:
+        raise RenderError(f'Not rendered within {SINGLE_TICKET_TIMEOUT}s') from exc
+    except Exception as exc:
+        raise RenderError(repr(exc)) from exc
+    return path
+
+
+def batch_pdf(booking_date, tickets):
+    """Return ``(path, ready)`` for the PDF with every ticket of ``booking_date``.
+
+    The file name hashes each ticket's number and booking version, so any
+    change to one booking produces a new pack. When the pack is not on disk
+    yet it is queued for rendering and ``ready`` is ``False``; after
+    ``MAX_RENDER_ATTEMPTS`` failed renders it raises ``RenderError`` instead.
+    """
+    fingerprint = hashlib.sha256()
+    for ticket in tickets:
+        fingerprint.update(f'{ticket.ticket_number}:{_version(ticket.booking)};'.encode())
+    prefix = f'batch-{booking_date.isoformat()}-'
+    path = _cache_dir() / f'{prefix}{fingerprint.hexdigest()[:16]}.pdf'
+    if path.exists():
+        return path, True
+    _check_failures(path)
+    _submit(path, lambda: [_ticket_html(ticket) for ticket in tickets], prefix)
+    return path, False
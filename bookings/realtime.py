@@ -0,0 +1,308 @@
+"""Live spot availability pushed as Server-Sent Events.
+
+One ``Hub`` per process keeps the current availability, a version number
+and a short history of deltas. Subscribers keep nothing but the version
+they last sent: when they wake up they get the merged delta since that
+version, or a full snapshot if they fell further behind than the history
+reaches. A slow client therefore never builds up a queue, it just skips
+intermediate states, and every subscriber costs the same small amount of
+memory however busy the lot is.
+
+Changes are coalesced: a burst of saves inside ``COALESCE_SECONDS`` is one
+database read and one version. Bookings starting or ending change the map
+without any write, so the hub also re-reads when the snapshot says it will
+next change. With ``REALTIME_SOCKET_DIR`` set, every
+process also tells its siblings through unix datagram sockets, so a change
+written by any worker (WSGI or ASGI) reaches every stream.
+"""
+import asyncio
+import json
+import logging
+import os
+import secrets
+import socket
+from collections import deque
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .occupancy import CACHE_KEY, build_occupancy_snapshot, cache_timeout
+
+logger = logging.getLogger(__name__)
+
+COALESCE_SECONDS = 0.25
+
+# Deltas kept for clients that are a few versions behind
+HISTORY = 64
+
+RETRY_MS = 3000
+
+
+def load_state():
+    """Current availability as plain dicts, rebuilt from the database.
+
+    Returns ``(state, changes_at)``; ``changes_at`` is when the next booking
+    starts or ends.
+    """
+    snapshot = build_occupancy_snapshot()
+    cache.set(CACHE_KEY, snapshot, cache_timeout(snapshot))
+    return {
+        'spots': {spot.spot_number: spot.is_available for zone in snapshot['zones'] for spot in zone.spots},
+        'zones': {zone.code: zone.available for zone in snapshot['zones']},
+        'total_spots': snapshot['total_spots'],
+        'available_spots': snapshot['available_spots'],
+        'occupied_spots': snapshot['occupied_spots'],
+    }, snapshot['changes_at']
+
+
+def diff_states(old, new):
+    """Delta turning ``old`` into ``new``, or ``None`` when nothing changed.
+
+    Removed spots map to ``None``.
+    """
+    spots = {number: value for number, value in new['spots'].items() if old['spots'].get(number) != value}
+    spots.update({number: None for number in old['spots'].keys() - new['spots'].keys()})
+    zones = {code: value for code, value in new['zones'].items() if old['zones'].get(code) != value}
+    if not spots and not zones and old['total_spots'] == new['total_spots']:
+        return None
+    return {
+        'spots': spots,
+        'zones': zones,
+        'total_spots': new['total_spots'],
+        'available_spots': new['available_spots'],
+        'occupied_spots': new['occupied_spots'],
+    }
+
+
+def merge_deltas(deltas):
+    merged = {'spots': {}, 'zones': {}}
+    for delta in deltas:
+        merged['spots'].update(delta['spots'])
+        merged['zones'].update(delta['zones'])
+        for key in ('total_spots', 'available_spots', 'occupied_spots'):
+            merged[key] = delta[key]
+    return merged
+
+
+class SocketFanout:
+    """Tell sibling processes about changes over unix datagram sockets.
+
+    Each listening process binds ``<directory>/<pid>.sock``; a change is one
+    empty datagram to every other socket in the directory. Sockets left
+    behind by dead processes are removed when a send is refused.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.path = self.directory / f'{os.getpid()}.sock'
+        self.sock = None
+
+    def listen(self, loop, callback):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.path = self.directory / f'{os.getpid()}.sock'
+        self.path.unlink(missing_ok=True)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.sock.bind(str(self.path))
+        loop.add_reader(self.sock.fileno(), self._drain, callback)
+
+    def _drain(self, callback):
+        # Any number of pending datagrams is a single "something changed"
+        try:
+            while True:
+                self.sock.recv(16)
+        except BlockingIOError:
+            pass
+        callback()
+
+    def send(self):
+        own = f'{os.getpid()}.sock'
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sender:
+            sender.setblocking(False)
+            for peer in self.directory.glob('*.sock'):
+                if peer.name == own:
+                    continue
+                try:
+                    sender.sendto(b'!', str(peer))
+                except (ConnectionRefusedError, FileNotFoundError):
+                    peer.unlink(missing_ok=True)
+                except OSError:
+                    # Full receive buffer: that process already has a change pending
+                    pass
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+            self.path.unlink(missing_ok=True)
+
+
+class Hub:
+    """Per-process broadcaster of availability versions"""
+
+    def __init__(self, coalesce=COALESCE_SECONDS, history=HISTORY, fanout_dir=None):
+        self.coalesce = coalesce
+        self.fanout = SocketFanout(fanout_dir) if fanout_dir else None
+        # Event ids carry the epoch so ids from before a restart are not trusted
+        self.epoch = secrets.token_hex(4)
+        self.version = 0
+        self.state = None
+        self.history = deque(maxlen=history)
+        self.loop = None
+        self._messages = {}
+        self._reset()
+
+    def _reset(self):
+        if getattr(self, '_expiry', None) is not None:
+            self._expiry.cancel()
+        self._expiry = None
+        self._ready = None
+        self._changed = None
+        self._timer = None
+        self._refreshing = False
+        self._dirty = False
+
+    def bind(self, loop):
+        """Attach to the event loop that serves the streams"""
+        if self.fanout is not None:
+            if self.fanout.sock is not None and self.loop is not None and not self.loop.is_closed():
+                self.loop.remove_reader(self.fanout.sock.fileno())
+            self.fanout.close()
+            self.fanout.listen(loop, self._mark_dirty)
+        self.loop = loop
+        self._reset()
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            self.bind(loop)
+        if self._ready is None or (self._ready.done() and (self._ready.cancelled() or self._ready.exception())):
+            self._ready = loop.create_task(self._refresh())
+        await asyncio.shield(self._ready)
+
+    # Publishing ------------------------------------------------------
+
+    def notify(self):
+        """Availability may have changed; safe to call from any thread"""
+        if self.fanout is not None:
+            self.fanout.send()
+        loop = self.loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._mark_dirty)
+
+    def _mark_dirty(self):
+        if self._refreshing:
+            self._dirty = True
+        elif self._timer is None:
+            self._timer = self.loop.call_later(self.coalesce, self._start_refresh)
+
+    def _start_refresh(self):
+        self._timer = None
+        self._ready = self.loop.create_task(self._refresh())
+
+    async def _refresh(self):
+        self._refreshing = True
+        try:
+            while True:
+                self._dirty = False
+                state, changes_at = await sync_to_async(load_state, thread_sensitive=False)()
+                self.publish(state)
+                self._expire_at(changes_at)
+                if not self._dirty:
+                    break
+                await asyncio.sleep(self.coalesce)
+        except Exception:
+            if self.state is None:
+                raise
+            logger.exception('Could not refresh live availability')
+        finally:
+            self._refreshing = False
+
+    def _expire_at(self, changes_at):
+        # Re-read when the next booking starts or ends, even if nothing is saved
+        if self._expiry is not None:
+            self._expiry.cancel()
+        delay = max(0, (changes_at - timezone.now()).total_seconds())
+        self._expiry = self.loop.call_later(delay, self._mark_dirty)
+
+    def publish(self, state):
+        if self.state is not None:
+            delta = diff_states(self.state, state)
+            if delta is None:
+                return
+            self.history.append((self.version + 1, delta))
+        self.state = state
+        self.version += 1
+        self._messages.clear()
+        changed, self._changed = self._changed, None
+        if changed is not None and not changed.done():
+            changed.set_result(self.version)
+
+    # Subscribing -----------------------------------------------------
+
+    async def wait(self, version, timeout):
+        """Wait until the hub is past ``version``; ``False`` on timeout"""
+        if self.version != version:
+            return True
+        if self._changed is None:
+            self._changed = self.loop.create_future()
+        try:
+            # One future per version is shared by every waiting subscriber
+            await asyncio.wait_for(asyncio.shield(self._changed), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def event_id(self):
+        return f'{self.epoch}-{self.version}'
+
+    def parse_event_id(self, value):
+        epoch, _, version = (value or '').partition('-')
+        if epoch != self.epoch or not version.isdigit():
+            return None
+        return int(version)
+
+    def message_since(self, version):
+        """SSE message moving a client from ``version`` to the current one.
+
+        Messages are encoded once per version and shared by every client
+        at the same position.
+        """
+        message = self._messages.get(version)
+        if message is None:
+            oldest = self.history[0][0] if self.history else None
+            if version is None or oldest is None or not oldest <= version + 1 <= self.version:
+                event, data = 'snapshot', self.state
+            else:
+                event, data = 'delta', merge_deltas(delta for v, delta in self.history if v > version)
+            payload = json.dumps(data, separators=(',', ':'))
+            message = f'event: {event}\nid: {self.event_id()}\ndata: {payload}\n\n'.encode()
+            self._messages[version] = message
+        return message
+
+    async def stream(self, last_event_id=None, heartbeat=15):
+        """Async iterator of SSE messages for one client.
+
+        Each ``yield`` waits until the server has handed the previous
+        message to the client, so a slow reader simply falls behind and
+        catches up with one merged message.
+        """
+        await self.start()
+        version = self.parse_event_id(last_event_id)
+        if version is not None and version > self.version:
+            version = None
+        yield f'retry: {RETRY_MS}\n\n'.encode()
+        while True:
+            if version == self.version:
+                if not await self.wait(version, heartbeat):
+                    yield b': keep-alive\n\n'
+                continue
+            current = self.version
+            yield self.message_since(version)
+            version = current
+
+
+hub = Hub(fanout_dir=getattr(settings, 'REALTIME_SOCKET_DIR', None))
@@ -0,0 +1,78 @@
+from datetime import timedelta
+
+from django.db import transaction
+
+from .allocation import dates_without_free_spot, overlapping
+from .ids import new_booking_id
+from .models import Booking, BookingStat, booking_ends_at
+
+FREQUENCY_CHOICES = [
+    ('daily', 'Every day'),
+    ('weekdays', 'Weekdays (Mon-Fri)'),
+    ('weekly', 'Every week'),
+]
+
+# A series may span at most a year
+MAX_OCCURRENCES = 366
+
+
+def expand(first_date, until, frequency):
+    """Dates of the series from ``first_date`` through ``until`` inclusive"""
+    step = 7 if frequency == 'weekly' else 1
+    dates = []
+    day = first_date
+    while day <= until and len(dates) < MAX_OCCURRENCES:
+        if frequency != 'weekdays' or day.weekday() < 5:
+            dates.append(day)
+        day += timedelta(days=step)
+    return dates
+
+
+def find_conflicts(user, car_license, dates, start_time, end_time):
+    """Return ``{date: reason}`` for occurrences that cannot be booked.
+
+    Two queries cover the whole series: the user's own active bookings of
+    the same car in the window, and the approved bookings that decide
+    whether any spot is free on each date.
+    """
+    conflicts = {}
+    for booking_date in dates_without_free_spot(dates, start_time, end_time):
+        conflicts[booking_date] = 'no free spot'
+    own = overlapping(
+        Booking.objects.filter(
+            user=user, car_license=car_license, booking_date__in=dates,
+            status__in=['WAITING', 'APPROVED'],
+        ),
+        start_time, end_time,
+    )
+    for booking_date in own.values_list('booking_date', flat=True).order_by():
+        conflicts[booking_date] = 'already booked'
+    return conflicts
+
+
+def create_series(template, dates):
+    """Insert one ``WAITING`` copy of ``template`` per date with one ``bulk_create``"""
+    bookings = []
+    for booking_date in dates:
+        booking = Booking(
+            booking_id=new_booking_id(),
+            user=template.user,
+            user_car=template.user_car,
+            car_license=template.car_license,
+            car_model=template.car_model,
+            phone_number=template.phone_number,
+            booking_date=booking_date,
+            start_time=template.start_time,
+            end_time=template.end_time,
+            ends_at=booking_ends_at(booking_date, template.start_time, template.end_time),
+            note=template.note,
+            status='WAITING',
+        )
+        bookings.append(booking)
+
+    with transaction.atomic():
+        Booking.objects.bulk_create(bookings)
+        for booking in bookings:
+            booking._stat_state = booking.stat_state()
+        BookingStat.objects.shift(added=[booking._stat_state for booking in bookings])
+    return bookings
@@ -0,0 +1,84 @@
+from django.urls import reverse
+from rest_framework import serializers
+
+from .models import Booking, ParkingSpot, Ticket
+from .tickets import qr_digest, qr_payload
+
+
+class SparseFieldsMixin:
+    """Limit output to ``?fields=a,b`` and name the columns those fields read.
+
+    ``Meta.only`` maps a field to the model paths it needs when that is not
+    simply its ``source`` (method fields, for example).
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def selected(cls, request):
+        """Field names asked for in ``?fields=``, or ``None`` for all of them"""
+        raw = request.query_params.get('fields') if request else None
+        if not raw:
+            return None
+        known = cls().fields
+        return [name for name in raw.split(',') if name in known] or None
+
+    @classmethod
+    def only_paths(cls, names=None):
+        """Model paths to pass to ``QuerySet.only()`` for the given fields"""
+        fields = cls().fields
+        extra = getattr(cls.Meta, 'only', {})
+        paths = set()
+        for name in names or fields:
+            if name in extra:
+                paths.update(extra[name])
+            elif fields[name].source != '*':
+                paths.add(fields[name].source.replace('.', '__'))
+        return paths
+
+
+class SpotSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = ParkingSpot
+        fields = ['id', 'spot_number', 'zone', 'in_service', 'is_available']
+
+
+class BookingSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    spot_number = serializers.CharField(source='parking_spot.spot_number', read_only=True, allow_null=True)
+    zone = serializers.CharField(source='parking_spot.zone', read_only=True, allow_null=True)
+
+    class Meta:
+        model = Booking
+        fields = [
+            'booking_id', 'status', 'booking_date', 'start_time', 'end_time',
+            'car_license', 'car_model', 'spot_number', 'zone', 'note',
+            'created_at', 'updated_at', 'approved_at',
+        ]
+
+
+class TicketSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    booking_id = serializers.CharField(source='booking.booking_id', read_only=True)
+    booking_date = serializers.DateField(source='booking.booking_date', read_only=True)
+    start_time = serializers.TimeField(source='booking.start_time', read_only=True)
+    end_time = serializers.TimeField(source='booking.end_time', read_only=True)
+    car_license = serializers.CharField(source='booking.car_license', read_only=True)
+    spot_number = serializers.CharField(source='booking.parking_spot.spot_number', read_only=True, allow_null=True)
+    qr_image = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Ticket
+        fields = [
+            'ticket_number', 'booking_id', 'booking_date', 'start_time', 'end_time',
+            'car_license', 'spot_number', 'qr_code', 'qr_image', 'issued_at',
+        ]
+        only = {'qr_image': ['qr_code', 'ticket_number', 'booking__booking_id']}
+
+    def get_qr_image(self, ticket):
+        url = reverse('ticket_qr', args=[ticket.booking.booking_id, qr_digest(qr_payload(ticket))])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
@@ -0,0 +1,67 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .backends import invalidate_user
+from .cars import invalidate_user_cars
+from .models import Booking, BookingStat, ParkingSpot, UserCar
+from .occupancy import invalidate_occupancy, occupancy_invalidated
+from .realtime import hub
+from .timing import record_query
+
+
+@receiver(post_save, sender=ParkingSpot)
+@receiver(post_delete, sender=ParkingSpot)
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def occupancy_changed(sender, **kwargs):
+    invalidate_occupancy()
+
+
+@receiver(occupancy_invalidated)
+def publish_availability(sender, **kwargs):
+    # Streams re-read the database, so only tell them once the write is visible
+    transaction.on_commit(hub.notify)
+
+
+@receiver(post_delete, sender=Booking)
+def uncount_booking(sender, instance, **kwargs):
+    state = getattr(instance, '_stat_state', None) or instance.stat_state()
+    if state:
+        BookingStat.objects.shift(removed=[state])
+
+
+@receiver(pre_save, sender=ParkingSpot)
+def recount_rezoned_spot(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    old_zone = ParkingSpot.objects.filter(pk=instance.pk).values_list('zone', flat=True).first()
+    if old_zone and old_zone != instance.zone:
+        BookingStat.objects.move_spot(instance.pk, old_zone, instance.zone)
+
+
+@receiver(pre_delete, sender=ParkingSpot)
+def recount_removed_spot(sender, instance, **kwargs):
+    # The spot's bookings are about to lose it (SET_NULL) without signals
+    BookingStat.objects.move_spot(instance.pk, instance.zone, '')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=UserCar)
+@receiver(post_delete, sender=UserCar)
+def forget_cached_cars(sender, instance, **kwargs):
+    invalidate_user_cars(instance.user_id)
+
+
+@receiver(connection_created)
+def time_queries(sender, connection, **kwargs):
+    # Server-Timing (timing.py); the wrapper list outlives reconnects
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
@@ -0,0 +1,714 @@
+"""Build the site stylesheet from the utility classes the app uses.
+
+The pages are styled with Tailwind-style utility classes (``px-4``,
+``hover:bg-indigo-700``, ``md:grid-cols-3`` ...). Rather than running a
+CSS compiler in every visitor's browser, ``build_css`` scans the templates
+and the form widget ``attrs`` for class names and writes rules for just
+those classes, following Tailwind v3's default theme. Other tokens (ids,
+template variables, prose) are skipped, but every name inside a ``class``
+attribute or a widget's ``'class'`` must either get a rule or be listed in
+``CUSTOM_CLASSES``; ``build_css`` fails otherwise, so a utility this module
+does not implement cannot end up unstyled without anyone noticing.
+
+Rules are ordered the way Tailwind orders them: base utilities in a fixed
+property order (so ``border border-l-4`` and ``hidden lg:flex`` behave),
+then state variants, then each breakpoint from small to large.
+"""
+import re
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent
+
+SOURCES = [
+    'templates/bookings/*.html',
+    'forms.py',
+    'car_forms.py',
+    'register_forms.py',
+    'analytics.py',
+]
+
+OUTPUT = APP_DIR / 'static' / 'bookings' / 'css' / 'app.css'
+
+# Class names that are not utilities: styled in base.html's <style> or
+# used as JavaScript hooks
+CUSTOM_CLASSES = {'nav-link', 'mobile-menu', 'booking-select'}
+
+# Templates styled by a stylesheet of their own, not app.css
+OWN_STYLESHEET = {'ticket_pdf.html'}  # css/ticket_pdf.css
+
+# Tailwind v3 default palette, shades 50, 100, 200 ... 900, 950
+_SHADES = ['50', '100', '200', '300', '400', '500', '600', '700', '800', '900', '950']
+_PALETTE = {
+    'slate': 'f8fafc f1f5f9 e2e8f0 cbd5e1 94a3b8 64748b 475569 334155 1e293b 0f172a 020617',
+    'gray': 'f9fafb f3f4f6 e5e7eb d1d5db 9ca3af 6b7280 4b5563 374151 1f2937 111827 030712',
+    'zinc': 'fafafa f4f4f5 e4e4e7 d4d4d8 a1a1aa 71717a 52525b 3f3f46 27272a 18181b 09090b',
+    'neutral': 'fafafa f5f5f5 e5e5e5 d4d4d4 a3a3a3 737373 525252 404040 262626 171717 0a0a0a',
+    'stone': 'fafaf9 f5f5f4 e7e5e4 d6d3d1 a8a29e 78716c 57534e 44403c 292524 1c1917 0c0a09',
+    'red': 'fef2f2 fee2e2 fecaca fca5a5 f87171 ef4444 dc2626 b91c1c 991b1b 7f1d1d 450a0a',
+    'orange': 'fff7ed ffedd5 fed7aa fdba74 fb923c f97316 ea580c c2410c 9a3412 7c2d12 431407',
+    'amber': 'fffbeb fef3c7 fde68a fcd34d fbbf24 f59e0b d97706 b45309 92400e 78350f 451a03',
+    'yellow': 'fefce8 fef9c3 fef08a fde047 facc15 eab308 ca8a04 a16207 854d0e 713f12 422006',
+    'lime': 'f7fee7 ecfccb d9f99d bef264 a3e635 84cc16 65a30d 4d7c0f 3f6212 365314 1a2e05',
+    'green': 'f0fdf4 dcfce7 bbf7d0 86efac 4ade80 22c55e 16a34a 15803d 166534 14532d 052e16',
+    'emerald': 'ecfdf5 d1fae5 a7f3d0 6ee7b7 34d399 10b981 059669 047857 065f46 064e3b 022c22',
+    'teal': 'f0fdfa ccfbf1 99f6e4 5eead4 2dd4bf 14b8a6 0d9488 0f766e 115e59 134e4a 042f2e',
+    'cyan': 'ecfeff cffafe a5f3fc 67e8f9 22d3ee 06b6d4 0891b2 0e7490 155e75 164e63 083344',
+    'sky': 'f0f9ff e0f2fe bae6fd 7dd3fc 38bdf8 0ea5e9 0284c7 0369a1 075985 0c4a6e 082f49',
+    'blue': 'eff6ff dbeafe bfdbfe 93c5fd 60a5fa 3b82f6 2563eb 1d4ed8 1e40af 1e3a8a 172554',
+    'indigo': 'eef2ff e0e7ff c7d2fe a5b4fc 818cf8 6366f1 4f46e5 4338ca 3730a3 312e81 1e1b4b',
+    'violet': 'f5f3ff ede9fe ddd6fe c4b5fd a78bfa 8b5cf6 7c3aed 6d28d9 5b21b6 4c1d95 2e1065',
+    'purple': 'faf5ff f3e8ff e9d5ff d8b4fe c084fc a855f7 9333ea 7e22ce 6b21a8 581c87 3b0764',
+    'fuchsia': 'fdf4ff fae8ff f5d0fe f0abfc e879f9 d946ef c026d3 a21caf 86198f 701a75 4a044e',
+    'pink': 'fdf2f8 fce7f3 fbcfe8 f9a8d4 f472b6 ec4899 db2777 be185d 9d174d 831843 500724',
+    'rose': 'fff1f2 ffe4e6 fecdd3 fda4af fb7185 f43f5e e11d48 be123c 9f1239 881337 4c0519',
+}
+COLORS = {
+    f'{hue}-{shade}': tuple(int(value[i:i + 2], 16) for i in (0, 2, 4))
+    for hue, values in _PALETTE.items()
+    for shade, value in zip(_SHADES, values.split())
+}
+COLORS.update({'white': (255, 255, 255), 'black': (0, 0, 0)})
+SPECIAL_COLORS = {'transparent': 'transparent', 'current': 'currentColor', 'inherit': 'inherit'}
+
+SPACING = {'0': '0px', 'px': '1px'}
+for _step in [0.5, 1, 1.5, 2, 2.5, 3, 3.5, 4, 5, 6, 7, 8, 9, 10, 11, 12, 14, 16, 20, 24, 28, 32,
+              36, 40, 44, 48, 52, 56, 60, 64, 72, 80, 96]:
+    SPACING[f'{_step:g}'] = f'{_step / 4:g}rem'
+
+FONT_SIZES = {
+    'xs': ('0.75rem', '1rem'), 'sm': ('0.875rem', '1.25rem'), 'base': ('1rem', '1.5rem'),
+    'lg': ('1.125rem', '1.75rem'), 'xl': ('1.25rem', '1.75rem'), '2xl': ('1.5rem', '2rem'),
+    '3xl': ('1.875rem', '2.25rem'), '4xl': ('2.25rem', '2.5rem'), '5xl': ('3rem', '1'),
+    '6xl': ('3.75rem', '1'), '7xl': ('4.5rem', '1'), '8xl': ('6rem', '1'), '9xl': ('8rem', '1'),
+}
+FONT_WEIGHTS = {
+    'thin': 100, 'extralight': 200, 'light': 300, 'normal': 400, 'medium': 500,
+    'semibold': 600, 'bold': 700, 'extrabold': 800, 'black': 900,
+}
+FONT_FAMILIES = {
+    'sans': 'ui-sans-serif, system-ui, sans-serif, "Apple Color Emoji", "Segoe UI Emoji", "Segoe UI Symbol", "Noto Color Emoji"',
+    'serif': 'ui-serif, Georgia, Cambria, "Times New Roman", Times, serif',
+    'mono': 'ui-monospace, SFMono-Regular, Menlo, Monaco, Consolas, "Liberation Mono", "Courier New", monospace',
+}
+TRACKING = {'tighter': '-0.05em', 'tight': '-0.025em', 'normal': '0em', 'wide': '0.025em',
+            'wider': '0.05em', 'widest': '0.1em'}
+LEADING = {'none': '1', 'tight': '1.25', 'snug': '1.375', 'normal': '1.5', 'relaxed': '1.625', 'loose': '2'}
+RADII = {'none': '0px', 'sm': '0.125rem', '': '0.25rem', 'md': '0.375rem', 'lg': '0.5rem',
+         'xl': '0.75rem', '2xl': '1rem', '3xl': '1.5rem', 'full': '9999px'}
+SHADOWS = {
+    'sm': '0 1px 2px 0 rgb(0 0 0 / 0.05)',
+    '': '0 1px 3px 0 rgb(0 0 0 / 0.1), 0 1px 2px -1px rgb(0 0 0 / 0.1)',
+    'md': '0 4px 6px -1px rgb(0 0 0 / 0.1), 0 2px 4px -2px rgb(0 0 0 / 0.1)',
+    'lg': '0 10px 15px -3px rgb(0 0 0 / 0.1), 0 4px 6px -4px rgb(0 0 0 / 0.1)',
+    'xl': '0 20px 25px -5px rgb(0 0 0 / 0.1), 0 8px 10px -6px rgb(0 0 0 / 0.1)',
+    '2xl': '0 25px 50px -12px rgb(0 0 0 / 0.25)',
+    'inner': 'inset 0 2px 4px 0 rgb(0 0 0 / 0.05)',
+    'none': '0 0 #0000',
+}
+MAX_WIDTHS = {
+    'none': 'none', 'xs': '20rem', 'sm': '24rem', 'md': '28rem', 'lg': '32rem', 'xl': '36rem',
+    '2xl': '42rem', '3xl': '48rem', '4xl': '56rem', '5xl': '64rem', '6xl': '72rem', '7xl': '80rem',
+    'full': '100%', 'prose': '65ch',
+}
+SIZES = {'auto': 'auto', 'full': '100%', 'min': 'min-content', 'max': 'max-content', 'fit': 'fit-content'}
+BREAKPOINTS = {'sm': '640px', 'md': '768px', 'lg': '1024px', 'xl': '1280px', '2xl': '1536px'}
+
+# State variants, in Tailwind's order; the value is the selector suffix
+STATES = {
+    'first': ':first-child', 'last': ':last-child', 'odd': ':nth-child(odd)', 'even': ':nth-child(even)',
+    'hover': ':hover', 'focus': ':focus', 'focus-within': ':focus-within', 'focus-visible': ':focus-visible',
+    'active': ':active', 'disabled': ':disabled',
+}
+
+DISPLAYS = ['block', 'inline-block', 'inline', 'flex', 'inline-flex', 'table', 'table-row', 'table-cell',
+            'grid', 'inline-grid', 'contents', 'list-item', 'hidden']
+DIRECTIONS = {'t': 'top', 'r': 'right', 'b': 'bottom', 'l': 'left'}
+GRADIENT_SIDES = {'t': 'top', 'tr': 'top right', 'r': 'right', 'br': 'bottom right',
+                  'b': 'bottom', 'bl': 'bottom left', 'l': 'left', 'tl': 'top left'}
+EASE = 'cubic-bezier(0.4, 0, 0.2, 1)'
+TRANSITIONS = {
+    '': 'color, background-color, border-color, text-decoration-color, fill, stroke, opacity, box-shadow, transform, filter, backdrop-filter',
+    'all': 'all',
+    'colors': 'color, background-color, border-color, text-decoration-color, fill, stroke',
+    'opacity': 'opacity',
+    'shadow': 'box-shadow',
+    'transform': 'transform',
+    'none': 'none',
+}
+TRANSFORM = ('translate(var(--tw-translate-x, 0), var(--tw-translate-y, 0)) rotate(var(--tw-rotate, 0)) '
+             'scale(var(--tw-scale-x, 1), var(--tw-scale-y, 1))')
+SIBLINGS = ' > :not([hidden]) ~ :not([hidden])'
+SR_ONLY = [('position', 'absolute'), ('width', '1px'), ('height', '1px'), ('padding', '0'), ('margin', '-1px'),
+           ('overflow', 'hidden'), ('clip', 'rect(0, 0, 0, 0)'), ('white-space', 'nowrap'), ('border-width', '0')]
+
+# Trimmed-down Tailwind v3 preflight (itself based on modern-normalize)
+PREFLIGHT = """\
+*,::before,::after{box-sizing:border-box;border-width:0;border-style:solid;border-color:#e5e7eb}
+html{line-height:1.5;-webkit-text-size-adjust:100%%;tab-size:4;font-family:%(sans)s}
+body{margin:0;line-height:inherit}
+hr{height:0;color:inherit;border-top-width:1px}
+h1,h2,h3,h4,h5,h6{font-size:inherit;font-weight:inherit}
+a{color:inherit;text-decoration:inherit}
+b,strong{font-weight:bolder}
+code,kbd,samp,pre{font-family:%(mono)s;font-size:1em}
+small{font-size:80%%}
+table{text-indent:0;border-color:inherit;border-collapse:collapse}
+button,input,optgroup,select,textarea{font-family:inherit;font-size:100%%;font-weight:inherit;line-height:inherit;color:inherit;margin:0;padding:0}
+button,select{text-transform:none}
+button,[type=button],[type=reset],[type=submit]{-webkit-appearance:button;background-color:transparent;background-image:none}
+summary{display:list-item}
+blockquote,dl,dd,h1,h2,h3,h4,h5,h6,hr,figure,p,pre{margin:0}
+fieldset{margin:0;padding:0}
+legend{padding:0}
+ol,ul,menu{list-style:none;margin:0;padding:0}
+textarea{resize:vertical}
+input::placeholder,textarea::placeholder{opacity:1;color:#9ca3af}
+button,[role=button]{cursor:pointer}
+:disabled{cursor:default}
+img,svg,video,canvas,audio,iframe,embed,object{display:block;vertical-align:middle}
+img,video{max-width:100%%;height:auto}
+[hidden]{display:none}
+""" % FONT_FAMILIES
+
+_TOKEN = re.compile(r'[^\s"\'`<>=;{}()%,]+')
+
+
+def scan(sources=SOURCES, base=APP_DIR):
+    """Every class-like token in the source files"""
+    tokens = set()
+    for pattern in sources:
+        for path in sorted(base.glob(pattern)):
+            tokens.update(_TOKEN.findall(path.read_text(encoding='utf-8')))
+    return tokens
+
+
+_TEMPLATE_TAG = re.compile(r'\{%.*?%\}|\{\{.*?\}\}|\{#.*?#\}', re.S)
+_CLASS_VALUE = re.compile(r'''\bclass\s*=\s*"([^"]*)"|\bclass\s*=\s*'([^']*)'|'class'\s*:\s*'([^']*)'|"class"\s*:\s*"([^"]*)"''')
+
+
+def unstyled(sources=SOURCES, base=APP_DIR):
+    """``{class name: [file names]}`` for names in class attributes that get no rule"""
+    missing = {}
+    for pattern in sources:
+        for path in sorted(base.glob(pattern)):
+            if path.name in OWN_STYLESHEET:
+                continue
+            # Tags inside an attribute ({% if %}bg-red-500{% endif %}) leave their classes behind
+            text = _TEMPLATE_TAG.sub(' ', path.read_text(encoding='utf-8'))
+            for match in _CLASS_VALUE.finditer(text):
+                for name in ''.join(filter(None, match.groups())).split():
+                    if name not in CUSTOM_CLASSES and rule_for(name) is None:
+                        missing.setdefault(name, []).append(path.name)
+    return {name: sorted(set(files)) for name, files in missing.items()}
+
+
+def _color(name):
+    if name in SPECIAL_COLORS:
+        return SPECIAL_COLORS[name], None
+    if name in COLORS:
+        return None, COLORS[name]
+    return None, None
+
+
+def _colored(prop, name, opacity_var):
+    """Declarations setting ``prop`` to a palette colour, honouring the *-opacity utilities"""
+    keyword, rgb = _color(name)
+    if keyword:
+        return [(prop, keyword)]
+    if rgb:
+        r, g, b = rgb
+        return [(opacity_var, '1'), (prop, f'rgb({r} {g} {b} / var({opacity_var}))')]
+    return None
+
+
+def _length(value, scale):
+    if value.startswith('[') and value.endswith(']'):
+        return value[1:-1].replace('_', ' ')
+    return scale.get(value)
+
+
+def _spacing(value, extra=None):
+    return _length(value, {**SPACING, **(extra or {})})
+
+
+# Each utility returns ``(group, sub_order, declarations, selector_suffix)``;
+# group is the index in UTILITIES, so rules come out in this order.
+
+def _sr_only(name):
+    if name == 'sr-only':
+        return 0, SR_ONLY
+
+
+def _position(name):
+    if name in ('static', 'fixed', 'absolute', 'relative', 'sticky'):
+        return 0, [('position', name)]
+
+
+def _inset(name):
+    match = re.fullmatch(r'(inset|inset-x|inset-y|top|right|bottom|left)-(.+)', name)
+    if not match:
+        return None
+    value = _spacing(match[2], {'auto': 'auto', 'full': '100%'})
+    if value is None:
+        return None
+    props = {'inset': ['inset'], 'inset-x': ['left', 'right'], 'inset-y': ['top', 'bottom']}.get(
+        match[1], [match[1]])
+    return {'inset': 0, 'inset-x': 1, 'inset-y': 1}.get(match[1], 2), [(prop, value) for prop in props]
+
+
+def _z_index(name):
+    match = re.fullmatch(r'z-(\d+|auto)', name)
+    if match:
+        return 0, [('z-index', match[1])]
+
+
+def _margin(name):
+    return _box('m', 'margin', name, {'auto': 'auto'})
+
+
+def _padding(name):
+    return _box('p', 'padding', name)
+
+
+def _box(prefix, prop, name, extra=None):
+    match = re.fullmatch(prefix + r'([xytrbl]?)-(.+)', name)
+    if not match:
+        return None
+    value = _spacing(match[2], extra)
+    if value is None:
+        return None
+    side = match[1]
+    if not side:
+        return 0, [(prop, value)]
+    if side in 'xy':
+        sides = ('left', 'right') if side == 'x' else ('top', 'bottom')
+        return 1, [(f'{prop}-{sides[0]}', value), (f'{prop}-{sides[1]}', value)]
+    return 2, [(f'{prop}-{DIRECTIONS[side]}', value)]
+
+
+def _display(name):
+    if name in DISPLAYS:
+        return DISPLAYS.index(name), [('display', 'none' if name == 'hidden' else name)]
+
+
+def _height(name):
+    match = re.fullmatch(r'(min-|max-)?h-(.+)', name)
+    if not match or match[1]:
+        return None
+    value = _spacing(match[2], {**SIZES, 'screen': '100vh'})
+    if value is not None:
+        return 0, [('height', value)]
+
+
+def _min_height(name):
+    value = {'min-h-0': '0px', 'min-h-full': '100%', 'min-h-screen': '100vh'}.get(name)
+    if value:
+        return 0, [('min-height', value)]
+
+
+def _width(name):
+    match = re.fullmatch(r'w-(.+)', name)
+    if not match:
+        return None
+    value = _spacing(match[1], {**SIZES, 'screen': '100vw'})
+    if value is None:
+        fraction = re.fullmatch(r'(\d+)/(\d+)', match[1])
+        if fraction:
+            value = f'{int(fraction[1]) / int(fraction[2]) * 100:g}%'
+    if value is not None:
+        return 0, [('width', value)]
+
+
+def _min_width(name):
+    value = {'min-w-0': '0px', 'min-w-full': '100%', 'min-w-min': 'min-content', 'min-w-max': 'max-content'}.get(name)
+    if value:
+        return 0, [('min-width', value)]
+
+
+def _max_width(name):
+    match = re.fullmatch(r'max-w-(.+)', name)
+    if not match:
+        return None
+    value = _length(match[1], MAX_WIDTHS)
+    if value is None and match[1].startswith('screen-'):
+        value = BREAKPOINTS.get(match[1][7:])
+    if value is not None:
+        return 0, [('max-width', value)]
+
+
+def _flex(name):
+    value = {'flex-1': '1 1 0%', 'flex-auto': '1 1 auto', 'flex-initial': '0 1 auto', 'flex-none': 'none'}.get(name)
+    if value:
+        return 0, [('flex', value)]
+    if name in ('flex-shrink-0', 'shrink-0'):
+        return 1, [('flex-shrink', '0')]
+
+
+def _transform(name):
+    if name == 'transform':
+        return 0, [('transform', TRANSFORM)]
+    match = re.fullmatch(r'scale-(\d+)', name)
+    if match:
+        scale = f'{int(match[1]) / 100:g}'
+        return 1, [('--tw-scale-x', scale), ('--tw-scale-y', scale), ('transform', TRANSFORM)]
+
+
+def _cursor(name):
+    match = re.fullmatch(r'cursor-(pointer|default|not-allowed|wait|text|move)', name)
+    if match:
+        return 0, [('cursor', match[1])]
+
+
+def _list_style(name):
+    position = {'list-inside': 'inside', 'list-outside': 'outside'}.get(name)
+    if position:
+        return 0, [('list-style-position', position)]
+    kind = {'list-none': 'none', 'list-disc': 'disc', 'list-decimal': 'decimal'}.get(name)
+    if kind:
+        return 1, [('list-style-type', kind)]
+
+
+def _grid_columns(name):
+    match = re.fullmatch(r'grid-cols-(\d+|none)', name)
+    if match:
+        value = 'none' if match[1] == 'none' else f'repeat({match[1]}, minmax(0, 1fr))'
+        return 0, [('grid-template-columns', value)]
+    match = re.fullmatch(r'col-span-(\d+|full)', name)
+    if match:
+        value = '1 / -1' if match[1] == 'full' else f'span {match[1]} / span {match[1]}'
+        return 1, [('grid-column', value)]
+
+
+def _flex_layout(name):
+    direction = {'flex-row': 'row', 'flex-row-reverse': 'row-reverse', 'flex-col': 'column',
+                 'flex-col-reverse': 'column-reverse'}.get(name)
+    if direction:
+        return 0, [('flex-direction', direction)]
+    wrap = {'flex-wrap': 'wrap', 'flex-wrap-reverse': 'wrap-reverse', 'flex-nowrap': 'nowrap'}.get(name)
+    if wrap:
+        return 1, [('flex-wrap', wrap)]
+    items = re.fullmatch(r'items-(start|end|center|baseline|stretch)', name)
+    if items:
+        value = {'start': 'flex-start', 'end': 'flex-end'}.get(items[1], items[1])
+        return 2, [('align-items', value)]
+    justify = re.fullmatch(r'justify-(start|end|center|between|around|evenly)', name)
+    if justify:
+        value = {'start': 'flex-start', 'end': 'flex-end', 'between': 'space-between',
+                 'around': 'space-around', 'evenly': 'space-evenly'}.get(justify[1], justify[1])
+        return 3, [('justify-content', value)]
+
+
+def _gap(name):
+    match = re.fullmatch(r'gap-(x-|y-)?(.+)', name)
+    value = match and _spacing(match[2])
+    if value is None:
+        return None
+    prop = {'x-': 'column-gap', 'y-': 'row-gap'}.get(match[1], 'gap')
+    return (1 if match[1] else 0), [(prop, value)]
+
+
+def _space_between(name):
+    match = re.fullmatch(r'space-([xy])-(.+)', name)
+    value = match and _spacing(match[2])
+    if value is None:
+        return None
+    prop = 'margin-left' if match[1] == 'x' else 'margin-top'
+    return 0, [(prop, value)], SIBLINGS
+
+
+def _divide(name):
+    match = re.fullmatch(r'divide-([xy])(?:-(\d+))?', name)
+    if match:
+        width = f'{match[2] or 1}px'
+        if match[1] == 'y':
+            return 0, [('border-top-width', width), ('border-bottom-width', '0')], SIBLINGS
+        return 0, [('border-left-width', width), ('border-right-width', '0')], SIBLINGS
+    match = re.fullmatch(r'divide-(.+)', name)
+    declarations = match and _colored('border-color', match[1], '--tw-divide-opacity')
+    if declarations:
+        return 1, declarations, SIBLINGS
+
+
+def _overflow(name):
+    match = re.fullmatch(r'overflow-(x-|y-)?(auto|hidden|visible|scroll)', name)
+    if match:
+        prop = {'x-': 'overflow-x', 'y-': 'overflow-y'}.get(match[1], 'overflow')
+        return (1 if match[1] else 0), [(prop, match[2])]
+
+
+def _text_overflow(name):
+    if name == 'truncate':
+        return 0, [('overflow', 'hidden'), ('text-overflow', 'ellipsis'), ('white-space', 'nowrap')]
+
+
+def _whitespace(name):
+    match = re.fullmatch(r'whitespace-(normal|nowrap|pre|pre-line|pre-wrap)', name)
+    if match:
+        return 0, [('white-space', match[1])]
+
+
+def _word_break(name):
+    if name == 'break-all':
+        return 0, [('word-break', 'break-all')]
+    if name == 'break-words':
+        return 0, [('overflow-wrap', 'break-word')]
+
+
+def _border_radius(name):
+    match = re.fullmatch(r'rounded(?:-([trbl]))?(?:-(.+))?', name)
+    if not match:
+        return None
+    value = RADII.get(match[2] or '')
+    if value is None:
+        return None
+    if not match[1]:
+        return 0, [('border-radius', value)]
+    corners = {'t': ('top-left', 'top-right'), 'r': ('top-right', 'bottom-right'),
+               'b': ('bottom-right', 'bottom-left'), 'l': ('top-left', 'bottom-left')}[match[1]]
+    return 1, [(f'border-{corner}-radius', value) for corner in corners]
+
+
+def _border_width(name):
+    match = re.fullmatch(r'border(?:-([xytrbl]))?(?:-(0|2|4|8))?', name)
+    if not match:
+        return None
+    width = f'{match[2] or 1}px'
+    side = match[1]
+    if not side:
+        return 0, [('border-width', width)]
+    if side in 'xy':
+        sides = ('left', 'right') if side == 'x' else ('top', 'bottom')
+        return 1, [(f'border-{sides[0]}-width', width), (f'border-{sides[1]}-width', width)]
+    return 2, [(f'border-{DIRECTIONS[side]}-width', width)]
+
+
+def _border_style(name):
+    match = re.fullmatch(r'border-(solid|dashed|dotted|double|none)', name)
+    if match:
+        return 0, [('border-style', match[1])]
+
+
+def _border_color(name):
+    match = re.fullmatch(r'border-(.+)', name)
+    declarations = match and _colored('border-color', match[1], '--tw-border-opacity')
+    if declarations:
+        return 0, declarations
+
+
+def _background_color(name):
+    match = re.fullmatch(r'bg-(.+)', name)
+    declarations = match and _colored('background-color', match[1], '--tw-bg-opacity')
+    if declarations:
+        return 0, declarations
+
+
+def _background_opacity(name):
+    match = re.fullmatch(r'bg-opacity-(\d+)', name)
+    if match:
+        return 0, [('--tw-bg-opacity', f'{int(match[1]) / 100:g}')]
+
+
+def _background_image(name):
+    match = re.fullmatch(r'bg-gradient-to-(tr|br|bl|tl|t|r|b|l)', name)
+    if match:
+        return 0, [('background-image', f'linear-gradient(to {GRADIENT_SIDES[match[1]]}, var(--tw-gradient-stops))')]
+    if name == 'bg-none':
+        return 0, [('background-image', 'none')]
+
+
+def _gradient_stops(name):
+    match = re.fullmatch(r'(from|via|to)-(.+)', name)
+    if not match:
+        return None
+    keyword, rgb = _color(match[2])
+    if not keyword and not rgb:
+        return None
+    color = keyword or '#%02x%02x%02x' % rgb
+    clear = 'rgb(%d %d %d / 0)' % rgb if rgb else 'transparent'
+    if match[1] == 'from':
+        return 0, [('--tw-gradient-from', color), ('--tw-gradient-to', clear),
+                   ('--tw-gradient-stops', 'var(--tw-gradient-from), var(--tw-gradient-to)')]
+    if match[1] == 'via':
+        return 1, [('--tw-gradient-to', clear),
+                   ('--tw-gradient-stops', f'var(--tw-gradient-from), {color}, var(--tw-gradient-to)')]
+    return 2, [('--tw-gradient-to', color)]
+
+
+def _text_align(name):
+    match = re.fullmatch(r'text-(left|center|right|justify)', name)
+    if match:
+        return 0, [('text-align', match[1])]
+
+
+def _font_family(name):
+    match = re.fullmatch(r'font-(sans|serif|mono)', name)
+    if match:
+        return 0, [('font-family', FONT_FAMILIES[match[1]])]
+
+
+def _font_size(name):
+    match = re.fullmatch(r'text-(.+)', name)
+    if match and match[1] in FONT_SIZES:
+        size, line_height = FONT_SIZES[match[1]]
+        return 0, [('font-size', size), ('line-height', line_height)]
+
+
+def _font_weight(name):
+    match = re.fullmatch(r'font-(.+)', name)
+    if match and match[1] in FONT_WEIGHTS:
+        return 0, [('font-weight', str(FONT_WEIGHTS[match[1]]))]
+
+
+def _text_transform(name):
+    value = {'uppercase': 'uppercase', 'lowercase': 'lowercase', 'capitalize': 'capitalize',
+             'normal-case': 'none'}.get(name)
+    if value:
+        return 0, [('text-transform', value)]
+
+
+def _font_style(name):
+    if name in ('italic', 'not-italic'):
+        return 0, [('font-style', 'italic' if name == 'italic' else 'normal')]
+
+
+def _line_height(name):
+    match = re.fullmatch(r'leading-(.+)', name)
+    value = match and _length(match[1], {**LEADING, **{key: value for key, value in SPACING.items() if key.isdigit()}})
+    if value:
+        return 0, [('line-height', value)]
+
+
+def _letter_spacing(name):
+    match = re.fullmatch(r'tracking-(.+)', name)
+    if match and match[1] in TRACKING:
+        return 0, [('letter-spacing', TRACKING[match[1]])]
+
+
+def _text_color(name):
+    match = re.fullmatch(r'text-(.+)', name)
+    declarations = match and _colored('color', match[1], '--tw-text-opacity')
+    if declarations:
+        return 0, declarations
+
+
+def _text_decoration(name):
+    value = {'underline': 'underline', 'line-through': 'line-through', 'no-underline': 'none'}.get(name)
+    if value:
+        return 0, [('text-decoration-line', value)]
+
+
+def _opacity(name):
+    match = re.fullmatch(r'opacity-(\d+)', name)
+    if match:
+        return 0, [('opacity', f'{int(match[1]) / 100:g}')]
+
+
+def _box_shadow(name):
+    match = re.fullmatch(r'shadow(?:-(.+))?', name)
+    if match and (match[1] or '') in SHADOWS:
+        return 0, [('--tw-shadow', SHADOWS[match[1] or '']),
+                   ('box-shadow', 'var(--tw-ring-offset-shadow, 0 0 #0000), var(--tw-ring-shadow, 0 0 #0000), var(--tw-shadow)')]
+
+
+def _outline(name):
+    if name == 'outline-none':
+        return 0, [('outline', '2px solid transparent'), ('outline-offset', '2px')]
+
+
+def _ring(name):
+    match = re.fullmatch(r'ring(?:-(0|1|2|4|8))?', name)
+    if match:
+        return 0, [('--tw-ring-shadow', f'var(--tw-ring-inset,) 0 0 0 {match[1] or 3}px var(--tw-ring-color, rgb(59 130 246 / 0.5))'),
+                   ('box-shadow', 'var(--tw-ring-offset-shadow, 0 0 #0000), var(--tw-ring-shadow), var(--tw-shadow, 0 0 #0000)')]
+    if name == 'ring-inset':
+        return 1, [('--tw-ring-inset', 'inset')]
+    match = re.fullmatch(r'ring-(.+)', name)
+    declarations = match and _colored('--tw-ring-color', match[1], '--tw-ring-opacity')
+    if declarations:
+        return 2, declarations
+
+
+def _select(name):
+    match = re.fullmatch(r'select-(none|text|all|auto)', name)
+    if match:
+        return 0, [('user-select', match[1])]
+
+
+def _transition(name):
+    match = re.fullmatch(r'transition(?:-(.+))?', name)
+    if match and (match[1] or '') in TRANSITIONS:
+        if match[1] == 'none':
+            return 0, [('transition-property', 'none')]
+        return 0, [('transition-property', TRANSITIONS[match[1] or '']),
+                   ('transition-timing-function', EASE), ('transition-duration', '150ms')]
+
+
+def _duration(name):
+    match = re.fullmatch(r'duration-(\d+)', name)
+    if match:
+        return 0, [('transition-duration', f'{match[1]}ms')]
+
+
+# Tailwind's core plugin order, which decides which of two conflicting
+# utilities wins
+UTILITIES = [
+    _sr_only, _position, _inset, _z_index, _margin, _display, _height, _min_height, _width,
+    _min_width, _max_width, _flex, _transform, _cursor, _select, _list_style, _grid_columns,
+    _flex_layout, _gap, _space_between, _divide, _overflow, _text_overflow, _whitespace,
+    _word_break, _border_radius, _border_width, _border_style, _border_color, _background_color,
+    _background_opacity, _background_image, _gradient_stops, _padding, _text_align,
+    _font_family, _font_size, _font_weight, _text_transform, _font_style, _line_height,
+    _letter_spacing, _text_color, _text_decoration, _opacity, _box_shadow, _outline, _ring,
+    _transition, _duration,
+]
+
+
+def _escape(class_name):
+    escaped = re.sub(r'([^a-zA-Z0-9_-])', r'\\\1', class_name)
+    if escaped[0].isdigit():
+        escaped = f'\\3{escaped[0]} {escaped[1:]}'
+    return escaped
+
+
+def rule_for(class_name):
+    """``(sort_key, breakpoint, css_rule)`` for a utility class, or ``None``"""
+    *variants, name = class_name.split(':')
+    breakpoint = None
+    states = []
+    for variant in variants:
+        if variant in BREAKPOINTS and breakpoint is None and not states:
+            breakpoint = variant
+        elif variant in STATES and variant not in states:
+            states.append(variant)
+        else:
+            return None
+    for group, utility in enumerate(UTILITIES):
+        result = utility(name)
+        if result:
+            break
+    else:
+        return None
+    sub_order, declarations, *suffix = result
+    selector = '.' + _escape(class_name) + ''.join(STATES[state] for state in states) + ''.join(suffix)
+    body = ';'.join(f'{prop}:{value}' for prop, value in declarations)
+    state_rank = tuple(sorted(list(STATES).index(state) + 1 for state in states))
+    key = (list(BREAKPOINTS).index(breakpoint) + 1 if breakpoint else 0, state_rank, group, sub_order, class_name)
+    return key, breakpoint, f'{selector}{{{body}}}'
+
+
+def build(tokens):
+    """The stylesheet for ``tokens``, plus the number of utility classes it covers"""
+    rules = sorted(filter(None, map(rule_for, tokens)))
+    lines = [PREFLIGHT]
+    current = None
+    for _, breakpoint, rule in rules:
+        if breakpoint != current:
+            if current:
+                lines.append('}\n')
+            if breakpoint:
+                lines.append(f'@media (min-width:{BREAKPOINTS[breakpoint]}){{\n')
+            current = breakpoint
+        lines.append(rule + '\n')
+    if current:
+        lines.append('}\n')
+    return ''.join(lines), len(rules)
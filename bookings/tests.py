@@ -1,3 +1,426 @@
-from django.test import TestCase
+"""Query and response-size budgets for every page, plus the allocation rules.
 
-# Create your tests here.
+``BUDGETS`` has one row per request: the most queries it may run and the
+largest body it may send, measured against a large data set (thousands of
+spots, hundreds of bookings per user) with every cache cold. A new N+1 in
+a template shows up as a blown query budget; the failure lists the SQL
+that ran more than once.
+
+Every URL in ``bookings/urls.py`` and every ``ModelAdmin`` in
+``bookings/admin.py`` must have a row (or a reason in ``NOT_BUDGETED``).
+
+The other test cases cover what the ``bench_*`` commands only measure:
+spot claiming and the status update in ``approvals.py``, the expiry
+sweeper and ID ordering.
+"""
+import tempfile
+from pathlib import Path
+from collections import Counter, namedtuple
+from datetime import datetime, time, timedelta
+from unittest import mock, skipIf
+
+from django.contrib import admin
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.test import Client, TestCase, override_settings
+from django.utils import timezone
+
+from . import approvals, ids
+from .allocation import SpotIndex
+from .approvals import approve_bookings
+from .expiry import sweep
+from .ids import SEQ_LIMIT, IdGenerator, new_booking_id, new_ticket_number
+from .models import Booking, BookingStat, ParkingSpot, Ticket, UserCar, booking_ends_at
+from .pagination import PAGE_SIZE, encode_cursor
+from .tickets import qr_digest, qr_payload
+from .urls import urlpatterns
+
+try:
+    import weasyprint  # noqa: F401
+    HAS_WEASYPRINT = True
+except (ImportError, OSError):
+    HAS_WEASYPRINT = False
+
+SPOTS = 3000
+DRIVER_BOOKINGS = 400
+OTHER_USERS = 12
+OTHER_BOOKINGS = 250
+
+Budget = namedtuple(
+    'Budget', 'name path user queries max_kb method data status needs',
+    defaults=('GET', None, 200, None),
+)
+
+# ``path`` is formatted with the ids made in ``setUpTestData``; ``user`` is
+# who is logged in: None, 'driver' (a customer) or 'staff'
+BUDGETS = [
+    # The parking map draws every spot (about 0.5 KiB each) and reads the
+    # bookings running now
+    Budget('home', '/', None, queries=2, max_kb=1800),
+    Budget('register', '/register/', None, queries=0, max_kb=17),
+    Budget('login', '/login/', None, queries=0, max_kb=14),
+    Budget('logout', '/logout/', 'driver', queries=4, max_kb=1, status=302),
+
+    Budget('my_cars', '/my-cars/', 'driver', queries=3, max_kb=21),
+    Budget('add_car', '/add-car/', 'driver', queries=2, max_kb=17),
+    Budget('import_cars', '/import-cars/', 'driver', queries=2, max_kb=15),
+    Budget('edit_car', '/edit-car/{spare_car}/', 'driver', queries=3, max_kb=16),
+    Budget('delete_car', '/delete-car/{spare_car}/', 'driver', queries=6, max_kb=1, status=302),
+    Budget('set_default_car', '/set-default-car/{spare_car}/', 'driver', queries=7, max_kb=1, status=302),
+
+    Budget('create_booking', '/create/', 'driver', queries=3, max_kb=21),
+    Budget('create_booking', '/create/', 'driver', queries=12, max_kb=1, method='POST', status=302, data={
+        'user_car': '{car}', 'car_license': 'BUDGET 1', 'car_model': 'Honda Jazz',
+        'phone_number': '081-234-5678', 'booking_date': '{tomorrow}',
+        'start_time': '09:00', 'end_time': '11:00', 'note': '',
+    }),
+    Budget('create_recurring_booking', '/create/recurring/', 'driver', queries=3, max_kb=23),
+    Budget('my_bookings', '/my-bookings/', 'driver', queries=4, max_kb=71),
+    Budget('my_bookings_more', '/my-bookings/more/?cursor={cursor}', 'driver', queries=3, max_kb=58),
+    Budget('booking_detail', '/booking/{approved}/', 'driver', queries=4, max_kb=20),
+    Budget('view_ticket', '/ticket/{approved}/', 'driver', queries=5, max_kb=20),
+    Budget('ticket_qr', '/ticket/{approved}/qr/{digest}.png', 'driver', queries=3, max_kb=1),
+    Budget('ticket_pdf', '/ticket/{approved}/pdf/', 'driver', queries=3, max_kb=200, needs='weasyprint'),
+
+    Budget('admin_dashboard', '/admin-dashboard/', 'staff', queries=5, max_kb=92),
+    Budget('analytics', '/analytics/', 'staff', queries=4, max_kb=63),
+    Budget('analytics_export', '/analytics/export.csv', 'staff', queries=3, max_kb=93),
+    Budget('approve_booking', '/approve/{waiting}/', 'staff', queries=18, max_kb=1, status=302),
+    Budget('reject_booking', '/reject/{waiting}/', 'staff', queries=10, max_kb=1, status=302),
+    # Spots are assigned per booking date: a page of bookings spread over
+    # several days costs a few queries per day, not per booking
+    Budget('bulk_booking_action', '/bookings/bulk/', 'staff', queries=39, max_kb=1, method='POST', status=302,
+           data={'action': 'approve', 'booking_ids': '{waiting_page}'}),
+    Budget('print_tickets', '/tickets/print/?date={tomorrow}', 'staff', queries=3, max_kb=10, status=202,
+           needs='weasyprint'),
+
+    Budget('admin:bookings_usercar_changelist', '/admin/bookings/usercar/', 'staff', queries=5, max_kb=30),
+    Budget('admin:bookings_parkingspot_changelist', '/admin/bookings/parkingspot/', 'staff', queries=5, max_kb=85),
+    Budget('admin:bookings_booking_changelist', '/admin/bookings/booking/', 'staff', queries=5, max_kb=98),
+    Budget('admin:bookings_ticket_changelist', '/admin/bookings/ticket/', 'staff', queries=5, max_kb=70),
+]
+
+NOT_BUDGETED = {
+    'availability_stream': 'async server-sent events stream that never ends',
+}
+
+
+LOCAL_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'budget-tests'},
+    'fragments': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'budget-fragments'},
+}
+
+
+@override_settings(
+    # Hashed names need collectstatic; the tests only need the plain ones
+    STORAGES={
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    },
+    CACHES=LOCAL_CACHES,
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    PDF_CACHE_DIR=tempfile.gettempdir() + '/parking-test-pdfs',
+    SERVER_TIMING=False,
+)
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        password = make_password('pw')
+        cls.staff = User.objects.create(username='staff', password=password, is_staff=True, is_superuser=True)
+        cls.driver = User.objects.create(username='driver', password=password)
+        others = User.objects.bulk_create([
+            User(username=f'driver-{n}', password=password) for n in range(OTHER_USERS)
+        ])
+
+        ParkingSpot.objects.bulk_create([
+            ParkingSpot(spot_number=f'{"ABC"[n % 3]}{n:05d}', zone='ABC'[n % 3]) for n in range(SPOTS)
+        ])
+        spots = list(ParkingSpot.objects.order_by('id'))
+
+        car = UserCar.objects.create(user=cls.driver, car_license='DRV 1', car_model='Toyota Yaris')
+        spare = UserCar.objects.create(user=cls.driver, car_license='DRV 2', car_model='Mazda 2')
+        UserCar.objects.bulk_create([
+            UserCar(user=user, car_license=f'OTH {user.pk}', car_model='Honda City', is_default=True)
+            for user in others
+        ])
+
+        today = timezone.localdate()
+        statuses = ['WAITING', 'APPROVED', 'REJECTED', 'CANCELLED', 'COMPLETED']
+        bookings = []
+        for user, count, user_car in [(cls.driver, DRIVER_BOOKINGS, car)] + [(u, OTHER_BOOKINGS, None) for u in others]:
+            for n in range(count):
+                status = statuses[n % len(statuses)]
+                # Past days for history, future days for anything still open
+                day = today + timedelta(days=1 + n % 30) if status in ('WAITING', 'APPROVED') \
+                    else today - timedelta(days=1 + n % 300)
+                start, end = time(8 + n % 8), time(10 + n % 8)
+                bookings.append(Booking(
+                    booking_id=new_booking_id(), user=user, user_car=user_car,
+                    car_license='DRV 1' if user_car else f'OTH {user.pk}', car_model='Toyota Yaris',
+                    phone_number='081-234-5678', booking_date=day, start_time=start, end_time=end,
+                    ends_at=booking_ends_at(day, start, end), status=status,
+                    parking_spot=spots[len(bookings) % SPOTS] if status in ('APPROVED', 'COMPLETED') else None,
+                    approved_by=cls.staff if status in ('APPROVED', 'COMPLETED') else None,
+                    approved_at=timezone.now() if status in ('APPROVED', 'COMPLETED') else None,
+                ))
+        Booking.objects.bulk_create(bookings, batch_size=1000)
+        Ticket.objects.bulk_create([
+            Ticket(ticket_number=new_ticket_number(), booking=booking)
+            for booking in Booking.objects.filter(status='APPROVED')
+        ], batch_size=1000)
+        BookingStat.objects.rebuild()
+
+        ticket = Ticket.objects.select_related('booking').filter(booking__user=cls.driver).first()
+        waiting = Booking.objects.filter(status='WAITING').exclude(user=cls.driver).order_by('-created_at', '-id')
+        end_of_first_page = Booking.objects.filter(user=cls.driver).order_by('-created_at', '-id')[PAGE_SIZE - 1]
+        cls.ids = {
+            'car': car.pk,
+            'spare_car': spare.pk,
+            'approved': ticket.booking.booking_id,
+            'digest': qr_digest(qr_payload(ticket)),
+            'waiting': waiting[0].pk,
+            'waiting_page': [str(pk) for pk in waiting.values_list('pk', flat=True)[:PAGE_SIZE]],
+            'tomorrow': (today + timedelta(days=1)).isoformat(),
+            'cursor': encode_cursor(end_of_first_page),
+        }
+
+    def test_every_page_has_a_budget(self):
+        budgeted = {budget.name for budget in BUDGETS}
+        for pattern in urlpatterns:
+            if pattern.name not in NOT_BUDGETED:
+                self.assertIn(pattern.name, budgeted, f"Add '{pattern.name}' to BUDGETS in bookings/tests.py")
+        for model in admin.site._registry:
+            if model._meta.app_label == 'bookings':
+                name = f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist'
+                self.assertIn(name, budgeted, f"Add '{name}' to BUDGETS in bookings/tests.py")
+
+    def test_query_and_size_budgets(self):
+        for budget in BUDGETS:
+            with self.subTest(budget.name, method=budget.method):
+                if budget.needs == 'weasyprint' and not HAS_WEASYPRINT:
+                    self.skipTest('WeasyPrint is not installed')
+                status, size, queries = self._measure(budget)
+                self.assertEqual(status, budget.status, f'{budget.method} {budget.name}')
+                self.assertLessEqual(
+                    len(queries), budget.queries,
+                    f'{budget.method} {budget.name} ran {len(queries)} queries, budget {budget.queries}\n'
+                    + _explain(queries),
+                )
+                self.assertLessEqual(
+                    size, budget.max_kb * 1024,
+                    f'{budget.method} {budget.name} sent {size / 1024:.1f} KiB, budget {budget.max_kb} KiB',
+                )
+
+    def _measure(self, budget):
+        """``(status, body bytes, [sql])`` for one request with cold caches"""
+        client = Client()
+        if budget.user:
+            client.force_login(self.staff if budget.user == 'staff' else self.driver)
+        for cache in caches.all():
+            cache.clear()
+        path = budget.path.format(**self.ids)
+        data = {
+            key: [v.format(**self.ids) for v in self.ids[value[1:-1]]] if value == '{waiting_page}'
+            else value.format(**self.ids)
+            for key, value in (budget.data or {}).items()
+        }
+        queries = []
+
+        def record(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        # Each request's writes are rolled back, so rows like spare_car stay put
+        with transaction.atomic():
+            with connection.execute_wrapper(record):
+                if budget.method == 'POST':
+                    response = client.post(path, data)
+                else:
+                    response = client.get(path)
+                body = b''.join(response.streaming_content) if response.streaming else response.content
+            transaction.set_rollback(True)
+        return response.status_code, len(body), queries
+
+
+def _explain(queries):
+    repeated = [(sql, count) for sql, count in Counter(queries).most_common() if count > 1]
+    if repeated:
+        return 'Repeated SQL:\n' + '\n'.join(f'  {count} x {sql}' for sql, count in repeated)
+    return 'SQL:\n' + '\n'.join(f'  {sql}' for sql in queries)
+
+
+def _booking(user, day, start, end, status='WAITING', spot=None):
+    return Booking.objects.create(
+        user=user, car_license='TST 1', car_model='Toyota Yaris', phone_number='081-234-5678',
+        booking_date=day, start_time=start, end_time=end, status=status, parking_spot=spot,
+    )
+
+
+def _at(day, hour):
+    return timezone.make_aware(datetime.combine(day, time(hour)), timezone.get_default_timezone())
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class ApprovalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create(username='staff', is_staff=True)
+        cls.driver = User.objects.create(username='driver')
+        cls.first = ParkingSpot.objects.create(spot_number='A001', zone='A')
+        cls.second = ParkingSpot.objects.create(spot_number='A002', zone='A')
+        cls.day = timezone.localdate() + timedelta(days=1)
+
+    def test_spots_out_of_service_are_not_allocated(self):
+        ParkingSpot.objects.filter(pk=self.first.pk).update(in_service=False)
+        booking = _booking(self.driver, self.day, time(9), time(11))
+
+        result = approve_bookings([booking.pk], self.staff)
+
+        self.assertEqual([b.parking_spot_id for b in result.approved], [self.second.pk])
+
+    def test_contested_proposal_goes_round_again(self):
+        booking = _booking(self.driver, self.day, time(9), time(11))
+        build = SpotIndex.for_date
+        rounds = []
+
+        def racing(booking_date, *args):
+            index = build(booking_date, *args)
+            if not rounds:
+                # Another approver commits on the first spot right after we looked
+                _booking(self.driver, booking_date, time(8), time(12), status='APPROVED', spot=self.first)
+            rounds.append(booking_date)
+            return index
+
+        with mock.patch.object(SpotIndex, 'for_date', side_effect=racing):
+            result = approve_bookings([booking.pk], self.staff)
+
+        self.assertEqual(len(rounds), 2)
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'APPROVED')
+        self.assertEqual(booking.parking_spot_id, self.second.pk)
+        self.assertEqual([ticket.booking.pk for ticket in result.tickets], [booking.pk])
+
+    def test_status_update_skips_bookings_no_longer_waiting(self):
+        kept = _booking(self.driver, self.day, time(9), time(11))
+        cancelled = _booking(self.driver, self.day, time(9), time(11))
+        claim = approvals._claim_spots
+
+        def cancelling(booking_date, bookings):
+            claimed = claim(booking_date, bookings)
+            # The driver cancels between the claim and the status update
+            Booking.objects.filter(pk=cancelled.pk).update(status='CANCELLED')
+            return claimed
+
+        with mock.patch.object(approvals, '_claim_spots', side_effect=cancelling):
+            result = approve_bookings([kept.pk, cancelled.pk], self.staff)
+
+        self.assertEqual([booking.pk for booking in result.approved], [kept.pk])
+        cancelled.refresh_from_db()
+        self.assertEqual(cancelled.status, 'CANCELLED')
+        self.assertIsNone(cancelled.parking_spot_id)
+        self.assertFalse(Ticket.objects.filter(booking=cancelled).exists())
+        self.assertEqual(Ticket.objects.count(), 1)
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class SweepTests(TestCase):
+    def test_spot_is_freed_once_its_last_approved_booking_ends(self):
+        driver = User.objects.create(username='driver')
+        spot = ParkingSpot.objects.create(spot_number='A001', zone='A', is_available=False)
+        day = timezone.localdate()
+        first = _booking(driver, day, time(8), time(10), status='APPROVED', spot=spot)
+        second = _booking(driver, day + timedelta(days=1), time(8), time(10), status='APPROVED', spot=spot)
+
+        self.assertEqual(sweep(_at(day, 11)), (1, 0))
+        first.refresh_from_db()
+        spot.refresh_from_db()
+        self.assertEqual(first.status, 'COMPLETED')
+        self.assertFalse(spot.is_available)
+
+        self.assertEqual(sweep(_at(day + timedelta(days=1), 11)), (1, 1))
+        second.refresh_from_db()
+        spot.refresh_from_db()
+        self.assertEqual(second.status, 'COMPLETED')
+        self.assertTrue(spot.is_available)
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class ApiEtagTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.driver = User.objects.create(username='driver')
+        cls.spot = ParkingSpot.objects.create(spot_number='A001', zone='A')
+        cls.booking = _booking(
+            cls.driver, timezone.localdate() + timedelta(days=1), time(9), time(11), status='APPROVED', spot=cls.spot,
+        )
+        Ticket.objects.create(booking=cls.booking)
+
+    def setUp(self):
+        caches['default'].clear()
+        self.client.force_login(self.driver)
+
+    def _etags(self):
+        return [
+            self.client.get(path).headers['ETag']
+            for path in (
+                '/api/v1/bookings/', f'/api/v1/bookings/{self.booking.booking_id}/',
+                '/api/v1/tickets/', f'/api/v1/tickets/{self.booking.ticket.ticket_number}/',
+            )
+        ]
+
+    def test_etags_change_with_the_spot_shown(self):
+        before = self._etags()
+        self.spot.spot_number = 'B001'
+        self.spot.save()
+        renamed = self._etags()
+        # Bulk clean-ups null the spot without touching updated_at
+        Booking.objects.filter(pk=self.booking.pk).update(parking_spot=None)
+        detached = self._etags()
+
+        for old, new in zip(before, renamed):
+            self.assertNotEqual(old, new)
+        for old, new in zip(renamed, detached):
+            self.assertNotEqual(old, new)
+
+
+class IdTests(TestCase):
+    def test_ids_increase_within_one_millisecond(self):
+        generator = IdGenerator(node=7, clock=lambda: 1_790_000_000.123)
+        issued = [generator.next('PK') for _ in range(SEQ_LIMIT * 2 + 3)]
+
+        self.assertEqual(issued, sorted(issued))
+        self.assertEqual(len(set(issued)), len(issued))
+
+    def test_ids_keep_increasing_when_the_clock_steps_back(self):
+        ticks = iter([1_790_000_000.500, 1_790_000_000.100, 1_790_000_000.100])
+        generator = IdGenerator(node=7, clock=lambda: next(ticks))
+        issued = [generator.next('PK') for _ in range(3)]
+
+        self.assertEqual(issued, sorted(issued))
+        self.assertEqual(len(set(issued)), len(issued))
+
+    def test_host_number_is_never_wrapped_or_guessed_for_a_shared_database(self):
+        with override_settings(ID_NODE='12', DATABASE_URL='postgres://db/parking'):
+            self.assertEqual(ids.host_number(), 12)
+        with override_settings(ID_NODE='0', DATABASE_URL='postgres://db/parking'):
+            self.assertEqual(ids.host_number(), 0)
+        for value in (str(ids.HOST_LIMIT), '-1', 'web-1'):
+            with self.subTest(value), override_settings(ID_NODE=value), self.assertRaises(ImproperlyConfigured):
+                ids.host_number()
+        with override_settings(ID_NODE=None, DATABASE_URL='postgres://db/parking'), \
+                self.assertRaises(ImproperlyConfigured):
+            ids.host_number()
+
+    @skipIf(ids.fcntl is None, 'flock is not available')
+    def test_process_skips_slots_held_by_other_processes(self):
+        with tempfile.TemporaryDirectory() as lock_dir, override_settings(ID_LOCK_DIR=lock_dir), \
+                mock.patch.object(ids, '_slot', None):
+            with open(Path(lock_dir) / 'slot-00.lock', 'a') as held:
+                ids.fcntl.flock(held, ids.fcntl.LOCK_EX | ids.fcntl.LOCK_NB)
+                self.assertEqual(ids.process_slot(), 1)
+                # Same process, same slot
+                self.assertEqual(ids.process_slot(), 1)
+                ids._slot[2].close()
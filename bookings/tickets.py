@@ -0,0 +1,40 @@
+import hashlib
+from io import BytesIO
+
+import qrcode
+from django.core.cache import cache
+
+# Tickets are only scanned around their booking date
+QR_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def qr_payload(ticket):
+    """Text encoded in a ticket's QR code"""
+    return ticket.qr_code or f"TICKET:{ticket.ticket_number}|BOOKING:{ticket.booking.booking_id}"
+
+
+def qr_digest(payload):
+    """Content hash of a QR payload, used in the image URL and as its ETag"""
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def render_qr_png(payload):
+    qr = qrcode.QRCode(box_size=8, border=2)
+    qr.add_data(payload)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white")
+
+    buffer = BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def get_qr_png(ticket):
+    """PNG bytes of a ticket's QR code, rendered once and then served from the cache"""
+    payload = qr_payload(ticket)
+    key = f"ticket-qr:{ticket.ticket_number}:{qr_digest(payload)}"
+    png = cache.get(key)
+    if png is None:
+        png = render_qr_png(payload)
+        cache.set(key, png, QR_CACHE_TIMEOUT)
+    return png
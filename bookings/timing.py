@@ -0,0 +1,224 @@
+"""Per-request timing: database, template and view time in ``Server-Timing``.
+
+``ServerTimingMiddleware`` runs last in ``MIDDLEWARE``. For a timed request
+it counts and times every query, times template rendering through the
+``TimedDjangoTemplates`` backend and adds a header like::
+
+    Server-Timing: db;dur=4.1;desc="12 queries", tpl;dur=8.0, view;dur=15.2
+
+Timing is on for every request when ``settings.SERVER_TIMING`` is set.
+Staff can switch it on or off for a single request by sending
+``X-Server-Timing: on`` / ``off``; other users' headers are ignored.
+
+Queries go through ``record_query``, an execute wrapper that
+``signals.py`` puts on every database connection as it opens. Connections
+belong to threads, and under ASGI the view's queries run on a worker
+thread, so a wrapper added around the request would miss them; the wrapper
+finds the request's timings through a context variable instead, which does
+follow the request onto those threads. Outside a timed request it costs one
+``ContextVar.get()`` per query.
+
+Requests slower than ``SERVER_TIMING_SLOW_MS`` are logged with their SQL.
+The same SQL run ``SERVER_TIMING_DUPLICATES`` times or more in one request
+is almost always an N+1 loop; it is logged once per view and statement.
+Only the last ``WARNED_DUPLICATES`` warnings are remembered, so unresolved
+URLs and ``IN (...)`` lists of every length cannot grow the process.
+"""
+import logging
+import threading
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'X-Server-Timing'
+
+# SQL statements kept per slow-request log line
+SLOW_SQL_LINES = 10
+
+# The current request's RequestTimings, if it is being timed
+current_timings = ContextVar('request_timings', default=None)
+
+# (view name, sql) pairs already logged as possible N+1, oldest first
+WARNED_DUPLICATES = 1000
+_warned = OrderedDict()
+_warned_lock = threading.Lock()
+
+
+class RequestTimings:
+    """What one request spent, filled in by the query wrapper and template backend"""
+
+    def __init__(self):
+        self.queries = []
+        self.db = 0.0
+        self.template = 0.0
+        self.view = 0.0
+        self.rendering = False
+
+    def add_query(self, sql, elapsed):
+        self.db += elapsed
+        self.queries.append((sql, elapsed))
+
+    def duplicates(self, threshold):
+        """``[(sql, count)]`` for statements run at least ``threshold`` times"""
+        counts = Counter(sql for sql, _ in self.queries)
+        return [(sql, count) for sql, count in counts.most_common() if count >= threshold]
+
+    def header(self, duplicates=()):
+        parts = [
+            f'db;dur={self.db * 1000:.1f};desc="{len(self.queries)} queries"',
+            f'tpl;dur={self.template * 1000:.1f}',
+            f'view;dur={self.view * 1000:.1f}',
+        ]
+        if duplicates:
+            parts.append(f'dup;desc="{sum(count for _, count in duplicates)} repeated"')
+        return ', '.join(parts)
+
+    def slowest_sql(self, limit=SLOW_SQL_LINES):
+        """``[(sql, count, seconds)]``, most total time first"""
+        totals = {}
+        for sql, elapsed in self.queries:
+            count, seconds = totals.get(sql, (0, 0.0))
+            totals[sql] = (count + 1, seconds + elapsed)
+        ranked = sorted(totals.items(), key=lambda item: item[1][1], reverse=True)
+        return [(sql, count, seconds) for sql, (count, seconds) in ranked[:limit]]
+
+
+def record_query(execute, sql, params, many, context):
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add_query(sql, perf_counter() - started)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        timings = current_timings.get()
+        # Templates rendered from inside a template count once, in the outer one
+        if timings is None or timings.rendering:
+            return super().render(context, request)
+        timings.rendering = True
+        started = perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings.template += perf_counter() - started
+            timings.rendering = False
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with render time counted in ``Server-Timing``"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+def _toggle(request):
+    """``True``/``False`` from the header, ``None`` when there is none"""
+    value = request.headers.get(HEADER)
+    if value is None:
+        return None
+    return value.strip().lower() in ('1', 'on', 'true', 'yes')
+
+
+def _start():
+    """The request's timings, started here unless the access log already has"""
+    timings = current_timings.get()
+    if timings is not None:
+        return timings, None
+    timings = RequestTimings()
+    return timings, current_timings.set(timings)
+
+
+def _first_warning(view_name, sql):
+    """Whether this view's statement has not been logged recently"""
+    key = (view_name, sql)
+    with _warned_lock:
+        if key in _warned:
+            _warned.move_to_end(key)
+            return False
+        _warned[key] = None
+        if len(_warned) > WARNED_DUPLICATES:
+            _warned.popitem(last=False)
+        return True
+
+
+class ServerTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        toggle = _toggle(request)
+        # request.user is only loaded when someone asks to toggle
+        enabled = toggle if toggle is not None and request.user.is_staff else settings.SERVER_TIMING
+        if not enabled:
+            return self.get_response(request)
+        timings, token = _start()
+        started = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            if token:
+                current_timings.reset(token)
+        timings.view = perf_counter() - started
+        self.report(request, response, timings)
+        return response
+
+    async def __acall__(self, request):
+        toggle = _toggle(request)
+        enabled = settings.SERVER_TIMING
+        if toggle is not None and (await request.auser()).is_staff:
+            enabled = toggle
+        if not enabled:
+            return await self.get_response(request)
+        timings, token = _start()
+        started = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token:
+                current_timings.reset(token)
+        timings.view = perf_counter() - started
+        self.report(request, response, timings)
+        return response
+
+    def report(self, request, response, timings):
+        match = request.resolver_match
+        view_name = match.view_name if match else '(unresolved)'
+        duplicates = timings.duplicates(settings.SERVER_TIMING_DUPLICATES)
+        response.headers['Server-Timing'] = timings.header(duplicates)
+
+        for sql, count in duplicates:
+            if _first_warning(view_name, sql):
+                logger.warning('Possible N+1 in %s (%s): %d x %s', view_name, request.path, count, sql)
+
+        if timings.view * 1000 >= settings.SERVER_TIMING_SLOW_MS:
+            logger.warning(
+                'Slow request %s %s (%s): %.0f ms, %d queries in %.0f ms, templates %.0f ms\n%s',
+                request.method, request.path, view_name, timings.view * 1000,
+                len(timings.queries), timings.db * 1000, timings.template * 1000,
+                '\n'.join(
+                    f'  {count:>4} x {seconds * 1000:8.1f} ms  {sql}'
+                    for sql, count, seconds in timings.slowest_sql()
+                ),
+            )
@@ -1,8 +1,13 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# ใต้ ASGI ใช้ view อ่านข้อมูลแบบ async
+read_views = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
-    path('', views.home, name='home'),
+    path('', read_views.home, name='home'),
+    path('live/availability/', views.availability_stream, name='availability_stream'),
     
     # Authentication
     path('register/', views.register, name='register'),
@@ -12,18 +17,27 @@ urlpatterns = [
     # Car Management
     path('my-cars/', views.my_cars, name='my_cars'),
     path('add-car/', views.add_car, name='add_car'),
+    path('import-cars/', views.import_cars, name='import_cars'),
     path('edit-car/<int:car_id>/', views.edit_car, name='edit_car'),
     path('delete-car/<int:car_id>/', views.delete_car, name='delete_car'),
     path('set-default-car/<int:car_id>/', views.set_default_car, name='set_default_car'),
     
     # Booking
     path('create/', views.create_booking, name='create_booking'),
-    path('my-bookings/', views.my_bookings, name='my_bookings'),
-    path('booking/<str:booking_id>/', views.booking_detail, name='booking_detail'),
-    path('ticket/<str:booking_id>/', views.view_ticket, name='view_ticket'),
+    path('create/recurring/', views.create_recurring_booking, name='create_recurring_booking'),
+    path('my-bookings/', read_views.my_bookings, name='my_bookings'),
+    path('my-bookings/more/', read_views.my_bookings_more, name='my_bookings_more'),
+    path('booking/<str:booking_id>/', read_views.booking_detail, name='booking_detail'),
+    path('ticket/<str:booking_id>/', read_views.view_ticket, name='view_ticket'),
+    path('ticket/<str:booking_id>/qr/<str:digest>.png', views.ticket_qr, name='ticket_qr'),
+    path('ticket/<str:booking_id>/pdf/', views.ticket_pdf, name='ticket_pdf'),
     
     # Admin routes
     path('admin-dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('analytics/', views.analytics, name='analytics'),
+    path('analytics/export.csv', views.analytics_export, name='analytics_export'),
     path('approve/<int:booking_id>/', views.approve_booking, name='approve_booking'),
     path('reject/<int:booking_id>/', views.reject_booking, name='reject_booking'),
+    path('bookings/bulk/', views.bulk_booking_action, name='bulk_booking_action'),
+    path('tickets/print/', views.print_tickets, name='print_tickets'),
 ]
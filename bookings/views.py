@@ -1,39 +1,61 @@
+import logging
+from datetime import date, timedelta
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth import login, authenticate, logout
 from django.contrib import messages
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
 from django.utils import timezone
-from django.http import HttpResponse
-
-from .models import Booking, ParkingSpot, Ticket, UserCar
-from .forms import BookingForm
+from django.db.models import Count, Q
+from django.urls import reverse
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import require_POST
+
+from .models import Booking, BookingStat, Ticket, UserCar
+from .forms import BookingForm, RecurringBookingForm
 from .register_forms import UserRegisterForm
 from .car_forms import UserCarForm
+from .cars import user_cars
+from .approvals import approve_bookings, reject_bookings
+from .tickets import get_qr_png, qr_digest, qr_payload
+from .occupancy import get_occupancy_snapshot
+from .realtime import hub
+from .pagination import keyset_page
+from .recurring import create_series
+from .fleet import FleetFormatError, guess_format, import_fleet, read_rows, stream_report
+from .analytics import OccupancyAnalysis, heatmap_rows, stream_rows_csv
+from . import pdf
+
+logger = logging.getLogger(__name__)
 
-import qrcode
-import base64
-from io import BytesIO
 
 def home(request):
     """หน้าแรก - แสดงสถานะที่จอด"""
-    spots = ParkingSpot.objects.all()
-    total_spots = spots.count()
-    available_spots = spots.filter(is_available=True).count()
-    
-    context = {
-        'spots': spots,
-        'total_spots': total_spots,
-        'available_spots': available_spots,
-        'occupied_spots': total_spots - available_spots,
-    }
-    return render(request, 'bookings/home.html', context)
+    return render(request, 'bookings/home.html', get_occupancy_snapshot())
+
+
+async def availability_stream(request):
+    """สถานะที่จอดแบบ real-time (Server-Sent Events) - ใช้ได้เฉพาะเมื่อรันผ่าน ASGI"""
+    if not isinstance(request, ASGIRequest):
+        # ภายใต้ WSGI การเชื่อมต่อหนึ่งจะกิน worker ไปทั้งตัว; 204 บอก EventSource ให้เลิกเชื่อมต่อใหม่
+        return HttpResponse(status=204)
+    response = StreamingHttpResponse(
+        hub.stream(request.headers.get('Last-Event-ID'), settings.REALTIME_HEARTBEAT),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 @login_required
 def create_booking(request):
     """สร้างการจองใหม่"""
     # เช็คว่ามีรถหรือยัง
-    has_cars = UserCar.objects.filter(user=request.user).exists()
+    has_cars = bool(user_cars(request.user))
     
     if request.method == 'POST':
         form = BookingForm(request.POST, user=request.user)
@@ -59,30 +81,80 @@ def create_booking(request):
     })
 
 
+@login_required
+def create_recurring_booking(request):
+    """จองแบบต่อเนื่อง (ทุกวัน / วันทำงาน / ทุกสัปดาห์)"""
+    has_cars = bool(user_cars(request.user))
+    
+    if request.method == 'POST':
+        form = RecurringBookingForm(request.POST, user=request.user)
+        if form.is_valid():
+            template = form.save(commit=False)
+            template.user = request.user
+            if form.cleaned_data.get('user_car'):
+                template.user_car = form.cleaned_data['user_car']
+            
+            # ตรวจทุกวันแล้วใน form บันทึกทั้งชุดด้วย bulk_create ครั้งเดียว
+            bookings = create_series(template, form.dates)
+            
+            messages.success(request, f'✅ จองสำเร็จ {len(bookings)} วัน ({bookings[0].booking_date} - {bookings[-1].booking_date}) - รอการอนุมัติ')
+            if form.conflicts:
+                messages.warning(request, f'⚠️ ข้ามไป {len(form.conflicts)} วันที่จองไม่ได้')
+            return redirect('my_bookings')
+    else:
+        form = RecurringBookingForm(user=request.user)
+    
+    return render(request, 'bookings/create_booking.html', {
+        'form': form,
+        'has_cars': has_cars,
+        'recurring': True,
+    })
+
+
 @login_required
 def my_bookings(request):
     """รายการจองของฉัน"""
     bookings = Booking.objects.filter(user=request.user)
 
-    total = bookings.count()
-    pending = bookings.filter(status='WAITING').count()
-    approved = bookings.filter(status='APPROVED').count()
-    rejected = bookings.filter(status='REJECTED').count()
+    # นับทุกสถานะใน query เดียว
+    stats = bookings.aggregate(
+        total=Count('id'),
+        pending=Count('id', filter=Q(status='WAITING')),
+        approved=Count('id', filter=Q(status='APPROVED')),
+        rejected=Count('id', filter=Q(status='REJECTED')),
+    )
+    page, next_cursor = keyset_page(
+        bookings.select_related('parking_spot'), request.GET.get('cursor'),
+    )
 
     context = {
-        'bookings': bookings,
-        'total': total,
-        'pending': pending,
-        'approved': approved,
-        'rejected': rejected,
+        'bookings': page,
+        'next_cursor': next_cursor,
+        **stats,
     }
     return render(request, 'bookings/my_bookings.html', context)
 
 
+@login_required
+def my_bookings_more(request):
+    """โหลดรายการจองหน้าถัดไป (fragment สำหรับปุ่ม Load more)"""
+    page, next_cursor = keyset_page(
+        Booking.objects.filter(user=request.user).select_related('parking_spot'),
+        request.GET.get('cursor'),
+    )
+    return render(request, 'bookings/my_bookings_page.html', {
+        'bookings': page,
+        'next_cursor': next_cursor,
+    })
+
+
 @login_required
 def booking_detail(request, booking_id):
     """รายละเอียดการจอง"""
-    booking = get_object_or_404(Booking, booking_id=booking_id, user=request.user)
+    booking = get_object_or_404(
+        Booking.objects.select_related('user', 'parking_spot', 'approved_by'),
+        booking_id=booking_id, user=request.user,
+    )
     ticket = None
     
     # ถ้าอนุมัติแล้ว ดูว่ามีตั๋วหรือยัง
@@ -104,48 +176,88 @@ def is_staff(user):
 @user_passes_test(is_staff)
 def admin_dashboard(request):
     """แดชบอร์ดสำหรับ Admin"""
-    waiting_bookings = Booking.objects.filter(status='WAITING')
-    approved_bookings = Booking.objects.filter(status='APPROVED')
-    all_bookings = Booking.objects.all()[:10]
+    # ตัวเลขสรุปอ่านจากตาราง BookingStat ไม่ต้องนับทั้งตาราง
+    totals = BookingStat.objects.totals()
+    waiting_bookings, next_cursor = keyset_page(
+        Booking.objects.filter(status='WAITING').select_related('user'),
+        request.GET.get('cursor'),
+    )
+    approved_bookings = Booking.objects.filter(status='APPROVED').select_related(
+        'user', 'parking_spot', 'approved_by',
+    ).order_by('-created_at', '-id')[:5]
     
     context = {
         'waiting_bookings': waiting_bookings,
+        'next_cursor': next_cursor,
         'approved_bookings': approved_bookings,
-        'all_bookings': all_bookings,
-        'waiting_count': waiting_bookings.count(),
+        'waiting_count': totals.get('WAITING', 0),
+        'approved_count': totals.get('APPROVED', 0),
+        'total_count': sum(totals.values()),
     }
     return render(request, 'bookings/admin_dashboard.html', context)
 
 
+def _analytics_range(request):
+    """ช่วงวันที่จาก ?start=&end= (ค่าเริ่มต้น: 365 วันล่าสุด)"""
+    end = timezone.localdate()
+    start = end - timedelta(days=364)
+    try:
+        if request.GET.get('start'):
+            start = date.fromisoformat(request.GET['start'])
+        if request.GET.get('end'):
+            end = date.fromisoformat(request.GET['end'])
+    except ValueError:
+        messages.error(request, '❌ รูปแบบวันที่ไม่ถูกต้อง ใช้ช่วง 365 วันล่าสุดแทน')
+        end = timezone.localdate()
+        start = end - timedelta(days=364)
+    return min(start, end), max(start, end)
+
+
+@user_passes_test(is_staff)
+def analytics(request):
+    """วิเคราะห์การใช้ที่จอดย้อนหลัง (heatmap ตามโซน/วัน/ชั่วโมง)"""
+    start, end = _analytics_range(request)
+    report = OccupancyAnalysis(start, end).run()
+    heatmaps = report.heatmaps()
+    
+    return render(request, 'bookings/analytics.html', {
+        'start': start,
+        'end': end,
+        'report': report,
+        'utilisation': report.utilisation() * 100,
+        'rates': {name: value * 100 for name, value in report.rates().items()},
+        'total_spots': len(report.spot_ids),
+        'zones': [
+            (zone, int(report.spots_per_zone[index]), heatmap_rows(heatmaps[zone]))
+            for index, zone in enumerate(report.zones)
+        ],
+        'hours': range(24),
+    })
+
+
+@user_passes_test(is_staff)
+def analytics_export(request):
+    """ส่งออกข้อมูลการจองดิบเป็น CSV (stream ทีละแถว)"""
+    start, end = _analytics_range(request)
+    response = StreamingHttpResponse(stream_rows_csv(start, end), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="bookings-{start}-{end}.csv"'
+    return response
+
+
 @user_passes_test(is_staff)
 def approve_booking(request, booking_id):
     """อนุมัติการจอง"""
     booking = get_object_or_404(Booking, id=booking_id)
     
     if booking.status == 'WAITING':
-        # หาที่จอดว่าง
-        available_spot = ParkingSpot.objects.filter(is_available=True).first()
+        # หาที่จอดที่ว่างตลอดช่วงเวลาที่จอง + สร้างตั๋ว
+        result = approve_bookings([booking.id], request.user)
         
-        if available_spot:
-            booking.status = 'APPROVED'
-            booking.approved_by = request.user
-            booking.approved_at = timezone.now()
-            booking.parking_spot = available_spot
-            booking.save()
-            
-            # ทำให้ที่จอดไม่ว่าง
-            available_spot.is_available = False
-            available_spot.save()
-            
-            # สร้างตั๋ว
-            ticket = Ticket.objects.create(
-                booking=booking,
-                qr_code=f"QR-{booking.booking_id}"
-            )
-            
+        if result.tickets:
+            ticket = result.tickets[0]
             messages.success(request, f'✅ อนุมัติการจอง {booking.booking_id} สำเร็จ! ออกตั๋ว {ticket.ticket_number}')
         else:
-            messages.error(request, '❌ ไม่มีที่จอดว่าง!')
+            messages.error(request, '❌ ไม่มีที่จอดว่างในช่วงเวลานี้!')
     
     return redirect('admin_dashboard')
 
@@ -156,17 +268,45 @@ def reject_booking(request, booking_id):
     booking = get_object_or_404(Booking, id=booking_id)
     
     if booking.status == 'WAITING':
-        booking.status = 'REJECTED'
-        booking.save()
+        reject_bookings([booking.id])
         messages.warning(request, f'⚠️ ปฏิเสธการจอง {booking.booking_id} แล้ว')
     
     return redirect('admin_dashboard')
 
 
+@require_POST
+@user_passes_test(is_staff)
+def bulk_booking_action(request):
+    """อนุมัติ/ปฏิเสธการจองที่เลือกหลายรายการพร้อมกัน"""
+    booking_ids = [pk for pk in request.POST.getlist('booking_ids') if pk.isdigit()]
+    action = request.POST.get('action')
+    
+    if not booking_ids:
+        messages.error(request, '❌ กรุณาเลือกการจองอย่างน้อย 1 รายการ')
+        return redirect('admin_dashboard')
+    
+    if action == 'approve':
+        result = approve_bookings(booking_ids, request.user)
+        if result.tickets:
+            messages.success(request, f'✅ อนุมัติ {len(result.tickets)} รายการ และออกตั๋วเรียบร้อย')
+        if result.unassigned:
+            messages.error(request, f'❌ ไม่มีที่จอดว่างสำหรับ {len(result.unassigned)} รายการ')
+    elif action == 'reject':
+        rejected = reject_bookings(booking_ids)
+        messages.warning(request, f'⚠️ ปฏิเสธการจอง {rejected} รายการแล้ว')
+    else:
+        messages.error(request, '❌ ไม่รู้จักคำสั่งนี้')
+    
+    return redirect('admin_dashboard')
+
+
 @login_required
 def view_ticket(request, booking_id):
     """ดูตั๋วจอดรถ"""
-    booking = get_object_or_404(Booking, booking_id=booking_id, user=request.user)
+    booking = get_object_or_404(
+        Booking.objects.select_related('user', 'parking_spot', 'approved_by'),
+        booking_id=booking_id, user=request.user,
+    )
     
     if booking.status != 'APPROVED':
         messages.error(request, '❌ การจองนี้ยังไม่ได้รับอนุมัติ')
@@ -178,27 +318,92 @@ def view_ticket(request, booking_id):
         messages.error(request, '❌ ยังไม่มีตั๋ว')
         return redirect('my_bookings')
     
-    # 🔹 Data to encode in QR
-    qr_data = ticket.qr_code or f"TICKET:{ticket.ticket_number}|BOOKING:{booking.booking_id}"
-    
-    # 🔹 Generate QR image
-    qr = qrcode.QRCode(box_size=8, border=2)
-    qr.add_data(qr_data)
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
-    
-    # 🔹 Convert to Base64 for <img src="">
-    buffer = BytesIO()
-    img.save(buffer, format="PNG")
-    qr_base64 = base64.b64encode(buffer.getvalue()).decode()
-    
     return render(request, 'bookings/ticket.html', {
         'ticket': ticket,
         'booking': booking,
-        'qr_image': qr_base64,   # 👉 send to template
+        'qr_digest': qr_digest(qr_payload(ticket)),
     })
 
 
+@login_required
+def ticket_qr(request, booking_id, digest):
+    """รูป QR Code ของตั๋ว (render ครั้งเดียวแล้วเก็บใน cache)"""
+    ticket = get_object_or_404(
+        Ticket.objects.select_related('booking'),
+        booking__booking_id=booking_id, booking__user=request.user, booking__status='APPROVED',
+    )
+    
+    # URL ผูกกับเนื้อหา QR ถ้าข้อมูลเปลี่ยนให้ไปที่ URL ใหม่
+    current = qr_digest(qr_payload(ticket))
+    if digest != current:
+        return redirect('ticket_qr', booking_id=booking_id, digest=current)
+    
+    etag = f'"{current}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(get_qr_png(ticket), content_type='image/png')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return response
+
+
+
+@login_required
+def ticket_pdf(request, booking_id):
+    """ดาวน์โหลดตั๋วเป็น PDF"""
+    ticket = get_object_or_404(
+        Ticket.objects.select_related('booking', 'booking__user', 'booking__parking_spot'),
+        booking__booking_id=booking_id, booking__user=request.user, booking__status='APPROVED',
+    )
+    try:
+        path = pdf.ticket_pdf(ticket)
+    except pdf.RenderError:
+        logger.exception('PDF render failed for ticket %s', ticket.ticket_number)
+        return render(request, 'bookings/pdf_failed.html', {
+            'what': f'Ticket {ticket.ticket_number}',
+            'back_url': reverse('view_ticket', args=[booking_id]),
+        }, status=503)
+    return FileResponse(open(path, 'rb'), content_type='application/pdf', filename=f'{ticket.ticket_number}.pdf')
+
+
+@user_passes_test(is_staff)
+def print_tickets(request):
+    """พิมพ์ตั๋วทั้งหมดของวันที่เลือกเป็น PDF ไฟล์เดียว"""
+    try:
+        booking_date = date.fromisoformat(request.GET.get('date', ''))
+    except ValueError:
+        booking_date = timezone.localdate()
+    
+    tickets = list(
+        Ticket.objects.filter(booking__booking_date=booking_date, booking__status='APPROVED')
+        .select_related('booking', 'booking__user', 'booking__parking_spot')
+        .order_by('booking__parking_spot__zone', 'booking__parking_spot__spot_number', 'booking__start_time')
+    )
+    if not tickets:
+        messages.info(request, f'ไม่มีตั๋วสำหรับวันที่ {booking_date}')
+        return redirect('admin_dashboard')
+    
+    # render ใน process pool ถ้ายังไม่เสร็จให้หน้าเว็บรอแล้วโหลดใหม่
+    try:
+        path, ready = pdf.batch_pdf(booking_date, tickets)
+    except pdf.RenderError:
+        # เลิกลองใหม่หลังพลาดหลายครั้ง แทนที่จะให้หน้า 202 โหลดซ้ำไปเรื่อย ๆ
+        logger.exception('PDF render failed for the tickets of %s', booking_date)
+        return render(request, 'bookings/pdf_failed.html', {
+            'what': f'The tickets for {booking_date}',
+            'back_url': reverse('admin_dashboard'),
+        }, status=503)
+    if ready:
+        return FileResponse(open(path, 'rb'), content_type='application/pdf', filename=f'tickets-{booking_date}.pdf')
+    
+    response = render(request, 'bookings/tickets_printing.html', {
+        'booking_date': booking_date,
+        'ticket_count': len(tickets),
+        'retry_after': 3,
+    }, status=202)
+    response['Retry-After'] = '3'
+    return response
+
 
 def register(request):
     """หน้าลงทะเบียนผู้ใช้ใหม่"""
@@ -261,7 +466,7 @@ def user_logout(request):
 @login_required
 def my_cars(request):
     """รายการรถของฉัน"""
-    cars = UserCar.objects.filter(user=request.user)
+    cars = user_cars(request.user)
     return render(request, 'bookings/my_cars.html', {'cars': cars})
 
 
@@ -288,6 +493,29 @@ def add_car(request):
     return render(request, 'bookings/add_car.html', {'form': form})
 
 
+@login_required
+def import_cars(request):
+    """นำเข้ารถหลายคันจากไฟล์ CSV/JSON (สำหรับลูกค้าองค์กร)"""
+    if request.method == 'POST':
+        upload = request.FILES.get('fleet_file')
+        if not upload:
+            messages.error(request, '❌ กรุณาเลือกไฟล์ที่ต้องการนำเข้า')
+        else:
+            try:
+                rows = read_rows(upload.file, guess_format(upload.name))
+            except FleetFormatError as exc:
+                messages.error(request, f'❌ ไฟล์ไม่ถูกต้อง: {exc}')
+            else:
+                # ส่งผลการนำเข้าทีละแถวระหว่างที่ยังบันทึกอยู่
+                response = StreamingHttpResponse(
+                    stream_report(import_fleet(request.user, rows)), content_type='text/csv',
+                )
+                response['Content-Disposition'] = 'attachment; filename="fleet-import-report.csv"'
+                return response
+    
+    return render(request, 'bookings/import_cars.html')
+
+
 @login_required
 def edit_car(request, car_id):
     """แก้ไขข้อมูลรถ"""
@@ -55,10 +55,11 @@ INSTALLED_APPS = [
     "django.contrib.contenttypes",
     "django.contrib.sessions",
     "django.contrib.messages",
-    "django.contrib.staticfiles",
 
-    # Your app
+    # Your app (before staticfiles, so its collectstatic builds app.css first)
     "bookings",
+    "django.contrib.staticfiles",
+    "rest_framework",
 
     # static files compression
     "whitenoise.runserver_nostatic",
@@ -70,25 +71,56 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",  # required
+    # After WhiteNoise, so static files are left to the server's access log
+    "bookings.accesslog.AccessLogMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    # Last, so it times just the view (bookings/timing.py)
+    "bookings.timing.ServerTimingMiddleware",
 ]
 
+# Server-Timing header with query/template/view time on every response;
+# staff can also switch it per request with "X-Server-Timing: on"
+SERVER_TIMING = os.getenv("SERVER_TIMING", "False").lower() == "true"
+# Log requests slower than this with their SQL
+SERVER_TIMING_SLOW_MS = int(os.getenv("SERVER_TIMING_SLOW_MS", "1000"))
+# Log the same SQL run this many times in one request as a likely N+1
+SERVER_TIMING_DUPLICATES = int(os.getenv("SERVER_TIMING_DUPLICATES", "5"))
+
+# One JSON line per request (bookings/accesslog.py), e.g. "logs/access.jsonl"
+# relative to BASE_DIR; empty turns it off
+ACCESS_LOG = os.getenv("ACCESS_LOG", "")
+# Rotate at this size, keeping this many old files (access.jsonl.1, .2 ...)
+ACCESS_LOG_MAX_BYTES = int(os.getenv("ACCESS_LOG_MAX_BYTES", str(50 * 1024 * 1024)))
+ACCESS_LOG_BACKUPS = int(os.getenv("ACCESS_LOG_BACKUPS", "5"))
+
 ROOT_URLCONF = "config.urls"
 
+# Bulk approve/reject on the admin dashboard posts one field per selected booking
+DATA_UPLOAD_MAX_NUMBER_FIELDS = 10000
+
 # --------------------------------------------------------------------
 # Templates
 # --------------------------------------------------------------------
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # DjangoTemplates, plus render time for Server-Timing
+        "BACKEND": "bookings.timing.TimedDjangoTemplates",
+        "NAME": "django",
         "DIRS": [],  # Add template dirs if needed
-        "APP_DIRS": True,
         "OPTIONS": {
+            # Parse each template once per process; runserver's autoreloader
+            # clears it when a template file changes
+            "loaders": [
+                ("django.template.loaders.cached.Loader", [
+                    "django.template.loaders.filesystem.Loader",
+                    "django.template.loaders.app_directories.Loader",
+                ]),
+            ],
             "context_processors": [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
@@ -119,9 +151,71 @@ else:
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
+            # Take the write lock at BEGIN so concurrent approvals serialize
+            # instead of failing on lock upgrade
+            "OPTIONS": {
+                "transaction_mode": "IMMEDIATE",
+                "timeout": 20,
+            },
         }
     }
 
+# --------------------------------------------------------------------
+# Cache (sessions, logged-in users, car lists, occupancy snapshot)
+# --------------------------------------------------------------------
+# "file"   - shared by every worker on the host; defaults to .cache/ in the
+#            project. FileBasedCache unpickles every file it finds there, so
+#            the directory must belong to this user and be closed to others
+#            (mode 700); keep it off shared places like /dev/shm or /tmp
+# "locmem" - per process, only for a single worker or tests
+# "redis"  - shared across hosts; needs `pip install redis` and REDIS_URL,
+#            any Redis-compatible server (Valkey, KeyDB, ...) works locally
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "file").lower()
+
+if CACHE_BACKEND == "redis":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL", "redis://127.0.0.1:6379/0"),
+        }
+    }
+elif CACHE_BACKEND == "locmem":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+else:
+    # Ownership and mode are checked by bookings/checks.py
+    CACHE_LOCATION = Path(os.getenv("CACHE_LOCATION", BASE_DIR / ".cache"))
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": str(CACHE_LOCATION),
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+
+CACHES["default"]["KEY_PREFIX"] = os.getenv("CACHE_KEY_PREFIX", "parking")
+
+# Rendered template fragments ({% cache ... using="fragments" %}). Their keys
+# carry the version of what they show (e.g. booking.updated_at, plus the
+# spot and usernames of related rows, which change without touching it), so
+# they never need invalidating and a per-process cache is enough
+CACHES["fragments"] = {
+    "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    "LOCATION": "fragments",
+    "TIMEOUT": 86400,
+    "OPTIONS": {"MAX_ENTRIES": 20000},
+}
+
+# Sessions are read from the cache and written through to the database
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+
+# Logged-in users are loaded from the cache (bookings/backends.py)
+AUTHENTICATION_BACKENDS = ["bookings.backends.CachedModelBackend"]
+
 # --------------------------------------------------------------------
 # Password validation
 # --------------------------------------------------------------------
@@ -148,7 +242,56 @@ USE_TZ = True
 STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
-STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+# Hashed, compressed file names; WhiteNoise serves them with a one-year
+# immutable Cache-Control. app.css is built by ``manage.py build_css``.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage"},
+}
+
+# --------------------------------------------------------------------
+# PDF tickets (WeasyPrint)
+# --------------------------------------------------------------------
+PDF_CACHE_DIR = Path(os.getenv("PDF_CACHE_DIR", BASE_DIR / "pdf_cache"))
+
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", "2"))
+
+# --------------------------------------------------------------------
+# REST API (/api/v1/)
+# --------------------------------------------------------------------
+REST_FRAMEWORK = {
+    "DEFAULT_AUTHENTICATION_CLASSES": [
+        "rest_framework.authentication.SessionAuthentication",
+        "rest_framework.authentication.BasicAuthentication",
+    ],
+    "DEFAULT_PERMISSION_CLASSES": [
+        "rest_framework.permissions.IsAuthenticated",
+    ],
+}
+
+# --------------------------------------------------------------------
+# Booking / ticket IDs
+# --------------------------------------------------------------------
+# Host number (0-1294) baked into generated IDs; required with DATABASE_URL,
+# and different on every host writing to that database. Each process on the
+# host also locks a slot of its own in ID_LOCK_DIR.
+ID_NODE = os.getenv("ID_NODE")
+ID_LOCK_DIR = Path(os.getenv("ID_LOCK_DIR", BASE_DIR / ".id_locks"))
+
+# --------------------------------------------------------------------
+# Async read views (config/asgi.py turns this on)
+# --------------------------------------------------------------------
+ASYNC_VIEWS = os.getenv("ASYNC_VIEWS", "False").lower() == "true"
+
+# --------------------------------------------------------------------
+# Live availability stream (Server-Sent Events, ASGI only)
+# --------------------------------------------------------------------
+# Directory for the unix sockets that pass change notices between worker
+# processes; leave unset when a single process serves everything
+REALTIME_SOCKET_DIR = os.getenv("REALTIME_SOCKET_DIR")
+
+# Seconds between keep-alive comments on an idle stream
+REALTIME_HEARTBEAT = int(os.getenv("REALTIME_HEARTBEAT", "15"))
 
 # --------------------------------------------------------------------
 # Default PK